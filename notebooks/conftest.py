@@ -0,0 +1,38 @@
+"""
+Shared fixtures for the notebook validation scripts
+Loads the event, batch and station tables once per pytest session through
+src/data_access.py, so ``pytest notebooks`` reads the CSV a single time.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import DEFAULT_DATA_PATH, load_batch_table, load_event_table, load_station_table
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _require_data():
+    """Skip the notebook checks when the production CSV is not present."""
+    if not os.path.exists(DEFAULT_DATA_PATH):
+        pytest.skip(f"Production data not found at {DEFAULT_DATA_PATH}")
+
+
+@pytest.fixture(scope="session")
+def df():
+    """Event-level table."""
+    return load_event_table()
+
+
+@pytest.fixture(scope="session")
+def batch_df():
+    """Batch-level table."""
+    return load_batch_table()
+
+
+@pytest.fixture(scope="session")
+def station_df():
+    """Station-level table."""
+    return load_station_table()
@@ -4,6 +4,9 @@ Test that simulates exact execution of paint_analysis_streamlined.ipynb
 Tests each code cell in sequence to identify any remaining issues
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -16,9 +19,13 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
 from sklearn.preprocessing import StandardScaler
 import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table, load_event_table, load_station_table
+
 warnings.filterwarnings('ignore')
 
-def test_notebook_execution():
+def test_notebook_execution(df, batch_df, station_df):
     """Test exact notebook execution sequence"""
     print("🧪 TESTING EXACT NOTEBOOK EXECUTION SEQUENCE")
     print("=" * 80)
@@ -35,9 +42,6 @@ def test_notebook_execution():
     print("PART 1: DATA EXPLORATION & UNDERSTANDING")
     print("=" * 60)
     
-    # Load and examine the data (Cell 2)
-    df = pd.read_csv('../data/paint_production_data.csv')
-    
     print("=== DATASET OVERVIEW ===")
     print(f"Shape: {df.shape}")
     print(f"Columns: {list(df.columns)}")
@@ -64,39 +68,14 @@ def test_notebook_execution():
     event_failure_rate = (df['QC_Result'] == 'failed').mean()
     print(f"Event-level failure rate: {event_failure_rate:.1%}")
     
-    batch_qc = df.groupby('Batch_ID')['QC_Result'].first()
-    batch_failure_rate = (batch_qc == 'failed').mean()
+    batch_failure_rate = batch_df['Failed'].mean()
     print(f"Batch-level failure rate: {batch_failure_rate:.1%} ← KEY BUSINESS METRIC")
     
     print(f"\nDaily production: ~{df['Batch_ID'].nunique() / 365:.0f} batches/day")
     print(f"Failed batches per day: ~{batch_failure_rate * df['Batch_ID'].nunique() / 365:.1f}")
     
-    # Create batch-level dataset (Cell 4)
-    print("\n=== CREATING BATCH-LEVEL DATASET ===")
-    
-    # Calculate dosing errors - CRITICAL FOR PART 2
-    df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-    
-    # Aggregate to batch level
-    batch_df = df.groupby('Batch_ID').agg({
-        'Production_Date': 'first',
-        'Recipe_Name': 'first',
-        'Num_Ingredients': 'first',
-        'QC_Result': 'first',
-        'Facility_Temperature': 'mean',
-        'Dosing_Error': ['mean', 'max', 'std'],
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum',
-        'Dosing_Station': 'nunique'
-    }).round(4)
-    
-    # Flatten column names
-    batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-    batch_df = batch_df.reset_index()
-    
-    # Create target variable
-    batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-    
+    # Batch-level dataset (Cell 4) from the shared data layer
+    print("\n=== BATCH-LEVEL DATASET ===")
     print(f"Batch dataset shape: {batch_df.shape}")
     print(f"Batch failure rate: {batch_df['Failed'].mean():.1%}")
     print("\\nBatch dataset ready for analysis")
@@ -113,17 +92,11 @@ def test_notebook_execution():
     # 2.1 COMPREHENSIVE FACTOR ANALYSIS (Cell 7)
     print("\n=== 2.1 COMPREHENSIVE FACTOR ANALYSIS ===")
     
-    # Ensure Dosing_Error column exists (safety check) - THE FIX
-    if 'Dosing_Error' not in df.columns:
-        df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-        print("⚠️  Created Dosing_Error column (ensure Part 1 was executed first)")
+    # Dosing error columns always come with the shared event table
+    assert 'Dosing_Error_Abs' in df.columns
     
     # Station Performance Analysis
-    station_analysis = df.groupby('Dosing_Station').agg({
-        'Dosing_Error': ['mean', 'std', 'count'],
-        'QC_Result': lambda x: (x == 'failed').mean()
-    }).round(4)
-    station_analysis.columns = ['Avg_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
+    station_analysis = station_df.set_index('Dosing_Station')
     station_analysis = station_analysis.sort_values('Failure_Rate', ascending=False)
     
     print("\\nStation Performance Summary:")
@@ -132,10 +105,10 @@ def test_notebook_execution():
     # Test the rest of Part 2.1 code
     worst_stations = ['D03', 'D07']
     best_stations = ['D02', 'D04']
-    worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error'].dropna()
-    best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error'].dropna()
+    worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error_Abs'].dropna()
+    best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error_Abs'].dropna()
     t_stat, p_value = ttest_ind(worst_errors, best_errors)
-    correlation = stats.pearsonr(station_analysis['Avg_Error'], station_analysis['Failure_Rate'])
+    correlation = stats.pearsonr(station_analysis['Mean_Error'], station_analysis['Failure_Rate'])
     
     print(f"\\n📊 Station Analysis Results:")
     print(f"  • Strong correlation between errors and failures: r={correlation[0]:.3f} (p={correlation[1]:.2e})")
@@ -143,17 +116,17 @@ def test_notebook_execution():
     print(f"  • Problem stations: {worst_stations} require immediate maintenance")
     
     print("\n✅ ALL NOTEBOOK CODE EXECUTES SUCCESSFULLY")
-    print("✅ THE SAFETY CHECK FIX RESOLVES THE DOSING_ERROR ISSUE")
+    print("✅ DOSING ERROR COLUMNS PROVIDED BY THE SHARED DATA LAYER")
     print("✅ NOTEBOOK IS READY FOR PRODUCTION USE")
     
     return True
 
 if __name__ == "__main__":
     try:
-        test_notebook_execution()
+        test_notebook_execution(load_event_table(), load_batch_table(), load_station_table())
         print("\n" + "=" * 80)
         print("🎯 FINAL STATUS: STREAMLINED NOTEBOOK FULLY FUNCTIONAL")
-        print("📋 KEY FIX APPLIED: Safety check for Dosing_Error column in Part 2.1")
+        print("📋 KEY FIX APPLIED: Event, batch and station tables come from src/data_access.py")
         print("✅ ALL CODE CELLS EXECUTE WITHOUT ERRORS")
         print("=" * 80)
     except Exception as e:
@@ -4,6 +4,9 @@ Test script for Part 1 of Paint Quality Analysis
 Executes all Part 1 code from the notebook to ensure it works correctly
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -15,6 +18,10 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score
 from sklearn.preprocessing import StandardScaler
 import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table, load_event_table, load_station_table
+
 warnings.filterwarnings('ignore')
 
 # Set style
@@ -24,16 +31,13 @@ pd.set_option('display.max_columns', None)
 
 print("✓ Libraries imported successfully")
 
-def test_part1():
+def test_part1(df, batch_df, station_df):
     """Test all Part 1 functionality"""
     
     print("\n" + "="*50)
     print("TESTING PART 1: DATA EXPLORATION & UNDERSTANDING")
     print("="*50)
     
-    # Load and examine the data
-    df = pd.read_csv('../data/paint_production_data.csv')
-    
     print("\n=== DATASET OVERVIEW ===")
     print(f"Shape: {df.shape}")
     print(f"Columns: {list(df.columns)}")
@@ -61,39 +65,14 @@ def test_part1():
     print(f"Event-level failure rate: {event_failure_rate:.1%}")
     
     # Batch-level failure rate (the real business metric)
-    batch_qc = df.groupby('Batch_ID')['QC_Result'].first()
-    batch_failure_rate = (batch_qc == 'failed').mean()
+    batch_failure_rate = batch_df['Failed'].mean()
     print(f"Batch-level failure rate: {batch_failure_rate:.1%} ← KEY BUSINESS METRIC")
     
     print(f"\nDaily production: ~{df['Batch_ID'].nunique() / 365:.0f} batches/day")
     print(f"Failed batches per day: ~{batch_failure_rate * df['Batch_ID'].nunique() / 365:.1f}")
     
-    # Create batch-level dataset for analysis
-    print("\n=== CREATING BATCH-LEVEL DATASET ===")
-    
-    # Calculate dosing errors
-    df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-    
-    # Aggregate to batch level
-    batch_df = df.groupby('Batch_ID').agg({
-        'Production_Date': 'first',
-        'Recipe_Name': 'first',
-        'Num_Ingredients': 'first',
-        'QC_Result': 'first',
-        'Facility_Temperature': 'mean',
-        'Dosing_Error': ['mean', 'max', 'std'],
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum',
-        'Dosing_Station': 'nunique'
-    }).round(4)
-    
-    # Flatten column names
-    batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-    batch_df = batch_df.reset_index()
-
-    # Create target variable (QC_Result becomes QC_Result_first after flattening)
-    batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-    
+    # Batch-level dataset from the shared data layer
+    print("\n=== BATCH-LEVEL DATASET ===")
     print(f"Batch dataset shape: {batch_df.shape}")
     print(f"Batch failure rate: {batch_df['Failed'].mean():.1%}")
     print("Batch dataset ready for analysis")
@@ -129,7 +108,7 @@ def test_part1():
     
     # Hypothesis 3: Station performance varies
     print("\n3. STATION PERFORMANCE HYPOTHESIS:")
-    station_performance = df.groupby('Dosing_Station')['QC_Result'].apply(lambda x: (x == 'failed').mean()).sort_values(ascending=False)
+    station_performance = station_df.set_index('Dosing_Station')['Failure_Rate'].sort_values(ascending=False)
     print("Station failure rates:")
     for station, rate in station_performance.items():
         print(f"  {station}: {rate:.1%}")
@@ -161,7 +140,7 @@ def test_part1():
     return df, batch_df
 
 if __name__ == "__main__":
-    df, batch_df = test_part1()
+    df, batch_df = test_part1(load_event_table(), load_batch_table(), load_station_table())
     print(f"\n🎯 Final verification:")
     print(f"   Original dataset: {df.shape}")
     print(f"   Batch dataset: {batch_df.shape}")
@@ -4,53 +4,33 @@ Test script for Part 2 of Paint Quality Analysis
 Executes all Part 2 code from the notebook to ensure it works correctly
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 from scipy.stats import ttest_ind, chi2_contingency
 import scipy.stats as stats
 import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table, load_event_table, load_station_table
+
 warnings.filterwarnings('ignore')
 
-def test_part2():
+def test_part2(df, batch_df, station_df):
     """Test all Part 2 functionality"""
     
     print("\n" + "="*60)
     print("TESTING PART 2: DIAGNOSTIC ANALYSIS")
     print("="*60)
     
-    # Load and prepare data (from Part 1)
-    df = pd.read_csv('../data/paint_production_data.csv')
-    df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-    
-    # Create batch-level dataset
-    batch_df = df.groupby('Batch_ID').agg({
-        'Production_Date': 'first',
-        'Recipe_Name': 'first',
-        'Num_Ingredients': 'first',
-        'QC_Result': 'first',
-        'Facility_Temperature': 'mean',
-        'Dosing_Error': ['mean', 'max', 'std'],
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum',
-        'Dosing_Station': 'nunique'
-    }).round(4)
-    
-    # Flatten column names
-    batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-    batch_df = batch_df.reset_index()
-    batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-    
     print(f"Working with {len(batch_df)} batches for analysis")
     
     # 2.1 Dosing Accuracy Analysis
     print("\n=== 2.1 DOSING ACCURACY ANALYSIS ===")
     
-    station_analysis = df.groupby('Dosing_Station').agg({
-        'Dosing_Error': ['mean', 'std', 'count'],
-        'QC_Result': lambda x: (x == 'failed').mean()
-    }).round(4)
-    
-    station_analysis.columns = ['Avg_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
+    station_analysis = station_df.set_index('Dosing_Station')
     station_analysis = station_analysis.sort_values('Failure_Rate', ascending=False)
     
     print("Station Performance Summary:")
@@ -60,11 +40,11 @@ def test_part2():
     worst_stations = ['D03', 'D07']
     best_stations = ['D02', 'D04']
     
-    worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error'].dropna()
-    best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error'].dropna()
+    worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error_Abs'].dropna()
+    best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error_Abs'].dropna()
     
     t_stat, p_value = ttest_ind(worst_errors, best_errors)
-    correlation = stats.pearsonr(station_analysis['Avg_Error'], station_analysis['Failure_Rate'])
+    correlation = stats.pearsonr(station_analysis['Mean_Error'], station_analysis['Failure_Rate'])
     
     print(f"\nStatistical Results:")
     print(f"  T-test p-value: {p_value:.6f}")
@@ -127,14 +107,9 @@ def test_part2():
     # 2.4 Station Performance Diagnostics
     print("\n=== 2.4 STATION PERFORMANCE DIAGNOSTICS ===")
     
-    station_detailed = df.groupby('Dosing_Station').agg({
-        'Dosing_Error': ['mean', 'std', 'count'],
-        'QC_Result': lambda x: (x == 'failed').mean(),
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum'
-    }).round(4)
-    
-    station_detailed.columns = ['Avg_Error', 'Error_Std', 'Event_Count', 'Failure_Rate', 'Target_Total', 'Actual_Total']
+    station_totals = df.groupby('Dosing_Station')[['Target_Amount', 'Actual_Amount']].sum().round(4)
+    station_totals.columns = ['Target_Total', 'Actual_Total']
+    station_detailed = station_df.set_index('Dosing_Station').join(station_totals)
     station_detailed['Workload_Pct'] = station_detailed['Event_Count'] / station_detailed['Event_Count'].sum() * 100
     station_detailed['Dosing_Bias'] = (station_detailed['Actual_Total'] - station_detailed['Target_Total']) / station_detailed['Target_Total'] * 100
     
@@ -181,7 +156,7 @@ def test_part2():
     return df, batch_df, station_analysis
 
 if __name__ == "__main__":
-    df, batch_df, station_analysis = test_part2()
+    df, batch_df, station_analysis = test_part2(load_event_table(), load_batch_table(), load_station_table())
     print(f"\n🎯 Final verification:")
     print(f"   Batch dataset: {batch_df.shape}")
     print(f"   Station analysis: {station_analysis.shape}")
@@ -4,6 +4,9 @@ Test script for Part 3 of Paint Quality Analysis
 Executes all Part 3 code from the notebook to ensure it works correctly
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score
@@ -12,37 +15,19 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score
 from sklearn.preprocessing import StandardScaler
 import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table
+
 warnings.filterwarnings('ignore')
 
-def test_part3():
+def test_part3(batch_df):
     """Test all Part 3 functionality"""
     
     print("\n" + "="*60)
     print("TESTING PART 3: PREDICTIVE MODELING")
     print("="*60)
     
-    # Load and prepare data (from Parts 1 & 2)
-    df = pd.read_csv('../data/paint_production_data.csv')
-    df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-    
-    # Create batch-level dataset
-    batch_df = df.groupby('Batch_ID').agg({
-        'Production_Date': 'first',
-        'Recipe_Name': 'first',
-        'Num_Ingredients': 'first',
-        'QC_Result': 'first',
-        'Facility_Temperature': 'mean',
-        'Dosing_Error': ['mean', 'max', 'std'],
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum',
-        'Dosing_Station': 'nunique'
-    }).round(4)
-    
-    # Flatten column names
-    batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-    batch_df = batch_df.reset_index()
-    batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-    
     print(f"Working with {len(batch_df)} batches for modeling")
     
     # 3.1 Feature Engineering
@@ -60,15 +45,15 @@ def test_part3():
                                             modeling_df['Temp_Suboptimal']).astype(int)
     
     # Dosing quality features
-    modeling_df['High_Dosing_Error'] = (modeling_df['Dosing_Error_mean'] > 
-                                       modeling_df['Dosing_Error_mean'].median()).astype(int)
+    modeling_df['High_Dosing_Error'] = (modeling_df['Dosing_Error_Abs_mean'] > 
+                                       modeling_df['Dosing_Error_Abs_mean'].median()).astype(int)
     
     feature_columns = [
         'Num_Ingredients_first',
         'Facility_Temperature_mean',
-        'Dosing_Error_mean',
-        'Dosing_Error_max',
-        'Dosing_Error_std',
+        'Dosing_Error_Abs_mean',
+        'Dosing_Error_Abs_max',
+        'Dosing_Error_Abs_std',
         'Target_Amount_sum',
         'Dosing_Station_nunique',
         'Recipe_Complex',
@@ -240,7 +225,7 @@ def test_part3():
     return modeling_df, best_model, risk_analysis
 
 if __name__ == "__main__":
-    modeling_df, best_model, risk_analysis = test_part3()
+    modeling_df, best_model, risk_analysis = test_part3(load_batch_table())
     print(f"\n🎯 Final verification:")
     print(f"   Modeling dataset: {modeling_df.shape}")
     print(f"   Best model: {type(best_model).__name__}")
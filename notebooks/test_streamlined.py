@@ -3,41 +3,24 @@
 Quick test to verify the streamlined notebook has all essential components
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 from scipy import stats
 from scipy.stats import ttest_ind, chi2_contingency
 
-def test_streamlined_notebook():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table, load_event_table, load_station_table
+
+def test_streamlined_notebook(df, batch_df, station_df):
     """Test that streamlined notebook components work correctly"""
     
     print("=" * 60)
     print("TESTING STREAMLINED NOTEBOOK COMPONENTS")
     print("=" * 60)
     
-    # Load data (same as notebook)
-    df = pd.read_csv('../data/paint_production_data.csv')
-    
-    # Create batch dataset (same as notebook)
-    df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-    
-    batch_df = df.groupby('Batch_ID').agg({
-        'Production_Date': 'first',
-        'Recipe_Name': 'first',
-        'Num_Ingredients': 'first',
-        'QC_Result': 'first',
-        'Facility_Temperature': 'mean',
-        'Dosing_Error': ['mean', 'max', 'std'],
-        'Target_Amount': 'sum',
-        'Actual_Amount': 'sum',
-        'Dosing_Station': 'nunique'
-    }).round(4)
-    
-    # Flatten column names
-    batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-    batch_df = batch_df.reset_index()
-    batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-    
     print(f"✅ Data loaded: {len(batch_df)} batches")
     
     # Test Part 2 components
@@ -62,11 +45,7 @@ def test_streamlined_notebook():
     print(f"✅ Temperature analysis: Optimal={p_optimal:.1%}, Suboptimal={p_suboptimal:.1%}")
     
     # Station analysis
-    station_analysis = df.groupby('Dosing_Station').agg({
-        'Dosing_Error': ['mean', 'std', 'count'],
-        'QC_Result': lambda x: (x == 'failed').mean()
-    }).round(4)
-    station_analysis.columns = ['Avg_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
+    station_analysis = station_df.set_index('Dosing_Station')
     
     worst_stations = station_analysis.nlargest(2, 'Failure_Rate').index.tolist()
     print(f"✅ Station analysis: Worst stations = {worst_stations}")
@@ -92,7 +71,7 @@ def test_streamlined_notebook():
     modeling_df['Complex_AND_Suboptimal'] = (modeling_df['Recipe_Complex'] & modeling_df['Temp_Suboptimal']).astype(int)
     
     feature_cols = [
-        'Num_Ingredients_first', 'Facility_Temperature_mean', 'Dosing_Error_mean', 
+        'Num_Ingredients_first', 'Facility_Temperature_mean', 'Dosing_Error_Abs_mean', 
         'Recipe_Complex', 'Temp_Suboptimal', 'Complex_AND_Suboptimal'
     ]
     
@@ -124,4 +103,4 @@ def test_streamlined_notebook():
     return True
 
 if __name__ == "__main__":
-    test_streamlined_notebook()
+    test_streamlined_notebook(load_event_table(), load_batch_table(), load_station_table())
@@ -4,6 +4,9 @@ Comprehensive test of all code in paint_analysis_streamlined.ipynb
 Identifies and fixes compilation/execution issues
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -16,18 +19,19 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
 from sklearn.preprocessing import StandardScaler
 import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_access import load_batch_table, load_event_table, load_station_table
+
 warnings.filterwarnings('ignore')
 
-def test_part1():
+def test_part1(df, batch_df):
     """Test Part 1: Data Exploration & Understanding"""
     print("=" * 60)
     print("TESTING PART 1: DATA EXPLORATION & UNDERSTANDING")
     print("=" * 60)
     
     try:
-        # Load and examine the data
-        df = pd.read_csv('../data/paint_production_data.csv')
-        
         print("=== DATASET OVERVIEW ===")
         print(f"Shape: {df.shape}")
         print(f"Columns: {list(df.columns)}")
@@ -55,39 +59,14 @@ def test_part1():
         print(f"Event-level failure rate: {event_failure_rate:.1%}")
         
         # Batch-level failure rate (the real business metric)
-        batch_qc = df.groupby('Batch_ID')['QC_Result'].first()
-        batch_failure_rate = (batch_qc == 'failed').mean()
+        batch_failure_rate = batch_df['Failed'].mean()
         print(f"Batch-level failure rate: {batch_failure_rate:.1%} ← KEY BUSINESS METRIC")
         
         print(f"\nDaily production: ~{df['Batch_ID'].nunique() / 365:.0f} batches/day")
         print(f"Failed batches per day: ~{batch_failure_rate * df['Batch_ID'].nunique() / 365:.1f}")
         
-        # Create batch-level dataset for analysis
-        print("\n=== CREATING BATCH-LEVEL DATASET ===")
-        
-        # Calculate dosing errors - THIS IS CRITICAL FOR PART 2
-        df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-        
-        # Aggregate to batch level
-        batch_df = df.groupby('Batch_ID').agg({
-            'Production_Date': 'first',
-            'Recipe_Name': 'first',
-            'Num_Ingredients': 'first',
-            'QC_Result': 'first',
-            'Facility_Temperature': 'mean',
-            'Dosing_Error': ['mean', 'max', 'std'],
-            'Target_Amount': 'sum',
-            'Actual_Amount': 'sum',
-            'Dosing_Station': 'nunique'
-        }).round(4)
-        
-        # Flatten column names
-        batch_df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_df.columns]
-        batch_df = batch_df.reset_index()
-        
-        # Create target variable
-        batch_df['Failed'] = (batch_df['QC_Result_first'] == 'failed').astype(int)
-        
+        # Batch-level dataset from the shared data layer
+        print("\n=== BATCH-LEVEL DATASET ===")
         print(f"Batch dataset shape: {batch_df.shape}")
         print(f"Batch failure rate: {batch_df['Failed'].mean():.1%}")
         
@@ -135,7 +114,7 @@ def test_part1():
         print(f"❌ PART 1 FAILED: {e}")
         raise
 
-def test_part2(df, batch_df):
+def test_part2(df, batch_df, station_df):
     """Test Part 2: Diagnostic Analysis"""
     print("\n" + "=" * 60)
     print("TESTING PART 2: DIAGNOSTIC ANALYSIS")
@@ -148,17 +127,11 @@ def test_part2(df, batch_df):
         # 2.1 COMPREHENSIVE FACTOR ANALYSIS
         print("\n=== 2.1 COMPREHENSIVE FACTOR ANALYSIS ===")
 
-        # Ensure Dosing_Error column exists (safety check)
-        if 'Dosing_Error' not in df.columns:
-            df['Dosing_Error'] = abs(df['Actual_Amount'] - df['Target_Amount'])
-            print("⚠️  Created Dosing_Error column (ensure Part 1 was executed first)")
+        # Dosing error columns always come with the shared event table
+        assert 'Dosing_Error_Abs' in df.columns
 
         # Station Performance Analysis
-        station_analysis = df.groupby('Dosing_Station').agg({
-            'Dosing_Error': ['mean', 'std', 'count'],
-            'QC_Result': lambda x: (x == 'failed').mean()
-        }).round(4)
-        station_analysis.columns = ['Avg_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
+        station_analysis = station_df.set_index('Dosing_Station')
         station_analysis = station_analysis.sort_values('Failure_Rate', ascending=False)
 
         print("\nStation Performance Summary:")
@@ -167,10 +140,10 @@ def test_part2(df, batch_df):
         # Statistical significance tests
         worst_stations = ['D03', 'D07']
         best_stations = ['D02', 'D04']
-        worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error'].dropna()
-        best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error'].dropna()
+        worst_errors = df[df['Dosing_Station'].isin(worst_stations)]['Dosing_Error_Abs'].dropna()
+        best_errors = df[df['Dosing_Station'].isin(best_stations)]['Dosing_Error_Abs'].dropna()
         t_stat, p_value = ttest_ind(worst_errors, best_errors)
-        correlation = stats.pearsonr(station_analysis['Avg_Error'], station_analysis['Failure_Rate'])
+        correlation = stats.pearsonr(station_analysis['Mean_Error'], station_analysis['Failure_Rate'])
 
         print(f"\n📊 Station Analysis Results:")
         print(f"  • Strong correlation between errors and failures: r={correlation[0]:.3f} (p={correlation[1]:.2e})")
@@ -249,17 +222,17 @@ def main():
     
     try:
         # Test Part 1
-        df, batch_df = test_part1()
+        df, batch_df = test_part1(load_event_table(), load_batch_table())
         
         # Test Part 2
-        part2_success = test_part2(df, batch_df)
+        part2_success = test_part2(df, batch_df, load_station_table())
         
         if part2_success:
             print("\n" + "=" * 80)
             print("✅ ALL TESTS PASSED")
             print("📋 ISSUES IDENTIFIED AND SOLUTIONS:")
-            print("1. Dosing_Error column must be created in Part 1")
-            print("2. df and batch_df must be available for Part 2")
+            print("1. Dosing error columns come from the shared event table")
+            print("2. df, batch_df and station_df are loaded once and shared by both parts")
             print("3. All dependencies properly ordered")
             print("=" * 80)
         else:
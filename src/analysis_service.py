@@ -0,0 +1,286 @@
+"""
+HTTP Analysis Service
+Long-running server that keeps the analyzer warm in memory and answers
+/health, /metrics and JSON analysis endpoints. Responses carry ETags tied to
+the data version, so they are cached until new data is ingested; heavy
+requests (risk scoring, SQL) run in a worker process pool. The ad-hoc /sql
+endpoint accepts read-only SELECTs and is off unless explicitly enabled.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from data_access import data_version
+from result_export import explain_scores, to_jsonable
+
+
+def _load_analyzer(data_path):
+    """Analyzer with the data, diagnostic and recommendation phases run (output silenced)."""
+    from paint_analysis import PaintQualityAnalyzer
+
+    analyzer = PaintQualityAnalyzer(data_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.load_and_validate_data()
+        analyzer.analyze_fundamental_components()
+        analyzer.analyze_systems_interactions()
+        analyzer.generate_business_recommendations()
+    return analyzer
+
+
+# Per-process analyzer and fitted model for heavy requests, installed by the pool initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(data_path, model_path, analyzer=None):
+    """Load the data (and saved model, if any) once per worker process, or use an analyzer already loaded."""
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(data_path=data_path, model_path=model_path,
+                         analyzer=analyzer if analyzer is not None else _load_analyzer(data_path))
+
+
+def _risk_model():
+    """Saved model artifact, or a compiled forest trained on first use."""
+    if 'model' not in _WORKER_STATE:
+        import pickle
+
+        from compiled_model import compile_model
+
+        if _WORKER_STATE['model_path']:
+            with open(_WORKER_STATE['model_path'], 'rb') as f:
+                artifact = pickle.load(f)
+            model, features = artifact['model'], artifact['features']
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = _WORKER_STATE['analyzer'].build_predictive_model()
+            model, features = results['models']['Random Forest'], results['features']
+        _WORKER_STATE['model'] = (compile_model(model) or model, features)
+    return _WORKER_STATE['model']
+
+
+def _risk_scores(top):
+    """Highest-risk batches from the warm analyzer, with per-feature contributions when available."""
+    import pandas as pd
+
+    model, features = _risk_model()
+    batches = _WORKER_STATE['analyzer'].batch_df.dropna(subset=features)
+    X = batches[features] if hasattr(model, 'feature_names_in_') else batches[features].to_numpy(dtype=float)
+    scores = batches[['Batch_ID', 'Production_Date_first', 'Recipe_Name_first']].copy()
+    scores['Risk_Score'] = model.predict_proba(X)[:, 1]
+    scores = scores.sort_values('Risk_Score', ascending=False).head(top)
+    if hasattr(model, 'explain'):
+        # Explain only the returned rows
+        contributions = explain_scores(model, batches.loc[scores.index, features].to_numpy(dtype=float), features)
+        scores = pd.concat([scores.reset_index(drop=True), contributions], axis=1)
+    return scores
+
+
+def _sql(query):
+    """Run an ad-hoc query through the SQL layer over the worker's data."""
+    if 'sql' not in _WORKER_STATE:
+        from sql_layer import SQLLayer
+
+        analyzer = _WORKER_STATE['analyzer']
+        _WORKER_STATE['sql'] = SQLLayer(events=analyzer.df, batches=analyzer.batch_df)
+    return _WORKER_STATE['sql'].query(query)
+
+
+class AnalysisService:
+    """Warm analyzer state, versioned response cache and heavy-request pool."""
+
+    def __init__(self, data_path, model_path=None, n_workers=2, cache_size=256, enable_sql=False):
+        """Load the data; n_workers=0 runs heavy requests in the server process, /sql is off unless enabled."""
+        self.data_path = data_path
+        self.model_path = model_path
+        self.n_workers = n_workers
+        self.enable_sql = enable_sql
+        self.cache_size = cache_size
+        self.started = time.time()
+        self.lock = threading.Lock()
+        # Guards the response cache (LRU) and metrics, which every request thread updates
+        self.cache_lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.metrics = {'requests': {}, 'seconds': {}, 'not_modified': 0, 'cache_hits': 0, 'reloads': 0}
+        self.pool = None
+        self.version = None
+        self.analyzer = None
+        self.refresh()
+
+    def refresh(self):
+        """Reload state and restart workers when the data version has changed."""
+        version = data_version(self.data_path)
+        if version == self.version:
+            return False
+        with self.lock:
+            if version == self.version:
+                return False
+            analyzer = _load_analyzer(self.data_path)
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+            if self.n_workers > 0:
+                self.pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                                initargs=(self.data_path, self.model_path))
+            else:
+                # Inline heavy requests share the server's analyzer rather than loading a second one
+                _init_worker(self.data_path, self.model_path, analyzer)
+            with self.cache_lock:
+                self.analyzer, self.version = analyzer, version
+                self.cache.clear()
+                self.metrics['reloads'] += 1
+        return True
+
+    def close(self):
+        """Stop the worker pool."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def _heavy(self, func, *args):
+        """Run a heavy request in the pool (or inline when there is no pool)."""
+        if self.pool is None:
+            return func(*args)
+        return self.pool.submit(func, *args).result()
+
+    # --- endpoints -----------------------------------------------------------
+
+    def _stations(self, params):
+        systems = self.analyzer.analysis_results['systems_interactions']
+        return {'stations': systems['station_analysis'], 'bias': systems['station_bias']}
+
+    def _interactions(self, params):
+        systems = self.analyzer.analysis_results['systems_interactions']
+        return {'temperature_x_complexity': systems['interaction_analysis'],
+                'monthly': systems['temporal_analysis']}
+
+    def _recommendations(self, params):
+        return {'recommendations': self.analyzer.analysis_results['recommendations']}
+
+    def _risk(self, params):
+        top = int(params.get('top', ['20'])[0])
+        return {'scores': self._heavy(_risk_scores, top)}
+
+    def _query(self, params):
+        if 'q' not in params:
+            raise ValueError("Missing query parameter q")
+        return {'rows': self._heavy(_sql, params['q'][0])}
+
+    ROUTES = {
+        '/stations': _stations,
+        '/interactions': _interactions,
+        '/recommendations': _recommendations,
+        '/risk-scores': _risk,
+        '/sql': _query,
+    }
+
+    def respond(self, path, query, if_none_match=None):
+        """(status, content type, body bytes, etag) for one request."""
+        start = time.perf_counter()
+        route = path.rstrip('/') or '/'
+        try:
+            if route == '/health':
+                body = json.dumps({'status': 'ok', 'data_version': self.version,
+                                   'uptime_seconds': round(time.time() - self.started, 1)}).encode()
+                return 200, 'application/json', body, None
+            if route == '/metrics':
+                return 200, 'text/plain; version=0.0.4', self.render_metrics().encode(), None
+            if route not in self.ROUTES or (route == '/sql' and not self.enable_sql):
+                return 404, 'application/json', json.dumps({'error': f"Unknown endpoint {route}"}).encode(), None
+
+            self.refresh()
+            version = self.version
+            key = (route, query, version)
+            with self.cache_lock:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.cache.move_to_end(key)
+                    self.metrics['cache_hits'] += 1
+            if cached is None:
+                payload = self.ROUTES[route](self, parse_qs(query))
+                body = json.dumps(to_jsonable(payload), default=str).encode()
+                cached = (body, f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"')
+                with self.cache_lock:
+                    if version == self.version:  # not stale after a concurrent reload
+                        self.cache[key] = cached
+                        while len(self.cache) > self.cache_size:
+                            self.cache.popitem(last=False)
+            body, etag = cached
+            if if_none_match == etag:
+                with self.cache_lock:
+                    self.metrics['not_modified'] += 1
+                return 304, 'application/json', b'', etag
+            return 200, 'application/json', body, etag
+        except ValueError as e:
+            return 400, 'application/json', json.dumps({'error': str(e)}).encode(), None
+        except Exception as e:
+            return 500, 'application/json', json.dumps({'error': f"{type(e).__name__}: {e}"}).encode(), None
+        finally:
+            with self.cache_lock:
+                self.metrics['requests'][route] = self.metrics['requests'].get(route, 0) + 1
+                self.metrics['seconds'][route] = self.metrics['seconds'].get(route, 0.0) + time.perf_counter() - start
+
+    def render_metrics(self):
+        """Prometheus text exposition of request counters and latencies."""
+        with self.cache_lock:
+            metrics = dict(self.metrics, requests=dict(self.metrics['requests']), seconds=dict(self.metrics['seconds']))
+        lines = [
+            '# TYPE paint_requests_total counter',
+            *[f'paint_requests_total{{endpoint="{route}"}} {count}' for route, count in metrics['requests'].items()],
+            '# TYPE paint_request_seconds_total counter',
+            *[f'paint_request_seconds_total{{endpoint="{route}"}} {seconds:.6f}'
+              for route, seconds in metrics['seconds'].items()],
+            '# TYPE paint_cache_hits_total counter',
+            f"paint_cache_hits_total {metrics['cache_hits']}",
+            '# TYPE paint_not_modified_total counter',
+            f"paint_not_modified_total {metrics['not_modified']}",
+            '# TYPE paint_data_reloads_total counter',
+            f"paint_data_reloads_total {metrics['reloads']}",
+            '# TYPE paint_batches gauge',
+            f"paint_batches {len(self.analyzer.batch_df)}",
+            '# TYPE paint_events gauge',
+            f"paint_events {len(self.analyzer.df)}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def make_handler(service):
+    """Request handler class bound to a service instance."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, content_type, body, etag = service.respond(url.path, url.query, self.headers.get('If-None-Match'))
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(data_path, host='0.0.0.0', port=8000, model_path=None, n_workers=2, enable_sql=False):
+    """Run the service until interrupted."""
+    service = AnalysisService(data_path, model_path=model_path, n_workers=n_workers, enable_sql=enable_sql)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving paint quality analysis on http://{host}:{port} ({len(service.analyzer.batch_df)} batches)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
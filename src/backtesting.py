@@ -0,0 +1,212 @@
+"""
+Time-Based Backtesting for the Batch Failure Model
+Rolling-origin evaluation over Production_Date_first: train on the past,
+score the following window, and track discrimination, calibration and
+scoring latency window by window.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import brier_score_loss, roc_auc_score
+
+from hyperparameter_tuning import make_model
+from paint_analysis import MODEL_FEATURES
+
+# Model used when no tuning results are available (matches build_predictive_model)
+DEFAULT_MODEL = ('Random Forest', {'n_estimators': 100})
+
+
+def expected_calibration_error(y_true, y_prob, n_bins=10):
+    """Weighted mean gap between predicted and observed failure rate per probability bin."""
+    bins = np.minimum((y_prob * n_bins).astype(int), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    predicted = np.bincount(bins, weights=y_prob, minlength=n_bins)
+    observed = np.bincount(bins, weights=y_true, minlength=n_bins)
+    occupied = counts > 0
+    gaps = np.abs(predicted[occupied] - observed[occupied]) / counts[occupied]
+    return float((gaps * counts[occupied]).sum() / counts.sum())
+
+
+# Per-process copy of the backtest data, installed once by the pool initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(X, y, family, params):
+    """Install the date-sorted model matrix and model spec in the current process."""
+    _WORKER_STATE.update(X=X, y=y, family=family, params=params)
+
+
+def _score(y_true, y_prob):
+    """AUC and calibration metrics for one scored window."""
+    auc = roc_auc_score(y_true, y_prob) if len(np.unique(y_true)) == 2 else np.nan
+    return {
+        'AUC': auc,
+        'Brier_Score': brier_score_loss(y_true, y_prob),
+        'Calibration_Error': expected_calibration_error(y_true, y_prob),
+        'Mean_Predicted': float(y_prob.mean()),
+        'Observed_Failure_Rate': float(y_true.mean())
+    }
+
+
+def _fit_window(task):
+    """Fit on one training slice and score the following test slice."""
+    window_id, train_start, train_end, test_start, test_end = task
+    X, y = _WORKER_STATE['X'], _WORKER_STATE['y']
+    X_train, y_train = X[train_start:train_end], y[train_start:train_end]
+    X_test, y_test = X[test_start:test_end], y[test_start:test_end]
+
+    fit_start = time.perf_counter()
+    model = make_model(_WORKER_STATE['family'], _WORKER_STATE['params']).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+
+    score_start = time.perf_counter()
+    y_prob = model.predict_proba(X_test)[:, 1]
+    score_seconds = time.perf_counter() - score_start
+
+    metrics = _score(y_test, y_prob)
+    metrics.update({
+        'Window': window_id,
+        'Fit_Seconds': fit_seconds,
+        'Scoring_Latency_ms': score_seconds * 1000 / max(len(y_test), 1)
+    })
+    return metrics, model if window_id == 0 else None
+
+
+class RollingOriginBacktester:
+    """Rolling-origin backtest of the batch failure model over production dates."""
+
+    def __init__(self, analyzer, initial_train_days=90, horizon_days=14, step_days=None,
+                 window='expanding', model_spec=None, n_jobs=None):
+        """Initialize with an analyzer whose batch-level data is loaded."""
+        if window not in ('expanding', 'sliding'):
+            raise ValueError(f"Unknown window type: {window}")
+        self.analyzer = analyzer
+        self.initial_train_days = initial_train_days
+        self.horizon_days = horizon_days
+        self.step_days = step_days or horizon_days
+        self.window = window
+        self.model_spec = model_spec
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+
+    def _model_spec(self):
+        """Use the tuned winner when available, otherwise the default forest."""
+        if self.model_spec is not None:
+            return self.model_spec
+        tuning = self.analyzer.analysis_results.get('hyperparameter_tuning')
+        if tuning:
+            return tuning['best_family'], tuning['best_params']
+        return DEFAULT_MODEL
+
+    def _prepare_data(self):
+        """Date-sorted model matrix, labels and production dates."""
+        model_data = self.analyzer.batch_df[MODEL_FEATURES + ['Failed', 'Production_Date_first']].dropna()
+        model_data = model_data.sort_values('Production_Date_first', kind='stable')
+        X = model_data[MODEL_FEATURES].to_numpy(dtype=float)
+        y = model_data['Failed'].to_numpy()
+        dates = model_data['Production_Date_first'].to_numpy(dtype='datetime64[ns]')
+        return X, y, dates
+
+    def windows(self, dates):
+        """Row slices (window, train_start, train_end, test_start, test_end) for each origin."""
+        first = dates[0]
+        train_span = np.timedelta64(self.initial_train_days, 'D')
+        horizon = np.timedelta64(self.horizon_days, 'D')
+        step = np.timedelta64(self.step_days, 'D')
+
+        tasks = []
+        origin = first + train_span
+        while origin < dates[-1]:
+            train_from = first if self.window == 'expanding' else origin - train_span
+            train_start, train_end, test_end = np.searchsorted(dates, [train_from, origin, origin + horizon])
+            if test_end > train_end and train_end > train_start:
+                tasks.append((len(tasks), int(train_start), int(train_end), int(train_end), int(test_end)))
+            origin = origin + step
+        return tasks
+
+    def run(self):
+        """Backtest every window in parallel and store the per-window report."""
+        print("\n=== ROLLING-ORIGIN BACKTEST ===")
+        X, y, dates = self._prepare_data()
+        family, params = self._model_spec()
+        tasks = self.windows(dates)
+        if not tasks:
+            raise ValueError("Not enough history for a single backtest window")
+
+        # A classifier cannot be fitted on a single outcome: skip (and report) such training slices
+        single_class = [task for task in tasks if len(np.unique(y[task[1]:task[2]])) < 2]
+        skipped = pd.DataFrame({
+            'Train_Start': [pd.Timestamp(dates[task[1]]) for task in single_class],
+            'Origin': [pd.Timestamp(dates[task[3]]) for task in single_class],
+            'Train_Batches': [task[2] - task[1] for task in single_class],
+            'Reason': 'single-class training window',
+        }, columns=['Train_Start', 'Origin', 'Train_Batches', 'Reason'])
+        tasks = [(window_id,) + task[1:] for window_id, task in enumerate(t for t in tasks if t not in single_class)]
+        if not tasks:
+            raise ValueError("No backtest window has both outcomes in its training data; widen the window")
+
+        print(f"Model: {family} {params}")
+        print(f"Windows: {len(tasks)} ({self.window}, {self.initial_train_days}d initial train, {self.horizon_days}d horizon)")
+        if len(skipped):
+            print(f"Skipped {len(skipped)} windows whose training data has a single outcome "
+                  f"(origins {skipped['Origin'].min().date()} to {skipped['Origin'].max().date()})")
+
+        if self.n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(X, y, family, params)) as executor:
+                outputs = list(executor.map(_fit_window, tasks))
+        else:
+            _init_worker(X, y, family, params)
+            outputs = [_fit_window(task) for task in tasks]
+
+        # Frozen model from the first origin shows how fast performance decays without retraining
+        frozen_model = outputs[0][1]
+        rows = []
+        for (window_id, train_start, train_end, test_start, test_end), (metrics, _) in zip(tasks, outputs):
+            frozen = _score(y[test_start:test_end], frozen_model.predict_proba(X[test_start:test_end])[:, 1])
+            metrics.update({
+                'Train_Start': pd.Timestamp(dates[train_start]),
+                'Origin': pd.Timestamp(dates[test_start]),
+                'Test_End': pd.Timestamp(dates[test_end - 1]),
+                'Train_Batches': train_end - train_start,
+                'Test_Batches': test_end - test_start,
+                'Frozen_AUC': frozen['AUC'],
+                'Days_Since_First_Origin': int((dates[test_start] - dates[tasks[0][3]]) // np.timedelta64(1, 'D'))
+            })
+            rows.append(metrics)
+
+        report = pd.DataFrame(rows).set_index('Window')
+        columns = ['Train_Start', 'Origin', 'Test_End', 'Train_Batches', 'Test_Batches', 'AUC',
+                   'Frozen_AUC', 'Brier_Score', 'Calibration_Error', 'Mean_Predicted',
+                   'Observed_Failure_Rate', 'Fit_Seconds', 'Scoring_Latency_ms', 'Days_Since_First_Origin']
+        report = report[columns]
+
+        summary = {
+            'mean_auc': report['AUC'].mean(),
+            'mean_frozen_auc': report['Frozen_AUC'].mean(),
+            'mean_calibration_error': report['Calibration_Error'].mean(),
+            'mean_scoring_latency_ms': report['Scoring_Latency_ms'].mean(),
+            'auc_decay_per_30_days': self._decay_rate(report)
+        }
+
+        metrics = ['AUC', 'Frozen_AUC', 'Calibration_Error', 'Scoring_Latency_ms']
+        print(report[['Origin', 'Test_Batches'] + metrics].round(dict.fromkeys(metrics, 4)))
+        print(f"\nMean retrained AUC: {summary['mean_auc']:.4f}")
+        print(f"Mean frozen-model AUC: {summary['mean_frozen_auc']:.4f}")
+        print(f"Frozen AUC change per 30 days: {summary['auc_decay_per_30_days']:+.4f}")
+
+        results = {'model': (family, params), 'windows': report, 'skipped_windows': skipped, 'summary': summary}
+        self.analyzer.analysis_results['backtest'] = results
+        return results
+
+    @staticmethod
+    def _decay_rate(report):
+        """Slope of frozen-model AUC against days since the first origin, per 30 days."""
+        valid = report[['Days_Since_First_Origin', 'Frozen_AUC']].dropna()
+        if len(valid) < 2 or valid['Days_Since_First_Origin'].nunique() < 2:
+            return np.nan
+        slope = np.polyfit(valid['Days_Since_First_Origin'], valid['Frozen_AUC'], 1)[0]
+        return slope * 30
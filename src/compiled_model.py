@@ -0,0 +1,190 @@
+"""
+Compiled Models for Fast Scoring
+Flattens fitted scikit-learn tree ensembles and logistic models into plain
+NumPy arrays so batches can be scored without importing scikit-learn.
+Both compiled forms also explain individual predictions: exact path-dependent
+TreeSHAP values for forests and closed-form contributions for logistic models.
+"""
+
+import numpy as np
+
+
+class CompiledForest:
+    """Tree ensemble flattened into concatenated node arrays."""
+
+    def __init__(self, estimators):
+        """Flatten fitted decision trees (each with a ``tree_`` attribute)."""
+        lefts, rights, features, thresholds, values, covers, roots = [], [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            leaf = left == -1
+            # Leaves point at themselves so every sample can take the same number of steps
+            node_ids = np.arange(tree.node_count) + offset
+            lefts.append(np.where(leaf, node_ids, left + offset))
+            rights.append(np.where(leaf, node_ids, right + offset))
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+            counts = tree.value[:, 0, :]
+            values.append(counts[:, -1] / counts.sum(axis=1))
+            covers.append(tree.weighted_n_node_samples.astype(np.float64))
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.value = np.concatenate(values)
+        self.cover = np.concatenate(covers)
+        self.roots = np.array(roots, dtype=np.int64)
+        self.max_depth = depth
+        self.n_features = int(getattr(estimators[0], 'n_features_in_', self.feature.max() + 1))
+        self._paths = None
+
+    @property
+    def expected_value(self):
+        """Mean predicted probability under the training cover (the SHAP base value)."""
+        return float(self.value[self.roots].mean())
+
+    def _leaf_paths(self):
+        """Leaves grouped by number of distinct path features, each as array blocks.
+
+        Repeated splits on one feature merge into an interval (low, high] and
+        a product of cover fractions, as TreeSHAP does for duplicated features.
+        """
+        if self._paths is not None:
+            return self._paths
+        groups = {}
+        for root in self.roots:
+            stack = [(root, {})]
+            while stack:
+                node, path = stack.pop()
+                left, right = self.left[node], self.right[node]
+                if left == node:
+                    items = sorted(path.items())
+                    groups.setdefault(len(items), []).append(
+                        (self.value[node] / len(self.roots), [f for f, _ in items], [b for _, b in items]))
+                    continue
+                feature, threshold = self.feature[node], self.threshold[node]
+                for child, is_left in ((left, True), (right, False)):
+                    low, high, zero = path.get(feature, (-np.inf, np.inf, 1.0))
+                    bounds = (low, min(high, threshold)) if is_left else (max(low, threshold), high)
+                    stack.append((child, {**path, feature: (*bounds, zero * self.cover[child] / self.cover[node])}))
+
+        self._paths = {}
+        for depth, leaves in groups.items():
+            bounds = np.array([b for _, _, b in leaves], dtype=np.float64).reshape(len(leaves), depth, 3)
+            self._paths[depth] = {
+                'value': np.array([v for v, _, _ in leaves]),
+                'feature': np.array([f for _, f, _ in leaves], dtype=np.int64).reshape(len(leaves), depth),
+                'low': bounds[:, :, 0],
+                'high': bounds[:, :, 1],
+                'zero': bounds[:, :, 2],
+            }
+        return self._paths
+
+    def explain(self, X, max_elements=4_000_000):
+        """Per-feature SHAP values of the positive-class probability (rows sum to prediction - expected_value).
+
+        A leaf with distinct path features U, cover fractions z_f and sample
+        indicators o_f adds v * (o_i - z_i) * B_i to feature i, where B_i is
+        the Shapley-weighted sum over subsets. Since the weights are Beta
+        integrals, B_i = integral_0^1 prod_{f != i} (z_f + t (o_f - z_f)) dt,
+        a polynomial of degree |U| - 1 that Gauss-Legendre quadrature
+        integrates exactly. All leaves with the same |U| and a chunk of
+        samples are processed as one array operation.
+        """
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        phi = np.zeros((len(X), self.n_features))
+        for depth, block in self._leaf_paths().items():
+            if depth == 0:
+                continue
+            nodes, node_weights = np.polynomial.legendre.leggauss((depth + 1) // 2)
+            nodes, node_weights = (nodes + 1) / 2, node_weights / 2
+            scatter = np.eye(self.n_features)[block['feature'].ravel()]
+            chunk_size = max(1, max_elements // (len(block['value']) * depth))
+            for start in range(0, len(X), chunk_size):
+                values = X[start:start + chunk_size][:, block['feature']]
+                one = ((values > block['low']) & (values <= block['high'])).astype(np.float64)
+                slope = one - block['zero']
+                integral = np.zeros_like(one)
+                for t, weight in zip(nodes, node_weights):
+                    factors = block['zero'] + t * slope
+                    integral += weight * factors.prod(axis=-1, keepdims=True) / factors
+                contribution = block['value'][:, None] * slope * integral
+                phi[start:start + chunk_size] += contribution.reshape(len(values), -1) @ scatter
+        return phi
+
+    def predict_proba(self, X, chunk_size=65536):
+        """Class probabilities averaged over trees, as in RandomForestClassifier."""
+        # Trees split on float32 inputs, so round the same way before comparing
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        positive = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start:start + chunk_size]
+            rows = np.arange(len(chunk))[:, None]
+            node = np.broadcast_to(self.roots, (len(chunk), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                go_left = chunk[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            positive[start:start + chunk_size] = self.value[node].mean(axis=1)
+        return np.column_stack([1 - positive, positive])
+
+
+class CompiledLogistic:
+    """Standardize-then-logistic model as closed-form arrays."""
+
+    def __init__(self, coef, intercept, mean=None, scale=None):
+        """Store coefficients and optional standardization parameters."""
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(np.ravel(intercept)[0])
+        self.mean = np.zeros_like(self.coef) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones_like(self.coef) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    def predict_proba(self, X):
+        """Class probabilities from the logistic link."""
+        z = ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale) @ self.coef + self.intercept
+        positive = 1 / (1 + np.exp(-z))
+        return np.column_stack([1 - positive, positive])
+
+    @property
+    def expected_value(self):
+        """Log-odds at the standardization mean (the base of the contributions)."""
+        return self.intercept
+
+    def explain(self, X):
+        """Exact per-feature contributions to the log-odds relative to the standardization mean."""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale * self.coef
+
+
+def compile_model(model, scaler=None):
+    """Compile a fitted model, or return None when it has no compiled form.
+
+    Supports random forests / extra trees / single decision trees, and
+    logistic regression either bare, with a separate StandardScaler, or
+    inside a StandardScaler pipeline.
+    """
+    steps = getattr(model, 'steps', None)
+    if steps is not None:
+        if len(steps) == 2 and hasattr(steps[0][1], 'mean_'):
+            return compile_model(steps[1][1], scaler=steps[0][1])
+        if len(steps) == 1:
+            return compile_model(steps[0][1], scaler=scaler)
+        return None
+
+    if hasattr(model, 'tree_'):
+        return CompiledForest([model])
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is not None and all(hasattr(estimator, 'tree_') for estimator in estimators):
+        return CompiledForest(estimators)
+
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_') and model.coef_.shape[0] == 1:
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        return CompiledLogistic(model.coef_, model.intercept_, mean, scale)
+    return None
@@ -0,0 +1,178 @@
+"""
+Shared Data Access for Paint Quality Analysis
+Loads the dosing-event table once per process and derives the batch and
+station tables from it, so the analyzer and every validation script share
+one cached copy of the data and one copy of the aggregation logic.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATA_PATH = os.environ.get(
+    'PAINT_DATA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'paint_production_data.csv')
+)
+
+# Batch-level aggregation of dosing events (columns are flattened to <column>_<agg>)
+BATCH_AGGREGATIONS = {
+    'Production_Date': 'first',
+    'Recipe_Name': 'first',
+    'Num_Ingredients': 'first',
+    'QC_Result': 'first',
+    'Facility_Temperature': 'mean',
+    'Dosing_Error_Abs': ['mean', 'max', 'std', 'sum'],
+    'Dosing_Error_Rel': ['mean', 'max', 'std'],
+    'Target_Amount': 'sum',
+    'Actual_Amount': 'sum',
+    'Dosing_Station': 'nunique'
+}
+
+
+def add_dosing_errors(df):
+    """Add absolute and relative dosing error columns in place."""
+    # Computed into one buffer per column, in the amounts' dtype (float32 under a memory budget)
+    target = df['Target_Amount'].to_numpy()
+    error = np.subtract(df['Actual_Amount'].to_numpy(), target)
+    np.abs(error, out=error)
+    df['Dosing_Error_Abs'] = error
+    df['Dosing_Error_Rel'] = np.divide(error, target)
+    return df
+
+
+def aggregate_batches(df, aggregations=BATCH_AGGREGATIONS):
+    """Group events by Batch_ID with rounded numeric results, columns flattened to <column>_<agg>."""
+    batch_agg = df.groupby('Batch_ID').agg(aggregations)
+    # Round column by column rather than through a copy of the whole numeric block
+    for column in batch_agg.select_dtypes('number').columns:
+        batch_agg[column] = batch_agg[column].round(4)
+
+    # Flatten column names
+    batch_agg.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_agg.columns]
+    return batch_agg.reset_index()
+
+
+def build_batch_table(df, n_jobs=1, groupby=None):
+    """Aggregate dosing events to one row per batch with a binary Failed target.
+
+    With n_jobs other than 1, batches are aggregated in parallel partitions
+    (n_jobs=None or 0 uses every core); an open ParallelGroupBy over df is
+    reused instead of partitioning the events again.
+    """
+    if groupby is not None:
+        return groupby.batch_table()
+    if n_jobs != 1:
+        from parallel_groupby import ParallelGroupBy
+
+        with ParallelGroupBy(df, n_jobs=n_jobs) as groupby:
+            return groupby.batch_table()
+    if 'Dosing_Error_Abs' not in df.columns:
+        add_dosing_errors(df)
+
+    batch_agg = aggregate_batches(df)
+
+    # Create binary target
+    batch_agg['Failed'] = (batch_agg['QC_Result_first'] == 'failed').astype(int)
+    return batch_agg
+
+
+def build_station_table(df, sketches=None, n_jobs=1, groupby=None):
+    """Per-station dosing error statistics and event-level failure rate.
+
+    With DosingErrorSketches, robust Error_P50/P95/P99 columns are added;
+    n_jobs other than 1 (or an open ParallelGroupBy over df) merges
+    per-partition sums from a process pool.
+    """
+    if groupby is not None:
+        station_analysis = groupby.station_table().set_index('Dosing_Station')
+    elif n_jobs != 1:
+        from parallel_groupby import ParallelGroupBy
+
+        with ParallelGroupBy(df, n_jobs=n_jobs) as groupby:
+            station_analysis = groupby.station_table().set_index('Dosing_Station')
+    else:
+        if 'Dosing_Error_Abs' not in df.columns:
+            add_dosing_errors(df)
+
+        station_analysis = df.groupby('Dosing_Station').agg({
+            'Dosing_Error_Abs': ['mean', 'std', 'count'],
+            'QC_Result': lambda x: (x == 'failed').mean()
+        }).round(4)
+
+        station_analysis.columns = ['Mean_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
+    if sketches is not None:
+        quantiles = sketches.quantiles('station').drop(columns='Count').round(4)
+        station_analysis = station_analysis.join(quantiles.add_prefix('Error_'))
+    return station_analysis.reset_index()
+
+
+def data_version(path):
+    """Cheap fingerprint of the input: file size/mtime, or the event-store manifest / archive index."""
+    if os.path.isdir(path):
+        from event_archive import INDEX, EventArchive
+
+        path = os.path.join(path, INDEX if EventArchive.is_archive(path) else 'manifest.json')
+    if not os.path.exists(path):
+        return 'missing'
+    stat = os.stat(path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def _cache_key(path):
+    """Absolute path plus modification time, so edited files are reloaded."""
+    path = os.path.abspath(path or DEFAULT_DATA_PATH)
+    return path, os.path.getmtime(path)
+
+
+@lru_cache(maxsize=4)
+def _raw_event_table(path, mtime):
+    return pd.read_csv(path)
+
+
+@lru_cache(maxsize=4)
+def _event_table(path, mtime):
+    df = _raw_event_table(path, mtime).copy()
+    df['Production_Date'] = pd.to_datetime(df['Production_Date'])
+    return add_dosing_errors(df)
+
+
+@lru_cache(maxsize=4)
+def _batch_table(path, mtime):
+    return build_batch_table(_event_table(path, mtime))
+
+
+@lru_cache(maxsize=4)
+def _station_table(path, mtime):
+    return build_station_table(_event_table(path, mtime))
+
+
+# The loaders return shallow copies: callers may add columns freely but should
+# copy before modifying existing values, since the underlying data is shared.
+
+def load_event_table(path=None, raw=False):
+    """Dosing events with parsed dates and dosing error columns (cached).
+
+    raw=True returns the CSV exactly as read (for validation, which must see
+    malformed values), from the same cached read.
+    """
+    return (_raw_event_table if raw else _event_table)(*_cache_key(path)).copy(deep=False)
+
+
+def load_batch_table(path=None):
+    """Batch-level table built by build_batch_table (cached)."""
+    return _batch_table(*_cache_key(path)).copy(deep=False)
+
+
+def load_station_table(path=None):
+    """Station-level table built by build_station_table (cached)."""
+    return _station_table(*_cache_key(path)).copy(deep=False)
+
+
+def clear_cache():
+    """Drop all cached tables."""
+    _raw_event_table.cache_clear()
+    _event_table.cache_clear()
+    _batch_table.cache_clear()
+    _station_table.cache_clear()
@@ -0,0 +1,271 @@
+"""
+Data Quality Engine for Dosing Events
+Applies schema, range, cross-field and outlier rules to the raw event table
+in a single vectorized pass, returns a clean typed frame, and writes rejected
+rows to a quarantine partition with reason codes.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Expected event schema: column -> clean dtype
+EVENT_SCHEMA = {
+    'Batch_ID': 'str',
+    'Production_Date': 'datetime64[ns]',
+    'Production_Time': 'str',
+    'Recipe_Name': 'str',
+    'Num_Ingredients': 'int64',
+    'Dosing_Station': 'str',
+    'Target_Amount': 'float64',
+    'Actual_Amount': 'float64',
+    'Facility_Temperature': 'float64',
+    'QC_Result': 'str'
+}
+
+# Columns without which an event cannot be attributed to a batch, station or outcome
+KEY_COLUMNS = ['Batch_ID', 'Production_Date', 'Recipe_Name', 'Num_Ingredients',
+               'Dosing_Station', 'Target_Amount', 'QC_Result']
+
+# Reason codes are bit flags so one row can carry several; the action says what happens
+# to a flagged row: drop the row, drop its whole batch, or blank the offending value
+REASON_CODES = {
+    'MISSING_KEY': (1 << 0, 'reject'),
+    'BAD_DATE': (1 << 1, 'reject'),
+    'BAD_TIME': (1 << 2, 'reject'),
+    'BAD_STATION': (1 << 3, 'reject'),
+    'BAD_QC_RESULT': (1 << 4, 'reject'),
+    'NONPOSITIVE_TARGET': (1 << 5, 'reject'),
+    'NEGATIVE_ACTUAL': (1 << 6, 'reject'),
+    'DOSING_RATIO': (1 << 7, 'reject'),
+    'DOSING_OUTLIER': (1 << 8, 'reject'),
+    'DUPLICATE_EVENT': (1 << 9, 'reject'),
+    'INCONSISTENT_BATCH': (1 << 10, 'reject_batch'),
+    'EXCESS_EVENTS': (1 << 11, 'reject_batch'),
+    'IMPLAUSIBLE_TEMPERATURE': (1 << 12, 'nullify'),
+}
+
+QC_VALUES = ('passed', 'failed')
+STATION_PATTERN = r'D\d{2}'
+
+
+def _broadcast(codes, values, fill):
+    """Map per-distinct-value results back to rows (missing values get ``fill``)."""
+    return np.append(np.asarray(values), fill).take(codes)
+
+
+def decode_reasons(reasons):
+    """Turn reason bitmasks into '|'-joined reason code names."""
+    reasons = np.asarray(reasons)
+    codes, uniques = pd.factorize(reasons)
+    names = np.array([
+        '|'.join(name for name, (bit, _) in REASON_CODES.items() if value & bit)
+        for value in uniques
+    ], dtype=object)
+    return names.take(codes)
+
+
+class DataQualityEngine:
+    """Vectorized rule engine for the dosing-event table."""
+
+    def __init__(self, ratio_bounds=(0.2, 5.0), temperature_bounds=(-10.0, 60.0),
+                 outlier_threshold=8.0, quarantine_dir=None):
+        """Configure rule thresholds and where rejected rows are written."""
+        self.ratio_bounds = ratio_bounds
+        self.temperature_bounds = temperature_bounds
+        self.outlier_threshold = outlier_threshold
+        self.quarantine_dir = quarantine_dir
+
+    def _row_reasons(self, df, factorized):
+        """Bitmask of reason codes per event, plus the parsed dates and int64 production timestamps.
+
+        Every text column is factorized once up front; missing-value, membership,
+        parsing, duplicate and per-batch consistency checks then run on the
+        integer codes and the (few) distinct values instead of on Python strings.
+        """
+        flag = {name: bit for name, (bit, _) in REASON_CODES.items()}
+        reasons = np.zeros(len(df), dtype=np.uint32)
+        codes = {column: column_codes for column, (column_codes, _) in factorized.items()}
+        uniques = {column: pd.Series(column_uniques, dtype=object)
+                   for column, (_, column_uniques) in factorized.items()}
+
+        # Schema: required keys present, types coercible
+        target = pd.to_numeric(df['Target_Amount'], errors='coerce').to_numpy(dtype=float)
+        actual = pd.to_numeric(df['Actual_Amount'], errors='coerce').to_numpy(dtype=float)
+        ingredients = pd.to_numeric(df['Num_Ingredients'], errors='coerce').to_numpy(dtype=float)
+        missing_key = np.isnan(target) | np.isnan(ingredients) | (ingredients != np.round(ingredients))
+        for column in KEY_COLUMNS:
+            if column in codes:
+                missing_key |= codes[column] < 0
+        reasons[missing_key] |= flag['MISSING_KEY']
+
+        parsed = pd.to_datetime(uniques['Production_Date'], format='%Y-%m-%d', errors='coerce')
+        dates = _broadcast(codes['Production_Date'], parsed.to_numpy(dtype='datetime64[ns]'),
+                           np.datetime64('NaT', 'ns'))
+        reasons[np.isnat(dates) & (codes['Production_Date'] >= 0)] |= flag['BAD_DATE']
+        parsed_time = pd.to_datetime(uniques['Production_Time'], format='%H:%M:%S', errors='coerce')
+        bad_time = parsed_time.isna()
+        # A missing time is a bad time too: clean rows always carry a real timestamp
+        reasons[_broadcast(codes['Production_Time'], bad_time, True)] |= flag['BAD_TIME']
+        time_of_day = (parsed_time - parsed_time.dt.normalize()).to_numpy(dtype='timedelta64[ns]')
+        timestamps = (dates + _broadcast(codes['Production_Time'], time_of_day, np.timedelta64('NaT', 'ns'))
+                      ).view(np.int64)
+        bad_station = ~uniques['Dosing_Station'].astype(str).str.fullmatch(STATION_PATTERN)
+        reasons[_broadcast(codes['Dosing_Station'], bad_station, False)] |= flag['BAD_STATION']
+        bad_qc = ~uniques['QC_Result'].isin(QC_VALUES)
+        reasons[_broadcast(codes['QC_Result'], bad_qc, False)] |= flag['BAD_QC_RESULT']
+
+        # Ranges and the actual-vs-target ratio (missing actuals are tolerated, not rejected)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = actual / target
+        reasons[target <= 0] |= flag['NONPOSITIVE_TARGET']
+        reasons[actual < 0] |= flag['NEGATIVE_ACTUAL']
+        low, high = self.ratio_bounds
+        reasons[(target > 0) & (actual >= 0) & ((ratio < low) | (ratio > high))] |= flag['DOSING_RATIO']
+
+        temperature = pd.to_numeric(df['Facility_Temperature'], errors='coerce').to_numpy(dtype=float)
+        low, high = self.temperature_bounds
+        reasons[(temperature < low) | (temperature > high)] |= flag['IMPLAUSIBLE_TEMPERATURE']
+
+        # Outliers: signed dosing error far from its station's median, in MAD units
+        station_codes = codes['Dosing_Station']
+        station_index = np.maximum(station_codes, 0)
+        error = actual - target
+        valid = (station_codes >= 0) & ~np.isnan(error)
+        n_stations = len(uniques['Dosing_Station'])
+        median = pd.Series(error[valid]).groupby(station_codes[valid]).median().reindex(range(n_stations)).to_numpy()
+        deviation = np.abs(error - median.take(station_index))
+        mad = pd.Series(deviation[valid]).groupby(station_codes[valid]).median().reindex(range(n_stations)).to_numpy()
+        scale = 1.4826 * mad.take(station_index)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            robust_z = deviation / scale
+        reasons[valid & (scale > 0) & (robust_z > self.outlier_threshold)] |= flag['DOSING_OUTLIER']
+
+        # Exact duplicate events (keep the first occurrence), compared on integer codes
+        row_codes = dict(codes)
+        for column in ('Num_Ingredients', 'Target_Amount', 'Actual_Amount', 'Facility_Temperature'):
+            row_codes[column] = pd.factorize(df[column])[0]
+        duplicate = pd.DataFrame(row_codes).duplicated().to_numpy()
+        reasons[duplicate] |= flag['DUPLICATE_EVENT']
+
+        # Cross-field batch rules: one recipe/complexity/outcome per batch, no more events than ingredients
+        batch_codes = codes['Batch_ID']
+        has_batch = batch_codes >= 0
+        n_batches = len(uniques['Batch_ID'])
+        per_batch = pd.DataFrame({
+            'Recipe_Name': np.where(codes['Recipe_Name'] >= 0, codes['Recipe_Name'], np.nan),
+            'Num_Ingredients': ingredients,
+            'QC_Result': np.where(codes['QC_Result'] >= 0, codes['QC_Result'], np.nan)
+        })[has_batch].groupby(batch_codes[has_batch])
+        low, high = per_batch.min(), per_batch.max()
+        inconsistent = (high > low).any(axis=1).reindex(range(n_batches), fill_value=False).to_numpy()
+        events = np.bincount(batch_codes[has_batch & ~duplicate], minlength=n_batches)  # duplicates are dropped anyway
+        declared = high['Num_Ingredients'].reindex(range(n_batches)).to_numpy()
+        excess = events > declared
+
+        batch_index = np.maximum(batch_codes, 0)
+        reasons[has_batch & inconsistent.take(batch_index)] |= flag['INCONSISTENT_BATCH']
+        reasons[has_batch & excess.take(batch_index)] |= flag['EXCESS_EVENTS']
+        return reasons, dates, timestamps
+
+    def validate(self, df, partition=None):
+        """Split raw events into a clean typed frame and a quarantine frame.
+
+        Returns (clean_df, quarantine_df, report). The quarantine frame keeps the
+        original values plus a Reason_Codes column; when quarantine_dir is set it
+        is also written as one partition per validation run.
+        """
+        start = time.perf_counter()
+        missing_columns = [column for column in EVENT_SCHEMA if column not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+
+        factorized = {column: pd.factorize(df[column]) for column, dtype in EVENT_SCHEMA.items()
+                      if dtype in ('str', 'datetime64[ns]')}
+        reasons, dates, timestamps = self._row_reasons(df, factorized)
+        batch_codes = factorized['Batch_ID'][0]
+
+        action_bits = {action: 0 for action in ('reject', 'reject_batch', 'nullify')}
+        for bit, action in REASON_CODES.values():
+            action_bits[action] |= bit
+        rejected = (reasons & action_bits['reject']) != 0
+        batch_rejected = (reasons & action_bits['reject_batch']) != 0
+        nullify = (reasons & action_bits['nullify']) != 0
+        quarantined = rejected | batch_rejected
+
+        quarantine_df = df[quarantined].copy()
+        quarantine_df['Reason_Codes'] = decode_reasons(reasons[quarantined])
+
+        clean_df = df[~quarantined].copy()
+        clean_df['Production_Date'] = dates[~quarantined]
+        clean_df['Production_Timestamp'] = timestamps[~quarantined]  # ns since epoch, NaT as int64 min
+        for column, dtype in EVENT_SCHEMA.items():
+            if dtype in ('int64', 'float64'):
+                clean_df[column] = pd.to_numeric(clean_df[column], errors='coerce').astype(dtype)
+        clean_df.loc[nullify[~quarantined], 'Facility_Temperature'] = np.nan
+        clean_df = clean_df.reset_index(drop=True)
+
+        # Missing values that survive validation, counted from codes rather than re-scanning strings
+        missing = pd.Series({
+            column: int((factorized[column][0][~quarantined] < 0).sum()) if column in factorized
+            else int(clean_df[column].isna().sum())
+            for column in EVENT_SCHEMA
+        })
+        reason_counts = pd.Series({
+            name: int(((reasons & bit) != 0).sum()) for name, (bit, _) in REASON_CODES.items()
+        })
+        report = {
+            'rows_in': len(df),
+            'rows_clean': len(clean_df),
+            'rows_quarantined': int(quarantined.sum()),
+            'batches_quarantined': int(np.unique(batch_codes[batch_rejected & (batch_codes >= 0)]).size),
+            'values_nullified': int(nullify[~quarantined].sum()),
+            'reason_counts': reason_counts[reason_counts > 0],
+            'missing_values': missing[missing > 0],
+            'seconds': time.perf_counter() - start,
+            'quarantine_path': None
+        }
+        if self.quarantine_dir is not None and len(quarantine_df):
+            report['quarantine_path'] = self.write_quarantine(quarantine_df, partition)
+        return clean_df, quarantine_df, report
+
+    def write_quarantine(self, quarantine_df, partition=None):
+        """Write rejected rows to <quarantine_dir>/ingest=<partition>/rejected.csv."""
+        partition = partition or time.strftime('%Y%m%dT%H%M%S')
+        directory = os.path.join(self.quarantine_dir, f"ingest={partition}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'rejected.csv')
+        quarantine_df.to_csv(path, index=False)
+        return path
+
+    @staticmethod
+    def merge_reports(reports):
+        """Combine the reports of several validation runs (e.g. chunks of one input) into one."""
+        merged = {key: sum(report[key] for report in reports)
+                  for key in ('rows_in', 'rows_clean', 'rows_quarantined', 'batches_quarantined',
+                              'values_nullified', 'seconds')}
+        for key in ('reason_counts', 'missing_values'):
+            merged[key] = pd.concat([report[key] for report in reports]).groupby(level=0, sort=False).sum()
+        # Several partitions: report the quarantine directory holding them
+        paths = [report['quarantine_path'] for report in reports if report['quarantine_path']]
+        merged['quarantine_path'] = paths[0] if len(paths) == 1 else (
+            os.path.dirname(os.path.dirname(paths[0])) if paths else None)
+        return merged
+
+    @staticmethod
+    def print_report(report):
+        """Print a validation report in the analyzer's phase style."""
+        print(f"Rows validated: {report['rows_in']:,} in {report['seconds']:.2f}s")
+        print(f"Clean rows: {report['rows_clean']:,}")
+        print(f"Quarantined rows: {report['rows_quarantined']:,} "
+              f"({report['batches_quarantined']} whole batches)")
+        if report['values_nullified']:
+            print(f"Implausible values blanked: {report['values_nullified']:,}")
+        for name, count in report['reason_counts'].items():
+            print(f"  {name}: {count:,}")
+        if len(report['missing_values']):
+            print(f"Missing values kept (excluded from aggregations):\n{report['missing_values']}")
+        if report['quarantine_path']:
+            print(f"Quarantine written to {report['quarantine_path']}")
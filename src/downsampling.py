@@ -0,0 +1,73 @@
+"""
+Downsampling for Large-Data Charts
+Server-side reduction of event-level series before they reach the browser:
+Largest-Triangle-Three-Buckets (LTTB) and min/max bucketing for time series,
+and 2-D count grids for scatters. Each returns indices or aggregates sized
+by the chart, not by the data.
+"""
+
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """Indices of the n_out points LTTB keeps (first and last always included); x must be sorted."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points; each picks the point forming the largest
+    # triangle with the previously kept point and the mean of the next bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    mean_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    mean_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    mean_x = np.append(mean_x[1:], x[-1])  # the last bucket looks ahead to the final point
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - mean_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y, n_buckets):
+    """Indices of each bucket's minimum and maximum (plus both ends), in order; keeps every spike."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets + 2 >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((np.nan_to_num(y, nan=np.inf), bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    lowest = order[starts]
+    # Highest non-NaN value: NaNs were sorted to the end of each bucket as +inf
+    finite = np.nan_to_num(y, nan=-np.inf)
+    order_high = np.lexsort((finite, bucket))
+    highest = order_high[ends]
+    return np.unique(np.concatenate([[0, n - 1], lowest, highest]))
+
+
+def density_grid(x, y, bins=200, bounds=None):
+    """Counts on a bins x bins grid over (x, y), ignoring NaNs; returns (counts, x centers, y centers).
+
+    ``bounds`` is ((x_min, x_max), (y_min, y_max)); by default the 0.1-99.9
+    percentiles, so a few extreme events do not squash the grid.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if bounds is None:
+        bounds = (tuple(np.percentile(x, [0.1, 99.9])), tuple(np.percentile(y, [0.1, 99.9])))
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=bounds)
+    return counts, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
@@ -0,0 +1,137 @@
+"""
+Time-Partitioned Event Archive
+Compressed column blocks of dosing events sorted by production timestamp,
+partitioned by calendar month, with a sparse index recording each block's
+timestamp range and dosing stations. Time-range and station-filtered reads
+decompress only the blocks whose index entry can match.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_store import _atomic_write, _column_stats
+
+INDEX = 'index.json'
+
+
+def event_timestamps(df):
+    """Production timestamps (date + time of day) as datetime64 values."""
+    if 'Production_Timestamp' in df.columns:
+        return df['Production_Timestamp'].to_numpy(dtype=np.int64).view('datetime64[ns]')
+    dates = pd.to_datetime(df['Production_Date'])
+    return (dates + pd.to_timedelta(df['Production_Time'].astype(str))).to_numpy(dtype='datetime64[ns]')
+
+
+def filter_events(df, start=None, end=None, stations=None):
+    """Rows with start <= timestamp < end at the given stations (each filter optional)."""
+    keep = np.ones(len(df), dtype=bool)
+    if start is not None or end is not None:
+        timestamps = event_timestamps(df)
+        if start is not None:
+            keep &= timestamps >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            keep &= timestamps < np.datetime64(pd.Timestamp(end))
+    if stations is not None:
+        keep &= df['Dosing_Station'].isin(list(stations)).to_numpy()
+    return df[keep].reset_index(drop=True) if not keep.all() else df
+
+
+class EventArchive:
+    """Read side of an archive directory written by EventArchive.write."""
+
+    def __init__(self, directory):
+        """Open an archive by reading its block index."""
+        self.directory = directory
+        with open(os.path.join(directory, INDEX)) as f:
+            self.index = json.load(f)
+        self.stats = {'blocks_total': len(self.index['blocks']), 'blocks_read': 0, 'rows_read': 0}
+
+    def __len__(self):
+        return sum(block['rows'] for block in self.index['blocks'])
+
+    @staticmethod
+    def is_archive(path):
+        """True for a directory holding an archive index."""
+        return os.path.isfile(os.path.join(path, INDEX))
+
+    @classmethod
+    def write(cls, df, directory, block_rows=65536):
+        """Sort events by timestamp and write one compressed block per month (split at block_rows)."""
+        os.makedirs(directory, exist_ok=True)
+        timestamps = event_timestamps(df)
+        order = np.argsort(timestamps, kind='stable')
+        df = df.iloc[order].reset_index(drop=True)
+        timestamps = timestamps[order]
+        months = pd.DatetimeIndex(timestamps).strftime('%Y-%m').to_numpy()
+
+        blocks = []
+        bounds = np.flatnonzero(np.r_[True, months[1:] != months[:-1], True])
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            for start in range(first, last, block_rows):
+                stop = min(start + block_rows, last)
+                blocks.append(cls._write_block(df.iloc[start:stop], timestamps[start:stop], directory,
+                                               f"block-{months[start]}-{len(blocks):05d}.npz"))
+
+        index = {'blocks': blocks, 'schema': {column: str(dtype) for column, dtype in df.dtypes.items()}}
+        payload = json.dumps(index, indent=1).encode()
+        _atomic_write(os.path.join(directory, INDEX), lambda f: f.write(payload))
+        return cls(directory)
+
+    @staticmethod
+    def _write_block(df, timestamps, directory, name):
+        """One compressed column array per field; strings as fixed-width unicode (no pickling)."""
+        arrays, stats = {}, {}
+        for column in df.columns:
+            values = df[column].to_numpy()
+            if values.dtype.kind not in 'biufM':
+                values = df[column].fillna('').astype(str).to_numpy(dtype=str)
+            arrays[column] = values
+            stats[column] = _column_stats(values)
+        _atomic_write(os.path.join(directory, name), lambda f: np.savez_compressed(f, **arrays))
+        return {
+            'file': name,
+            'rows': len(df),
+            'start': int(timestamps[0].astype(np.int64)),
+            'end': int(timestamps[-1].astype(np.int64)),
+            'stations': sorted(df['Dosing_Station'].dropna().astype(str).unique().tolist()),
+            'stats': stats,
+        }
+
+    def blocks(self, start=None, end=None, stations=None):
+        """Index entries of the blocks a filtered read has to decompress."""
+        low = pd.Timestamp(start).value if start is not None else None
+        high = pd.Timestamp(end).value if end is not None else None
+        wanted = set(stations) if stations is not None else None
+        return [block for block in self.index['blocks']
+                if (low is None or block['end'] >= low)
+                and (high is None or block['start'] < high)
+                and (wanted is None or not wanted.isdisjoint(block['stations']))]
+
+    def read_block(self, block, columns=None):
+        """Decompress one block (optionally a subset of columns) as a DataFrame."""
+        with np.load(os.path.join(self.directory, block['file'])) as data:
+            frame = pd.DataFrame({column: data[column] for column in (columns or data.files)})
+        for column in frame.columns:
+            if frame[column].dtype.kind not in 'biufM':
+                frame[column] = frame[column].replace('', np.nan)
+        return frame
+
+    def read(self, start=None, end=None, stations=None, columns=None):
+        """Events with start <= timestamp < end at the given stations, decompressing only matching blocks."""
+        selected = self.blocks(start, end, stations)
+        self.stats.update(blocks_read=len(selected), rows_read=sum(block['rows'] for block in selected))
+
+        # Filter columns are read even when not requested, then dropped
+        needed = None
+        if columns is not None:
+            needed = list(dict.fromkeys(list(columns) + ['Production_Date', 'Production_Time', 'Dosing_Station']))
+        frames = [self.read_block(block, needed) for block in selected]
+        if not frames:
+            schema = self.index['schema']
+            return pd.DataFrame({column: pd.Series(dtype=object) for column in (columns or schema)})
+
+        events = filter_events(pd.concat(frames, ignore_index=True), start, end, stations)
+        return events[list(columns)] if columns is not None else events
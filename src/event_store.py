@@ -0,0 +1,147 @@
+"""
+Columnar Event Store
+Append-only directory of NumPy column segments plus a manifest that records
+the committed segments and each source's commit offset. A segment and its
+offset become visible together through one atomic manifest replace, so a
+crash never leaves half-written data or an offset ahead of the data.
+"""
+
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = 'manifest.json'
+
+
+def _fsync_directory(directory):
+    """Flush directory entries so renames survive power loss (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, write):
+    """Write via a temporary file, fsync it and rename it over ``path``."""
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_directory(os.path.dirname(path) or '.')
+
+
+def _column_stats(values):
+    """Min/max of a numeric or datetime column for segment pruning (None otherwise)."""
+    if values.dtype.kind not in 'iufM' or len(values) == 0:
+        return None
+    if values.dtype.kind == 'M':
+        present = values[~np.isnat(values)]
+        return [str(present.min()), str(present.max())] if len(present) else None
+    if values.dtype.kind == 'f':
+        present = values[~np.isnan(values)]
+        return [float(present.min()), float(present.max())] if len(present) else None
+    return [int(values.min()), int(values.max())]
+
+
+class EventStore:
+    """Append-only columnar store of validated dosing events."""
+
+    def __init__(self, directory, readonly=False):
+        """Open (or create) a store, discarding segments left by an interrupted append.
+
+        A readonly store neither creates the directory nor touches files, so
+        readers can reopen it while a writer is appending.
+        """
+        self.directory = directory
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'segments': [], 'offsets': {}, 'schema': None}
+        if readonly:
+            return
+
+        committed = {segment['file'] for segment in self.manifest['segments']}
+        for name in os.listdir(directory):
+            if name.endswith('.tmp') or (name.endswith('.npz') and name not in committed):
+                os.remove(os.path.join(directory, name))
+
+    def __len__(self):
+        return sum(segment['rows'] for segment in self.manifest['segments'])
+
+    @property
+    def segments(self):
+        """Committed segment descriptors (file, rows, per-column min/max)."""
+        return list(self.manifest['segments'])
+
+    def offset(self, source, default=0):
+        """Last committed offset for a source."""
+        return self.manifest['offsets'].get(source, default)
+
+    def append(self, df, source=None, offset=None, offsets=None):
+        """Write a frame as a new segment and commit it together with the source offset.
+
+        ``offsets`` are further {name: offset} entries committed atomically
+        with it (e.g. the write-ahead-log checkpoint).
+        """
+        segment = None
+        if len(df):
+            segment = self._write_segment(df)
+            self.manifest['segments'].append(segment)
+            if self.manifest['schema'] is None:
+                self.manifest['schema'] = {column: str(dtype) for column, dtype in df.dtypes.items()}
+        if source is not None:
+            self.manifest['offsets'][source] = offset
+        self.manifest['offsets'].update(offsets or {})
+        self._write_manifest()
+        return segment
+
+    def _write_segment(self, df):
+        """Write one column array per field; strings as fixed-width unicode (no pickling)."""
+        name = f"segment-{len(self.manifest['segments']):06d}-{uuid.uuid4().hex[:8]}.npz"
+        arrays, stats = {}, {}
+        for column in df.columns:
+            values = df[column].to_numpy()
+            if values.dtype.kind not in 'biufM':
+                values = df[column].fillna('').astype(str).to_numpy(dtype=str)
+            arrays[column] = values
+            stats[column] = _column_stats(values)
+        _atomic_write(os.path.join(self.directory, name), lambda f: np.savez(f, **arrays))
+        return {'file': name, 'rows': len(df), 'stats': stats}
+
+    def _write_manifest(self):
+        """Atomically publish the manifest."""
+        payload = json.dumps(self.manifest, indent=1).encode()
+        _atomic_write(os.path.join(self.directory, MANIFEST), lambda f: f.write(payload))
+
+    def read_segment(self, segment, columns=None):
+        """Load one segment (optionally a subset of columns) as a DataFrame."""
+        with np.load(os.path.join(self.directory, segment['file'])) as data:
+            names = columns or list(data.files)
+            frame = pd.DataFrame({column: data[column] for column in names})
+        for column in frame.columns:
+            if frame[column].dtype.kind not in 'biufM':
+                frame[column] = frame[column].replace('', np.nan)
+        return frame
+
+    def read(self, columns=None):
+        """All committed events as one DataFrame."""
+        frames = [self.read_segment(segment, columns) for segment in self.manifest['segments']]
+        if not frames:
+            schema = self.manifest['schema'] or {}
+            return pd.DataFrame({column: pd.Series(dtype=object) for column in (columns or schema)})
+        return pd.concat(frames, ignore_index=True)
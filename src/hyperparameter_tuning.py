@@ -0,0 +1,274 @@
+"""
+Hyperparameter Tuning for Paint Quality Models
+Successive halving and Hyperband search over the candidate model families,
+evaluated in parallel worker processes against cached cross-validation folds.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from paint_analysis import MODEL_FEATURES
+
+# Candidate hyperparameters per model family (full grid per family)
+SEARCH_SPACE = {
+    'Logistic Regression': {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'class_weight': [None, 'balanced']
+    },
+    'Random Forest': {
+        'n_estimators': [100, 300],
+        'max_depth': [4, 6, 10, None],
+        'min_samples_leaf': [1, 5, 20],
+        'class_weight': [None, 'balanced']
+    },
+    'Gradient Boosting': {
+        'learning_rate': [0.03, 0.1],
+        'max_depth': [2, 3, 5],
+        'max_iter': [100, 300],
+        'l2_regularization': [0.0, 1.0]
+    }
+}
+
+
+def make_model(family, params):
+    """Instantiate an unfitted model of the given family."""
+    if family == 'Logistic Regression':
+        return make_pipeline(StandardScaler(), LogisticRegression(random_state=42, max_iter=1000, **params))
+    if family == 'Random Forest':
+        return RandomForestClassifier(random_state=42, n_jobs=1, **params)
+    if family == 'Gradient Boosting':
+        return HistGradientBoostingClassifier(random_state=42, **params)
+    raise ValueError(f"Unknown model family: {family}")
+
+
+# Per-process copy of the tuning data, installed once by the pool initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(X, y, folds):
+    """Install features, labels and fold splits in the current process."""
+    _WORKER_STATE.update(X=X, y=y, folds=folds)
+
+
+def _evaluate(task):
+    """Fit one configuration on one fold prefix and return its test AUC."""
+    config_id, family, params, fold, n_samples = task
+    X, y = _WORKER_STATE['X'], _WORKER_STATE['y']
+    train_idx, test_idx = _WORKER_STATE['folds'][fold]
+
+    # Training indices are pre-shuffled, so a prefix is a random subsample
+    train_idx = train_idx[:n_samples]
+    if len(np.unique(y[train_idx])) < 2:
+        return config_id, fold, np.nan
+
+    model = make_model(family, params).fit(X[train_idx], y[train_idx])
+    auc = roc_auc_score(y[test_idx], model.predict_proba(X[test_idx])[:, 1])
+    return config_id, fold, auc
+
+
+class HyperparameterTuner:
+    """Successive-halving hyperparameter search for the batch failure model."""
+
+    def __init__(self, analyzer, search_space=None, n_folds=3, eta=3, min_resources=None,
+                 cutoff_margin=0.05, n_jobs=None, random_state=42):
+        """Initialize with an analyzer whose batch-level data is loaded."""
+        self.analyzer = analyzer
+        self.search_space = search_space or SEARCH_SPACE
+        self.n_folds = n_folds
+        self.eta = eta
+        self.min_resources = min_resources
+        self.cutoff_margin = cutoff_margin
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.random_state = random_state
+        self._folds = None
+        self._leaderboard = []
+
+    def _prepare_data(self):
+        """Extract the model matrix from the analyzer's batch data."""
+        model_data = self.analyzer.batch_df[MODEL_FEATURES + ['Failed']].dropna()
+        X = model_data[MODEL_FEATURES].to_numpy(dtype=float)
+        y = model_data['Failed'].to_numpy()
+        return X, y
+
+    def _fold_splits(self, y):
+        """Compute stratified folds once, with shuffled training indices."""
+        if self._folds is None or self._folds[0][0].size + self._folds[0][1].size != len(y):
+            rng = np.random.default_rng(self.random_state)
+            splitter = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state)
+            self._folds = [(rng.permutation(train_idx), test_idx)
+                           for train_idx, test_idx in splitter.split(np.zeros(len(y)), y)]
+        return self._folds
+
+    def candidates(self):
+        """Enumerate every (family, params) configuration in the search space."""
+        configs = []
+        for family, grid in self.search_space.items():
+            names = list(grid)
+            for values in product(*(grid[name] for name in names)):
+                configs.append((family, dict(zip(names, values))))
+        return configs
+
+    def _map(self, executor, tasks):
+        """Run evaluation tasks in the pool, or in-process when n_jobs == 1."""
+        if executor is None:
+            return list(map(_evaluate, tasks))
+        chunksize = max(1, len(tasks) // (4 * self.n_jobs))
+        return list(executor.map(_evaluate, tasks, chunksize=chunksize))
+
+    def _run_rung(self, executor, configs, n_samples, rung):
+        """Score configurations at one resource level with first-fold cut-off."""
+        fold_scores = {config_id: [] for config_id in configs}
+
+        # Fold 0 for every configuration, then drop the clearly bad ones
+        for config_id, _, auc in self._map(executor, [
+            (config_id, *configs[config_id], 0, n_samples) for config_id in configs
+        ]):
+            fold_scores[config_id].append(auc)
+
+        first_fold = {config_id: scores[0] for config_id, scores in fold_scores.items()}
+        finite = [auc for auc in first_fold.values() if np.isfinite(auc)]
+        threshold = max(finite) - self.cutoff_margin if finite else np.inf
+        survivors = {config_id for config_id, auc in first_fold.items()
+                     if np.isfinite(auc) and auc >= threshold}
+
+        # Remaining folds only for configurations that survived the cut-off
+        for config_id, _, auc in self._map(executor, [
+            (config_id, *configs[config_id], fold, n_samples)
+            for config_id in sorted(survivors) for fold in range(1, self.n_folds)
+        ]):
+            fold_scores[config_id].append(auc)
+
+        scores = {}
+        for config_id, values in fold_scores.items():
+            cut_off = config_id not in survivors
+            mean_auc = np.nanmean(values) if np.isfinite(values).any() else np.nan
+            scores[config_id] = np.nan if cut_off else mean_auc
+            family, params = configs[config_id]
+            self._leaderboard.append({
+                'Family': family,
+                'Params': params,
+                'Rung': rung,
+                'Train_Samples': n_samples,
+                'Folds_Evaluated': len(values),
+                'Mean_AUC': mean_auc,
+                'Cut_Off': cut_off
+            })
+        return scores
+
+    def _successive_halving(self, executor, configs, min_resources, max_resources):
+        """Run one successive-halving bracket and return its best configuration."""
+        n_samples = min_resources
+        rung = 0
+        while True:
+            scores = self._run_rung(executor, configs, n_samples, rung)
+            ranked = sorted((config_id for config_id in configs if np.isfinite(scores[config_id])),
+                            key=lambda config_id: scores[config_id], reverse=True)
+            if not ranked:
+                return None, np.nan
+            if n_samples >= max_resources:
+                return ranked[0], scores[ranked[0]]
+
+            keep = ranked[:max(1, len(configs) // self.eta)]
+            configs = {config_id: configs[config_id] for config_id in keep}
+            # A lone survivor is re-scored at the full budget, so every bracket reports a max_resources AUC
+            n_samples = max_resources if len(keep) == 1 else min(n_samples * self.eta, max_resources)
+            rung += 1
+
+    def _brackets(self, configs, max_resources, method):
+        """Yield (configs, min_resources) for each bracket of the search."""
+        # Enough rungs to halve the full grid down to a single configuration
+        n_rungs = max(0, math.ceil(math.log(len(configs), self.eta)))
+
+        if method == 'successive_halving':
+            default_min = max(100, max_resources // self.eta ** n_rungs)
+            yield configs, min(self.min_resources or default_min, max_resources)
+            return
+
+        if method != 'hyperband':
+            raise ValueError(f"Unknown search method: {method}")
+
+        # Hyperband: trade off number of configurations against starting budget
+        default_floor = max(20, max_resources // self.eta ** n_rungs)
+        floor = min(self.min_resources or default_floor, max_resources)
+        s_max = max(0, int(math.log(max_resources / floor, self.eta)))
+        rng = np.random.default_rng(self.random_state)
+        config_ids = list(configs)
+        for s in range(s_max, -1, -1):
+            n_configs = min(len(config_ids), math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            sampled = rng.choice(config_ids, size=n_configs, replace=False)
+            yield ({int(config_id): configs[int(config_id)] for config_id in sampled},
+                   max(floor, max_resources // self.eta ** s))
+
+    def tune(self, method='successive_halving'):
+        """Search the model families and store the winning model on the analyzer."""
+        print("\n=== HYPERPARAMETER TUNING ===")
+        start = time.perf_counter()
+
+        X, y = self._prepare_data()
+        folds = self._fold_splits(y)
+        max_resources = min(len(train_idx) for train_idx, _ in folds)
+        configs = dict(enumerate(self.candidates()))
+        self._leaderboard = []
+
+        print(f"Search method: {method}")
+        print(f"Candidate configurations: {len(configs)} across {len(self.search_space)} model families")
+        print(f"Worker processes: {self.n_jobs}")
+
+        executor = None
+        if self.n_jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                           initargs=(X, y, folds))
+        else:
+            _init_worker(X, y, folds)
+
+        best_id, best_auc = None, -np.inf
+        try:
+            for bracket_configs, min_resources in self._brackets(configs, max_resources, method):
+                config_id, auc = self._successive_halving(executor, bracket_configs,
+                                                          min_resources, max_resources)
+                if config_id is not None and auc > best_auc:
+                    best_id, best_auc = config_id, auc
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if best_id is None:
+            raise ValueError("No configuration could be evaluated on the available data")
+
+        # Refit the winner on all batches
+        best_family, best_params = configs[best_id]
+        best_model = make_model(best_family, best_params).fit(X, y)
+
+        leaderboard = pd.DataFrame(self._leaderboard)
+        final = leaderboard[~leaderboard['Cut_Off']].sort_values(['Rung', 'Mean_AUC'], ascending=False)
+        elapsed = time.perf_counter() - start
+
+        print(f"\nEvaluations run: {int(leaderboard['Folds_Evaluated'].sum())}")
+        print(f"Configurations cut off early: {int(leaderboard['Cut_Off'].sum())}")
+        print(f"Best model: {best_family} {best_params}")
+        print(f"Cross-validated ROC-AUC: {best_auc:.4f}")
+        print(f"Tuning time: {elapsed:.1f}s")
+
+        results = {
+            'best_family': best_family,
+            'best_params': best_params,
+            'best_cv_auc': best_auc,
+            'best_model': best_model,
+            'features': MODEL_FEATURES,
+            'leaderboard': final.reset_index(drop=True),
+            'tuning_seconds': elapsed
+        }
+        self.analyzer.analysis_results['hyperparameter_tuning'] = results
+        return results
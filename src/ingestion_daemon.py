@@ -0,0 +1,264 @@
+"""
+Asyncio Ingestion Daemon for Dosing Events
+Consumes CSV event lines from a pluggable source (file tail, named pipe or
+Unix socket), validates them in micro-batches and appends them to the
+columnar event store, committing each source offset with its data. Chunks
+are first logged to a write-ahead log, so a restart replays what was read
+but not yet stored instead of losing it or re-reading the source.
+Parsing and validation run in a worker thread so the event loop keeps
+reading while a micro-batch is checked. Validation is per micro-batch:
+batch-level rules (INCONSISTENT_BATCH, EXCESS_EVENTS, DUPLICATE) only see
+the rows of a batch that arrived in the same micro-batch. The analyzer
+validates the store again as a whole when it loads it.
+"""
+
+import asyncio
+import io
+import os
+import time
+
+import pandas as pd
+
+from data_quality import EVENT_SCHEMA, DataQualityEngine
+from event_store import EventStore
+from write_ahead_log import WriteAheadLog
+
+EVENT_COLUMNS = list(EVENT_SCHEMA)
+READ_SIZE = 1 << 20
+
+# Store offset entry recording the last write-ahead-log LSN committed to the store
+WAL_CHECKPOINT = 'wal'
+
+
+def _split_lines(buffer, data):
+    """Complete lines in buffer + data, and the trailing partial line."""
+    buffer += data
+    end = buffer.rfind(b'\n') + 1
+    return buffer[:end].splitlines(), buffer[end:]
+
+
+class FileTailSource:
+    """Lines appended to a file; offsets are byte positions, so ingestion resumes exactly."""
+
+    def __init__(self, path, follow=False, poll_interval=0.2, has_header=True, read_size=READ_SIZE):
+        """Tail ``path``; with follow=False stop at end of file."""
+        self.path = path
+        self.read_size = read_size
+        self.name = f"file:{os.path.abspath(path)}"
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.has_header = has_header
+
+    async def chunks(self, start_offset=0):
+        """Yield (offset after chunk, lines) for each block of complete lines."""
+        with open(self.path, 'rb') as f:
+            if start_offset:
+                f.seek(start_offset)
+            elif self.has_header:
+                f.readline()
+            partial = b''
+            while True:
+                data = f.read(self.read_size)
+                if not data:
+                    if not self.follow:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                lines, partial = _split_lines(partial, data)
+                if lines:
+                    yield f.tell() - len(partial), lines
+                await asyncio.sleep(0)
+
+
+class NamedPipeSource:
+    """Lines written to a FIFO; offsets count lines (a pipe cannot be replayed)."""
+
+    def __init__(self, path):
+        """Read from the named pipe at ``path`` until all writers close it."""
+        self.path = path
+        self.name = f"pipe:{os.path.abspath(path)}"
+
+    async def chunks(self, start_offset=0):
+        """Yield (lines received so far, lines) per read."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=READ_SIZE)
+        pipe = open(self.path, 'rb', buffering=0)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        count, partial = start_offset, b''
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    return
+                lines, partial = _split_lines(partial, data)
+                count += len(lines)
+                if lines:
+                    yield count, lines
+        finally:
+            transport.close()
+
+
+class UnixSocketSource:
+    """Lines sent by any number of clients over a Unix socket; offsets count lines.
+
+    Each connection is read only as fast as the daemon drains it, so a full
+    queue pushes back on the senders through the socket buffers.
+    """
+
+    def __init__(self, path, queue_size=64):
+        """Listen on ``path`` (removed first if stale)."""
+        self.path = path
+        self.name = f"socket:{os.path.abspath(path)}"
+        self.queue_size = queue_size
+        self.queue = None  # created in chunks(), on the loop that reads it
+        self.closed = False
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        partial = b''
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            lines, partial = _split_lines(partial, data)
+            if lines:
+                await self.queue.put(lines)
+        writer.close()
+
+    async def chunks(self, start_offset=0):
+        """Yield (lines received so far, lines) until the server is closed."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        count = start_offset
+        try:
+            while not (self.closed and self.queue.empty()):
+                lines = await self.queue.get()
+                if lines is None:
+                    return
+                count += len(lines)
+                yield count, lines
+        finally:
+            self.server.close()
+
+    def close(self):
+        """Stop accepting data; the daemon drains what is queued and exits."""
+        self.closed = True
+        if self.queue is not None and not self.queue.full():
+            self.queue.put_nowait(None)  # wake a reader waiting on an empty queue
+
+
+class IngestionDaemon:
+    """Reads a source, validates micro-batches and appends them to an EventStore."""
+
+    def __init__(self, source, store, batch_size=20_000, batch_timeout=0.5, queue_size=16,
+                 engine=None, columns=None, wal=True):
+        """Bounded queue of line chunks between the reader and the committer gives backpressure.
+
+        Rejected rows are quarantined under <store>/quarantine unless another engine is given.
+        The write-ahead log lives under <store>/wal unless ``wal`` is another
+        directory or log, or False to disable it; it holds one source's chunks.
+        """
+        self.source = source
+        self.store = store if isinstance(store, EventStore) else EventStore(store)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue_size = queue_size
+        self.queue = None  # created in run(), once an event loop is running
+        self.engine = engine or DataQualityEngine(quarantine_dir=os.path.join(self.store.directory, 'quarantine'))
+        self.columns = columns or EVENT_COLUMNS
+        if wal is True:
+            wal = os.path.join(self.store.directory, 'wal')
+        self.wal = WriteAheadLog(wal) if isinstance(wal, str) else (wal or None)
+        self.stats = {'events_read': 0, 'events_replayed': 0, 'events_stored': 0, 'events_quarantined': 0,
+                      'micro_batches': 0, 'seconds': 0.0, 'events_per_second': 0.0}
+
+    async def _read(self):
+        """Producer: move source chunks into the queue, waiting while it is full."""
+        try:
+            async for offset, lines in self.source.chunks(self.store.offset(self.source.name)):
+                lsn = self.wal.append(b'\n'.join(lines), offset) if self.wal else None
+                await self.queue.put((offset, lines, lsn))
+        except asyncio.CancelledError:
+            raise  # the consumer failed: nothing is waiting for the end marker
+        except Exception:
+            await self.queue.put(None)
+            raise
+        await self.queue.put(None)
+
+    def _validate(self, lines, offset):
+        """Parse and validate one micro-batch: (raw, clean, quarantine); touches neither the log nor the store."""
+        raw = pd.read_csv(io.BytesIO(b'\n'.join(lines)), names=self.columns, header=None)
+        clean, quarantine, report = self.engine.validate(raw, partition=f"offset-{offset}")
+        return raw, clean, quarantine
+
+    def _commit(self, lines, offset, lsn=None, replayed=False, validated=None):
+        """Parse, validate (unless ``validated`` is given) and store one micro-batch with its end offset and LSN.
+
+        The log is made durable first (one fsync for everything read since
+        the last micro-batch), so the store never checkpoints past it.
+        """
+        raw, clean, quarantine = validated or self._validate(lines, offset)
+        if self.wal is not None:
+            self.wal.commit()
+        self.store.append(clean, source=self.source.name, offset=offset,
+                          offsets=None if lsn is None else {WAL_CHECKPOINT: lsn})
+        if lsn is not None:
+            self.wal.truncate(lsn)
+        self.stats['events_replayed' if replayed else 'events_read'] += len(raw)
+        self.stats['events_stored'] += len(clean)
+        self.stats['events_quarantined'] += len(quarantine)
+        self.stats['micro_batches'] += 1
+
+    def recover(self):
+        """Replay logged chunks past the store's checkpoint into the store; returns events replayed."""
+        if self.wal is None:
+            return 0
+        pending, offset, lsn = [], None, None
+        for lsn, offset, payload in self.wal.replay(self.store.offset(WAL_CHECKPOINT, 0)):
+            pending.extend(payload.splitlines())
+            if len(pending) >= self.batch_size:
+                self._commit(pending, offset, lsn, replayed=True)
+                pending = []
+        if pending:
+            self._commit(pending, offset, lsn, replayed=True)
+        return self.stats['events_replayed']
+
+    async def _commit_async(self, lines, offset, lsn):
+        """Validate a micro-batch in a worker thread, then store it from the event loop."""
+        validated = await asyncio.get_running_loop().run_in_executor(None, self._validate, lines, offset)
+        self._commit(lines, offset, lsn, validated=validated)
+
+    async def _consume(self):
+        """Consumer: gather chunks into micro-batches by size or timeout and commit them."""
+        pending, offset, lsn = [], None, None
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), self.batch_timeout)
+            except asyncio.TimeoutError:
+                item = ()
+            if item is None:
+                break
+            if item:
+                offset, lines, lsn = item
+                pending.extend(lines)
+            if pending and (len(pending) >= self.batch_size or not item):
+                await self._commit_async(pending, offset, lsn)
+                pending = []
+        if pending:
+            await self._commit_async(pending, offset, lsn)
+
+    async def run(self):
+        """Replay the write-ahead log, then ingest until the source is exhausted (or closed); returns stats."""
+        start = time.perf_counter()
+        self.recover()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        try:
+            await asyncio.gather(self._read(), self._consume())
+        finally:
+            if self.wal is not None:
+                self.wal.close()
+        self.stats['seconds'] = time.perf_counter() - start
+        self.stats['events_per_second'] = self.stats['events_read'] / max(self.stats['seconds'], 1e-9)
+        return self.stats
@@ -0,0 +1,234 @@
+"""
+Multi-Factor Interaction Scan
+Discretizes every batch into station, recipe, complexity band, temperature
+band, month and shift, counts batches and failures into dense contingency
+cubes with one bincount each, and then evaluates every pairwise and
+three-way interaction by summing the cubes over the other axes. Each
+interaction cell is compared with what its factors' main effects alone
+predict, and cells are ranked by lift and Benjamini-Hochberg adjusted
+significance without going back to the rows.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from shift_analysis import SHIFTS, shift_of_hour, time_buckets
+
+FACTORS = ['Dosing_Station', 'Recipe_Name', 'Complexity_Band', 'Temperature_Band', 'Month', 'Shift']
+
+# Upper band edges; values above the last edge form the final band
+COMPLEXITY_EDGES = [10, 15, 20]
+TEMPERATURE_EDGES = [18.0, 20.0, 25.0, 27.0]
+
+
+def _band_labels(edges, unit=''):
+    labels = [f"<={edges[0]:g}{unit}"]
+    labels += [f"{low:g}-{high:g}{unit}" for low, high in zip(edges[:-1], edges[1:])]
+    return labels + [f">{edges[-1]:g}{unit}"]
+
+
+def discretize(df, shifts=SHIFTS):
+    """Per-batch factor codes, failures and (batch, station) incidence from dosing events.
+
+    Returns (codes: {factor: int array per batch}, levels: {factor: labels},
+    failed: 0/1 per batch, station pairs: (batch index, station code) arrays).
+    Batches with no temperature reading or timestamp get an 'Unknown' band or
+    'Unassigned' shift.
+    """
+    batch, batch_ids = pd.factorize(df['Batch_ID'])
+    first = np.unique(batch, return_index=True)[1]
+    n = len(batch_ids)
+    codes, levels = {}, {}
+
+    for factor in ('Dosing_Station', 'Recipe_Name'):
+        values, labels = pd.factorize(df[factor], sort=True)
+        codes[factor], levels[factor] = values, np.asarray(labels, dtype=object)
+    codes['Recipe_Name'] = codes['Recipe_Name'][first]
+
+    ingredients = df['Num_Ingredients'].to_numpy(dtype=np.float64)[first]
+    codes['Complexity_Band'] = np.searchsorted(COMPLEXITY_EDGES, ingredients, side='left')
+    levels['Complexity_Band'] = np.array(_band_labels(COMPLEXITY_EDGES), dtype=object)
+
+    temperature = df['Facility_Temperature'].to_numpy(dtype=np.float64)
+    readings = ~np.isnan(temperature)
+    total = np.bincount(batch[readings], weights=temperature[readings], minlength=n)
+    count = np.bincount(batch[readings], minlength=n)
+    mean = np.divide(total, count, out=np.full(n, np.nan), where=count > 0)
+    band = np.searchsorted(TEMPERATURE_EDGES, mean, side='left')
+    codes['Temperature_Band'] = np.where(np.isnan(mean), len(TEMPERATURE_EDGES) + 1, band)
+    levels['Temperature_Band'] = np.array(_band_labels(TEMPERATURE_EDGES, 'C') + ['Unknown'], dtype=object)
+
+    dates = pd.to_datetime(df['Production_Date'])
+    codes['Month'] = dates.dt.month.to_numpy()[first] - 1
+    levels['Month'] = np.arange(1, 13)
+
+    # Shift at the batch's first timed event; 'Unassigned' for untimed batches and uncovered hours
+    timestamps = df['Production_Timestamp'].to_numpy(dtype=np.int64)
+    timed = timestamps != np.iinfo(np.int64).min
+    start = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(start, batch[timed], timestamps[timed])
+    hour, _ = time_buckets(np.where(start == np.iinfo(np.int64).max, 0, start))
+    shift = shift_of_hour(shifts)[hour]
+    codes['Shift'] = np.where((shift < 0) | (start == np.iinfo(np.int64).max), len(shifts), shift)
+    levels['Shift'] = np.array(list(shifts) + ['Unassigned'], dtype=object)
+
+    failed = np.zeros(n, dtype=np.float64)
+    failed[batch] = df['QC_Result'].to_numpy() == 'failed'
+    pairs = np.unique(batch * len(levels['Dosing_Station']) + codes.pop('Dosing_Station'))
+    stations = np.divmod(pairs, len(levels['Dosing_Station']))
+    return codes, levels, failed, stations
+
+
+def _bh(p_values):
+    """Benjamini-Hochberg adjusted p-values (q-values)."""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    if not len(p_values):
+        return p_values
+    order = np.argsort(p_values)
+    ranked = p_values[order] * len(p_values) / np.arange(1, len(p_values) + 1)
+    q = np.minimum.accumulate(ranked[::-1])[::-1]
+    out = np.empty_like(q)
+    out[order] = np.minimum(q, 1.0)
+    return out
+
+
+class InteractionCube:
+    """Dense batch and failure counts over every factor, built once from the events.
+
+    Interactions without a station are read from the batch cube (one count
+    per batch); interactions with a station from the station cube, which
+    counts each (batch, station used) pair once.
+    """
+
+    def __init__(self, df, shifts=SHIFTS):
+        """Discretize the events and fill both cubes with one bincount each."""
+        codes, self.levels, failed, (pair_batch, pair_station) = discretize(df, shifts)
+        self.n_batches = len(failed)
+
+        batch_factors = [factor for factor in FACTORS if factor != 'Dosing_Station']
+        shape = tuple(len(self.levels[factor]) for factor in batch_factors)
+        cell = np.ravel_multi_index([codes[factor] for factor in batch_factors], shape)
+        self.batch_cube = self._fill(cell, failed, shape)
+
+        shape = (len(self.levels['Dosing_Station']),) + shape
+        cell = np.ravel_multi_index([pair_station] + [codes[factor][pair_batch] for factor in batch_factors], shape)
+        self.station_cube = self._fill(cell, failed[pair_batch], shape)
+
+    @staticmethod
+    def _fill(cell, failed, shape):
+        size = int(np.prod(shape))
+        batches = np.bincount(cell, minlength=size).astype(np.float64).reshape(shape)
+        failures = np.bincount(cell, weights=failed, minlength=size).reshape(shape)
+        return batches, failures
+
+    def marginal(self, factors, by_station=None):
+        """(batches, failures) summed over every other factor, with axes in the given order.
+
+        Counts come from the station cube when a station is among the factors
+        (or by_station is true), otherwise from the batch cube.
+        """
+        if by_station is None:
+            by_station = 'Dosing_Station' in factors
+        cube_factors = FACTORS if by_station else FACTORS[1:]
+        batches, failures = self.station_cube if by_station else self.batch_cube
+        keep = [cube_factors.index(factor) for factor in factors]
+        drop = tuple(axis for axis in range(len(cube_factors)) if axis not in keep)
+        source = np.argsort(np.argsort(keep))  # summed axes keep their cube order; put them in the requested one
+        return (np.moveaxis(batches.sum(axis=drop), source, range(len(keep))),
+                np.moveaxis(failures.sum(axis=drop), source, range(len(keep))))
+
+    def nested(self, a, b):
+        """True when one factor determines the other (e.g. recipe -> complexity band)."""
+        batches, _ = self.marginal([a, b])
+        present = batches > 0
+        return bool((present.sum(axis=1) <= 1).all() or (present.sum(axis=0) <= 1).all())
+
+    def evaluate(self, factors, max_iter=100, tol=1e-8):
+        """Cells of one interaction with observed and main-effects-expected failure rates.
+
+        Expected failures come from the main-effects-only log-linear rate
+        model, fitted by iterative proportional fitting on the cube's
+        one-way margins. Lift is observed / expected rate, each cell's
+        p-value is the two-sided binomial test against that expectation, and
+        the interaction's G statistic is the model's deviance.
+        """
+        from scipy.stats import binom
+
+        batches, failures = self.marginal(factors)
+        axes = range(len(factors))
+        expected = batches * (failures.sum() / batches.sum())
+        for _ in range(max_iter):
+            largest = 0.0
+            for axis in axes:
+                others = tuple(i for i in axes if i != axis)
+                observed, fitted = failures.sum(axis=others, keepdims=True), expected.sum(axis=others, keepdims=True)
+                scale = np.divide(observed, fitted, out=np.ones_like(fitted), where=fitted > 0)
+                expected = expected * scale
+                largest = max(largest, float(np.abs(scale - 1).max()))
+            if largest < tol:
+                break
+        rate = np.clip(np.divide(expected, batches, out=np.zeros_like(expected), where=batches > 0), 1e-9, 1 - 1e-9)
+
+        populated = batches > 0
+        n, f, e = batches[populated], failures[populated], rate[populated]
+        lower, upper = binom.cdf(f, n, e), binom.sf(f - 1, n, e)
+        p_values = np.minimum(1.0, 2 * np.minimum(lower, upper))
+
+        fitted = expected[populated]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g = 2 * (np.where(f > 0, f * np.log(f / fitted), 0) - (f - fitted)).sum()
+        levels_used = sum(int((batches.sum(axis=tuple(i for i in axes if i != axis)) > 0).sum()) - 1
+                          for axis in axes)
+        dof = max(int(populated.sum()) - 1 - levels_used, 1)
+
+        index = np.nonzero(populated)
+        cells = pd.DataFrame({factor: self.levels[factor][index[axis]] for axis, factor in enumerate(factors)})
+        cells['Batches'] = n.astype(np.int64)
+        cells['Failures'] = f.astype(np.int64)
+        cells['Failure_Rate'] = f / n
+        cells['Expected_Rate'] = e
+        cells['Lift'] = cells['Failure_Rate'] / e
+        cells['P_Value'] = p_values
+        return cells, max(float(g), 0.0), dof
+
+    def scan(self, max_order=3, min_batches=20, top=25):
+        """Evaluate every 2- to max_order-way interaction of factors that do not determine each other.
+
+        Returns a dict with 'interactions' (one row per factor combination,
+        ranked by G-test p-value) and 'cells' (the top cells with at least
+        min_batches samples, ranked by q-value and then lift).
+        """
+        from scipy.stats import chi2
+
+        interactions, cells = [], []
+        for order in range(2, max_order + 1):
+            for factors in combinations(FACTORS, order):
+                if any(self.nested(a, b) for a, b in combinations(factors, 2)):
+                    continue
+                table, g, dof = self.evaluate(list(factors))
+                table = table[table['Batches'] >= min_batches]
+                name = ' x '.join(factors)
+                interactions.append({
+                    'Interaction': name, 'Order': order, 'Cells': len(table), 'G': g, 'DF': dof,
+                    'P_Value': float(chi2.sf(g, dof)),
+                    'Max_Lift': float(table['Lift'].max()) if len(table) else np.nan,
+                })
+                if len(table):
+                    levels = table[list(factors)].astype(str).agg(', '.join, axis=1)
+                    cells.append(table.drop(columns=list(factors)).assign(Interaction=name, Levels=levels.to_numpy()))
+
+        interactions = pd.DataFrame(interactions)
+        interactions['Q_Value'] = _bh(interactions['P_Value'])
+        interactions = interactions.sort_values(['P_Value', 'G'], ascending=[True, False]).reset_index(drop=True)
+
+        columns = ['Interaction', 'Levels', 'Batches', 'Failures', 'Failure_Rate', 'Expected_Rate', 'Lift',
+                   'P_Value', 'Q_Value']
+        if cells:
+            cells = pd.concat(cells, ignore_index=True)
+            cells['Q_Value'] = _bh(cells['P_Value'])
+            cells = cells.sort_values(['Q_Value', 'Lift'], ascending=[True, False])[columns].head(top)
+        else:
+            cells = pd.DataFrame(columns=columns)
+        return {'interactions': interactions, 'cells': cells.reset_index(drop=True)}
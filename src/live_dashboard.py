@@ -0,0 +1,326 @@
+"""
+Live Dashboard Server
+Serves the executive dashboard for an event store that is still being
+written (e.g. by the ingestion daemon) and keeps it current: new segments
+are folded into incrementally maintained batch, station and panel tallies,
+and each browser receives only the traces whose values changed, as
+server-sent events applied with Plotly.restyle instead of a full re-render.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from event_store import EventStore
+
+# Trace order of the dashboard figure: one trace per panel
+PANELS = ['complexity', 'temperature', 'station', 'monthly']
+
+# Event-level failure rate above which a station bar is drawn red
+STATION_ALERT_RATE = 0.37
+
+_BATCH_AGG = {'Month': 'min', 'Num_Ingredients': 'first', 'Temp_Sum': 'sum', 'Temp_N': 'sum', 'Failed': 'max'}
+# The same aggregations, combining a stored batch state (old) with a chunk's partial state (new)
+_BATCH_MERGE = {'Month': np.minimum, 'Num_Ingredients': lambda old, new: old, 'Temp_Sum': np.add,
+                'Temp_N': np.add, 'Failed': np.maximum}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Paint Quality - Live Dashboard</title>
+<script src="/plotly.min.js"></script>
+</head>
+<body style="margin:0">
+<div id="dashboard" style="width:100%;height:100vh"></div>
+<div id="status" style="position:fixed;bottom:4px;right:8px;font:12px sans-serif;color:#888"></div>
+<script>
+fetch('/figure').then(r => r.json()).then(figure => {
+  Plotly.newPlot('dashboard', figure.data, figure.layout, {responsive: true});
+  const source = new EventSource('/events');
+  source.addEventListener('patch', event => {
+    const patch = JSON.parse(event.data);
+    for (const [index, trace] of Object.entries(patch.traces)) {
+      const update = {};
+      for (const key in trace) update[key] = [trace[key]];
+      Plotly.restyle('dashboard', update, [Number(index)]);
+    }
+    document.getElementById('status').textContent =
+      patch.batches + ' batches, updated ' + new Date().toLocaleTimeString();
+  });
+});
+</script>
+</body>
+</html>
+"""
+
+
+def _tally(batches):
+    """Batch and failure counts per panel key for a frame of batch states."""
+    keys = {
+        'complexity': batches['Num_Ingredients'],
+        'temperature': np.floor(batches['Temp_Sum'] / batches['Temp_N'].where(batches['Temp_N'] > 0)),
+        'monthly': batches['Month'],
+    }
+    return {panel: batches['Failed'].groupby(key).agg(['size', 'sum']).set_axis(['Batches', 'Failures'], axis=1)
+            for panel, key in keys.items()}
+
+
+def _rates(table, min_count=1):
+    """(keys, failure rates in %) of the rows with at least min_count samples."""
+    table = table[table.iloc[:, 0] >= min_count].sort_index()
+    rates = (table.iloc[:, 1] / table.iloc[:, 0] * 100).round(2)
+    return table.index.tolist(), rates.tolist()
+
+
+class DashboardAggregates:
+    """Running batch states and per-panel tallies, updated one event chunk at a time.
+
+    Batch states live in growing arrays, with ``batches`` mapping each
+    Batch_ID to its row. A batch's events can arrive in several chunks; only
+    the batches a chunk touches are looked up, their old contribution to the
+    panel tallies is subtracted and the merged state is added back, so an
+    update costs O(new events), not O(history).
+    """
+
+    def __init__(self, min_batches=10, capacity=1024):
+        """min_batches: complexity levels with fewer batches are left off (as in the static dashboard)."""
+        self.min_batches = min_batches
+        self.batches = {}
+        self.state = {column: np.zeros(capacity) for column in _BATCH_AGG}
+        self.stations = pd.DataFrame({'Events': pd.Series(dtype='float64'), 'Failures': pd.Series(dtype='float64')})
+        self.panels = _tally(pd.DataFrame({column: values[:0] for column, values in self.state.items()}))
+
+    def update(self, events):
+        """Fold a chunk of clean events into the tallies."""
+        if not len(events):
+            return
+        failed = (events['QC_Result'] == 'failed').astype(np.float64)
+        stations = failed.groupby(events['Dosing_Station']).agg(['size', 'sum'])
+        self.stations = self.stations.add(stations.set_axis(['Events', 'Failures'], axis=1), fill_value=0)
+
+        temperature = events['Facility_Temperature'].astype(np.float64)
+        partial = pd.DataFrame({
+            'Month': pd.to_datetime(events['Production_Date']).dt.month.astype(np.float64),
+            'Num_Ingredients': events['Num_Ingredients'].astype(np.float64),
+            'Temp_Sum': temperature.fillna(0.0),
+            'Temp_N': temperature.notna().astype(np.float64),
+            'Failed': failed,
+        }).groupby(events['Batch_ID'].to_numpy()).agg(_BATCH_AGG)
+
+        # Batches seen before: retract their old contribution and merge the new events into them
+        rows = np.fromiter((self.batches.get(batch, -1) for batch in partial.index), dtype=np.int64, count=len(partial))
+        seen = rows >= 0
+        if seen.any():
+            old = pd.DataFrame({column: values[rows[seen]] for column, values in self.state.items()})
+            self._apply(_tally(old), -1)
+            for column, merge in _BATCH_MERGE.items():
+                partial.loc[seen, column] = merge(old[column].to_numpy(), partial.loc[seen, column].to_numpy())
+
+        # New batches take the next rows, doubling the arrays when they are full
+        start = len(self.batches)
+        rows[~seen] = np.arange(start, start + int((~seen).sum()))
+        self.batches.update(zip(partial.index[~seen], rows[~seen].tolist()))
+        if len(self.batches) > len(self.state['Failed']):
+            capacity = max(2 * len(self.state['Failed']), len(self.batches))
+            for column, values in self.state.items():
+                self.state[column] = np.resize(values, capacity)
+        for column, values in self.state.items():
+            values[rows] = partial[column].to_numpy()
+        self._apply(_tally(partial), 1)
+
+    def _apply(self, tallies, sign):
+        for panel, table in tallies.items():
+            total = self.panels[panel].add(sign * table, fill_value=0)
+            self.panels[panel] = total[total['Batches'] > 0]
+
+    def traces(self):
+        """Current data of each dashboard trace (in PANELS order) as plotly restyle attributes."""
+        x, y = _rates(self.panels['complexity'], self.min_batches)
+        traces = [{'x': [int(v) for v in x], 'y': y}]
+        x, y = _rates(self.panels['temperature'])
+        traces.append({'x': [v + 0.5 for v in x], 'y': y})
+        x, y = _rates(self.stations)
+        traces.append({'x': x, 'y': y, 'text': [f"{v:.1f}%" for v in y],
+                       'marker.color': ['red' if v > STATION_ALERT_RATE * 100 else 'green' for v in y]})
+        x, y = _rates(self.panels['monthly'])
+        traces.append({'x': [int(v) for v in x], 'y': y})
+        return traces
+
+
+def diff_traces(previous, current):
+    """{trace index: data} for the traces that differ from what a client was last sent."""
+    return {index: trace for index, trace in enumerate(current)
+            if previous is None or previous[index] != trace}
+
+
+class LiveDashboard:
+    """Polls an event store for new segments and publishes versioned trace data."""
+
+    def __init__(self, store_dir, interval=2.0, min_batches=10):
+        """Check the store every ``interval`` seconds once started."""
+        self.store_dir = store_dir
+        self.interval = interval
+        self.aggregates = DashboardAggregates(min_batches=min_batches)
+        self.segments_read = 0
+        self.version = 0
+        self.traces = self.aggregates.traces()
+        self.changed = threading.Condition()
+        self.stopped = threading.Event()
+        self.stats = {'polls': 0, 'segments_read': 0, 'events_read': 0, 'updates': 0}
+        self.poll()
+
+    def poll(self):
+        """Fold segments committed since the last poll into the aggregates; returns the changed traces."""
+        store = EventStore(self.store_dir, readonly=True)
+        segments = store.segments[self.segments_read:]
+        self.stats['polls'] += 1
+        for segment in segments:
+            events = store.read_segment(segment, ['Batch_ID', 'Production_Date', 'Num_Ingredients', 'Dosing_Station',
+                                                  'Facility_Temperature', 'QC_Result'])
+            self.aggregates.update(events)
+            self.stats['events_read'] += len(events)
+        self.segments_read += len(segments)
+        self.stats['segments_read'] += len(segments)
+        if not segments:
+            return {}
+
+        traces = self.aggregates.traces()
+        changed = diff_traces(self.traces, traces)
+        if changed:
+            with self.changed:
+                self.traces = traces
+                self.version += 1
+                self.stats['updates'] += 1
+                self.changed.notify_all()
+        return changed
+
+    def run(self):
+        """Poll until stop() is called."""
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        """Stop polling and release clients waiting for an update."""
+        self.stopped.set()
+        with self.changed:
+            self.changed.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until the published version differs from ``version`` (or timeout); returns (version, traces)."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version or self.stopped.is_set(), timeout)
+            return self.version, self.traces
+
+    def figure(self):
+        """Full figure (layout and the current traces) as plotly JSON."""
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        fig = make_subplots(rows=2, cols=2, subplot_titles=[
+            'Failure Rate by Recipe Complexity',
+            'Temperature Impact on Quality',
+            'Station Performance Comparison',
+            'Monthly Failure Trends',
+        ])
+        complexity, temperature, station, monthly = self.traces
+        fig.add_trace(go.Scatter(x=complexity['x'], y=complexity['y'], mode='markers+lines',
+                                 name='Failure Rate by Complexity', marker=dict(size=8, color='red')), row=1, col=1)
+        fig.add_trace(go.Bar(x=temperature['x'], y=temperature['y'], name='Failure Rate by Temp',
+                             marker_color='lightblue', opacity=0.7), row=1, col=2)
+        fig.add_trace(go.Bar(x=station['x'], y=station['y'], name='Station Failure Rate',
+                             marker_color=station['marker.color'], text=station['text'], textposition='auto'),
+                      row=2, col=1)
+        fig.add_trace(go.Scatter(x=monthly['x'], y=monthly['y'], mode='lines+markers', name='Monthly Failure Rate',
+                                 line=dict(color='purple', width=3), marker=dict(size=8)), row=2, col=2)
+        fig.update_layout(title_text="Paint Manufacturing Quality - Live Dashboard", title_x=0.5,
+                          showlegend=False, font=dict(size=12))
+        for row, col, x_title in ((1, 1, 'Number of Ingredients'), (1, 2, 'Temperature (°C)'),
+                                  (2, 1, 'Dosing Station'), (2, 2, 'Month')):
+            fig.update_xaxes(title_text=x_title, row=row, col=col)
+            fig.update_yaxes(title_text='Failure Rate (%)', row=row, col=col)
+        return fig.to_json()
+
+
+def make_handler(dashboard, keepalive=15.0):
+    """Request handler bound to a LiveDashboard."""
+    plotly_js = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, content_type, body):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/':
+                self._send('text/html; charset=utf-8', PAGE.encode())
+            elif path == '/figure':
+                self._send('application/json', dashboard.figure().encode())
+            elif path == '/plotly.min.js':
+                if not plotly_js:
+                    from plotly.offline import get_plotlyjs
+
+                    plotly_js.append(get_plotlyjs().encode())
+                self._send('application/javascript', plotly_js[0])
+            elif path == '/stats':
+                self._send('application/json', json.dumps(dashboard.stats).encode())
+            elif path == '/events':
+                self._stream()
+            else:
+                self.send_error(404)
+
+        def _stream(self):
+            """Server-sent events: the first patch carries every trace, later ones only changed traces."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            version, sent = None, None
+            try:
+                while not dashboard.stopped.is_set():
+                    latest, traces = dashboard.wait(version, keepalive)
+                    if latest == version:
+                        self.wfile.write(b': keepalive\n\n')
+                    else:
+                        patch = {'version': latest, 'batches': len(dashboard.aggregates.batches),
+                                 'traces': diff_traces(sent, traces)}
+                        self.wfile.write(f"id: {latest}\nevent: patch\ndata: {json.dumps(patch)}\n\n".encode())
+                        version, sent = latest, traces
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(store_dir, host='127.0.0.1', port=8050, interval=2.0):
+    """Run the live dashboard until interrupted."""
+    dashboard = LiveDashboard(store_dir, interval=interval)
+    server = ThreadingHTTPServer((host, port), make_handler(dashboard))
+    server.daemon_threads = True
+    poller = threading.Thread(target=dashboard.run, daemon=True)
+    poller.start()
+    print(f"Live dashboard on http://{host}:{port} ({len(dashboard.aggregates.batches)} batches, "
+          f"checking {store_dir} every {interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.stop()
+        server.server_close()
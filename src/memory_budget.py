@@ -0,0 +1,155 @@
+"""
+Memory Budget for In-Memory Analysis
+Compact dtypes for the event and batch tables (float32, integers from int16
+up, categoricals for repeated strings), per-frame footprint reporting, and a
+chunked reader that yields raw events a few hundred thousand rows at a time
+with every batch kept whole, so validation and batch aggregation can run
+chunk by chunk when the raw table would not fit the budget. The compact
+event table itself is still held in memory, so a budget it cannot fit in is
+an error (MemoryBudgetError) rather than a silent overrun.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Columns whose dtype is part of their contract (int64 ns timestamps)
+KEEP_DTYPES = ('Production_Timestamp',)
+
+
+class MemoryBudgetError(MemoryError):
+    """The compact tables of the requested input do not fit the memory budget."""
+
+
+def parse_size(value):
+    """Bytes from an int or a size string such as '512MB' or '2 GB'."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)B?\s*', str(value).upper())
+    if not match:
+        raise ValueError(f"Invalid memory size: {value!r}")
+    return int(float(match.group(1)) * 1024 ** ' KMGT'.index(match.group(2) or ' '))
+
+
+def footprint(df):
+    """Bytes held by a frame, including the string objects it references."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def footprint_report(frames):
+    """One row per named frame with its rows, columns and footprint in MB."""
+    rows = [{'Frame': name, 'Rows': len(df), 'Columns': df.shape[1], 'MB': round(footprint(df) / (1 << 20), 3)}
+            for name, df in frames.items() if df is not None]
+    return pd.DataFrame(rows)
+
+
+def compact_dtypes(df, categorical_ratio=0.5, keep=KEEP_DTYPES):
+    """Downcast a frame in place: float32, the smallest integer type from int16 up, categoricals.
+
+    String columns become categoricals when their distinct values are fewer
+    than categorical_ratio of the rows. Returns the frame.
+    """
+    for column in df.columns:
+        if column in keep:
+            continue
+        values = df[column]
+        kind = values.dtype.kind
+        if kind == 'f' and values.dtype.itemsize > 4:
+            df[column] = values.astype(np.float32)
+        elif kind in 'iu':
+            low, high = (values.min(), values.max()) if len(values) else (0, 0)
+            for dtype in (np.int16, np.int32):
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    df[column] = values.astype(dtype)
+                    break
+        elif kind in 'OU' or pd.api.types.is_string_dtype(values.dtype):
+            if not isinstance(values.dtype, pd.CategoricalDtype) and values.nunique() < categorical_ratio * len(values):
+                df[column] = values.astype('category')
+    return df
+
+
+def concat_compact(frames):
+    """Concatenate frames, keeping categorical columns categorical (over the union of categories)."""
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return pd.DataFrame()
+    for column in frames[0].columns:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = sorted(set().union(*(frame[column].cat.categories for frame in frames)))
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def estimate_raw_bytes(path, sample_rows=10_000):
+    """Estimated in-memory size of the raw events at ``path`` with default pandas dtypes."""
+    if os.path.isdir(path):
+        from event_archive import EventArchive
+        from event_store import EventStore
+
+        if EventArchive.is_archive(path):
+            archive = EventArchive(path)
+            blocks = archive.index['blocks']
+            rows, sample = len(archive), archive.read_block(blocks[0]) if blocks else None
+        else:
+            store = EventStore(path, readonly=True)
+            segments = store.segments
+            rows, sample = len(store), store.read_segment(segments[0]) if segments else None
+        return 0 if sample is None or not len(sample) else int(footprint(sample) / len(sample) * rows)
+
+    sample = pd.read_csv(path, nrows=sample_rows)
+    if not len(sample):
+        return 0
+    with open(path, 'rb') as f:
+        header = len(f.readline())
+        sample_bytes = sum(len(f.readline()) for _ in range(len(sample)))
+    rows = (os.path.getsize(path) - header) / max(sample_bytes / len(sample), 1)
+    return int(footprint(sample) / len(sample) * rows)
+
+
+def _source_chunks(path, chunk_rows, filters):
+    """Raw event frames of about chunk_rows from a CSV, event store or archive (filters applied)."""
+    from event_archive import EventArchive, filter_events
+
+    filters = filters or {}
+    if EventArchive.is_archive(path):
+        archive = EventArchive(path)
+        for block in archive.blocks(**filters):
+            yield filter_events(archive.read_block(block), **filters)
+    elif os.path.isdir(path):
+        from event_store import EventStore
+
+        store = EventStore(path, readonly=True)
+        for segment in store.segments:
+            yield filter_events(store.read_segment(segment), **filters)
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield filter_events(chunk, **filters)
+
+
+def batch_chunks(path, chunk_rows=500_000, filters=None):
+    """Raw event chunks that never split a batch across two chunks.
+
+    The rows of each chunk's last batch are held back and prepended to the
+    next chunk, which keeps batches whole as long as a batch's events are
+    contiguous in the source (as in the production export and the stores).
+    """
+    carry = None
+    for chunk in _source_chunks(path, chunk_rows, filters):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if not len(chunk):
+            continue
+        ids = chunk['Batch_ID'].to_numpy()
+        tail = len(chunk)
+        while tail > 0 and ids[tail - 1] == ids[-1]:
+            tail -= 1
+        if tail == 0:
+            carry = chunk  # one batch so far: keep reading
+            continue
+        carry = chunk.iloc[tail:].reset_index(drop=True)
+        yield chunk.iloc[:tail].reset_index(drop=True)
+    if carry is not None and len(carry):
+        yield carry
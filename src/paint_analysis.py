@@ -3,95 +3,208 @@ Paint Manufacturing Quality Analysis
 Using first principles and systems thinking to identify root causes of quality failures.
 """
 
+import os
+import time
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
-from sklearn.preprocessing import StandardScaler
+from data_access import add_dosing_errors, build_batch_table, build_station_table, load_event_table
+from data_quality import EVENT_SCHEMA, DataQualityEngine
+from interaction_scan import InteractionCube
+from memory_budget import (MemoryBudgetError, batch_chunks, compact_dtypes, concat_compact, estimate_raw_bytes,
+                           footprint, footprint_report, parse_size)
+from quantile_sketch import DosingErrorSketches
+from shift_analysis import failure_cube
 import warnings
 warnings.filterwarnings('ignore')
 
+# Batch-level features shared by the predictive model and the tuning/backtesting tools
+MODEL_FEATURES = [
+    'Num_Ingredients_first',
+    'Facility_Temperature_mean',
+    'Dosing_Error_Abs_mean',
+    'Dosing_Error_Abs_max',
+    'Dosing_Error_Abs_std',
+    'Dosing_Station_nunique'
+]
+
 class PaintQualityAnalyzer:
     """
     Comprehensive analyzer for paint manufacturing quality issues.
     Implements first principles and systems thinking approaches.
     """
     
-    def __init__(self, data_path: str):
-        """Initialize analyzer with data path."""
+    def __init__(self, data_path: str, quarantine_dir: str = None, start=None, end=None, stations=None,
+                 memory_budget=None, chunk_rows=500_000, n_jobs=1):
+        """Initialize analyzer with data path, optional quarantine directory and event filters.
+
+        Only events with start <= production timestamp < end at the given
+        stations are analyzed; archives decompress just the matching blocks.
+        With a memory_budget (bytes or e.g. '2GB') the tables use compact
+        dtypes, and inputs whose raw load would exceed the budget are
+        validated and aggregated chunk_rows events at a time; the compact
+        event table is still held whole, so chunked loads raise
+        MemoryBudgetError once it outgrows the budget. n_jobs other
+        than 1 runs the batch and station group-bys on partitions in a
+        process pool (None or 0: every core).
+        """
         self.data_path = data_path
+        self.quarantine_dir = quarantine_dir
+        self.filters = {'start': start, 'end': end, 'stations': stations}
+        self.memory_budget = parse_size(memory_budget) if memory_budget is not None else None
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
         self.df = None
+        self.quarantine_df = None
         self.batch_df = None
+        self.error_sketches = None
+        self.memory_report = None
         self.analysis_results = {}
+        self._groupby = None
         
     def load_and_validate_data(self):
         """Load data and perform initial validation."""
         print("=== PHASE 1: DATA LOADING AND VALIDATION ===")
         
-        # Load data
-        self.df = pd.read_csv(self.data_path)
-        print(f"Dataset Shape: {self.df.shape}")
-        print(f"Columns: {list(self.df.columns)}")
+        # Over the memory budget, validate and aggregate the input one chunk of whole batches at a time
+        if self.memory_budget is not None:
+            # The one-shot path holds the raw frame and its validated copy at the same time
+            estimate = 2 * estimate_raw_bytes(self.data_path)
+            if estimate > self.memory_budget:
+                print(f"Estimated load footprint {estimate / (1 << 20):,.1f} MB exceeds the "
+                      f"{self.memory_budget / (1 << 20):,.1f} MB budget: processing in chunks of {self.chunk_rows:,} events")
+                return self._load_in_chunks()
+
+        # Load data: a CSV export, an event archive, or an event-store directory written by the ingestion daemon
+        from event_archive import EventArchive, filter_events
+        if EventArchive.is_archive(self.data_path):
+            raw_df = EventArchive(self.data_path).read(**self.filters)
+        else:
+            if os.path.isdir(self.data_path):
+                from event_store import EventStore
+                raw_df = EventStore(self.data_path).read()
+            elif self.memory_budget is not None:
+                raw_df = pd.read_csv(self.data_path)  # not kept in the shared cache
+            else:
+                raw_df = load_event_table(self.data_path, raw=True)
+            raw_df = filter_events(raw_df, **self.filters)
+        print(f"Dataset Shape: {raw_df.shape}")
+        print(f"Columns: {list(raw_df.columns)}")
         
-        # Data quality checks
+        # Data quality checks: rejected rows go to quarantine, the rest is typed and clean
         print("\n--- Data Quality Assessment ---")
-        print(f"Missing Values:\n{self.df.isnull().sum()}")
-        print(f"\nDuplicate Rows: {self.df.duplicated().sum()}")
+        engine = DataQualityEngine(quarantine_dir=self.quarantine_dir)
+        self.df, self.quarantine_df, report = engine.validate(raw_df)
+        del raw_df
+        if self.memory_budget is not None:
+            compact_dtypes(self.df)
+        engine.print_report(report)
+        self.analysis_results['data_quality'] = report
         
         # Basic statistics
-        print(f"\nUnique Values per Column:")
-        for col in self.df.columns:
-            print(f"  {col}: {self.df[col].nunique()}")
+        self._print_unique_values()
             
-        # Convert date columns
-        self.df['Production_Date'] = pd.to_datetime(self.df['Production_Date'])
-        self.df['Production_Time'] = pd.to_datetime(self.df['Production_Time'], format='%H:%M:%S').dt.time
+        # Production_Date and the int64 Production_Timestamp are already built by the validation pass
         
         # Create batch-level aggregations
         self._create_batch_level_data()
         
         return self.df
+
+    def _load_in_chunks(self):
+        """Validate, compact and aggregate chunks of whole batches, then concatenate the compact results."""
+        engine = DataQualityEngine(quarantine_dir=self.quarantine_dir)
+        partition = time.strftime('%Y%m%dT%H%M%S')
+        events, quarantine, reports, batches = [], [], [], []
+        sketches = DosingErrorSketches()
+        held = 0
+        for index, chunk in enumerate(batch_chunks(self.data_path, self.chunk_rows, self.filters)):
+            clean, rejected, report = engine.validate(chunk, partition=f"{partition}-chunk{index:05d}")
+            del chunk
+            compact_dtypes(clean)
+            add_dosing_errors(clean)
+            batches.append(build_batch_table(clean))
+            sketches.update(clean)
+            events.append(clean)
+            quarantine.append(rejected)
+            reports.append(report)
+
+            # The later phases need the whole compact event table: stop as soon as it cannot fit
+            held += footprint(clean) + footprint(rejected) + footprint(batches[-1])
+            if held > self.memory_budget:
+                raise MemoryBudgetError(
+                    f"Compact tables reach {held / (1 << 20):,.1f} MB after {index + 1} chunks, over the "
+                    f"{self.memory_budget / (1 << 20):,.1f} MB memory budget; narrow the input with the "
+                    f"start/end/stations filters or raise the budget")
+        print(f"Dataset Shape: ({sum(report['rows_in'] for report in reports)}, {len(EVENT_SCHEMA)}) "
+              f"in {len(reports)} chunks")
+
+        print("\n--- Data Quality Assessment ---")
+        self.df = concat_compact(events)
+        self.quarantine_df = pd.concat(quarantine, ignore_index=True) if quarantine else None
+        report = engine.merge_reports(reports)
+        engine.print_report(report)
+        self.analysis_results['data_quality'] = report
+        self._print_unique_values()
+
+        # Chunks hold whole batches when a batch's events are contiguous; otherwise aggregate again
+        batch_df = concat_compact(batches).sort_values('Batch_ID', ignore_index=True)
+        if batch_df['Batch_ID'].duplicated().any():
+            batch_df = None
+        self._create_batch_level_data(batch_df, sketches)
+        return self.df
+
+    def _print_unique_values(self):
+        print(f"\nUnique Values per Column:")
+        for col in self.df.columns:
+            print(f"  {col}: {self.df[col].nunique()}")
     
-    def _create_batch_level_data(self):
-        """Create batch-level aggregated data for analysis."""
+    def _create_batch_level_data(self, batch_df=None, sketches=None):
+        """Create batch-level aggregated data for analysis (unless chunks already built it)."""
         print("\n--- Creating Batch-Level Aggregations ---")
         
-        # Calculate dosing error metrics per batch
-        self.df['Dosing_Error_Abs'] = abs(self.df['Actual_Amount'] - self.df['Target_Amount'])
-        self.df['Dosing_Error_Rel'] = self.df['Dosing_Error_Abs'] / self.df['Target_Amount']
-        
-        # Aggregate to batch level
-        batch_agg = self.df.groupby('Batch_ID').agg({
-            'Production_Date': 'first',
-            'Recipe_Name': 'first',
-            'Num_Ingredients': 'first',
-            'QC_Result': 'first',
-            'Facility_Temperature': 'mean',
-            'Dosing_Error_Abs': ['mean', 'max', 'std', 'sum'],
-            'Dosing_Error_Rel': ['mean', 'max', 'std'],
-            'Target_Amount': 'sum',
-            'Actual_Amount': 'sum',
-            'Dosing_Station': 'nunique'
-        }).round(4)
+        # Calculate dosing error metrics and aggregate to batch level
+        if batch_df is None:
+            add_dosing_errors(self.df)
+            batch_df = build_batch_table(self.df, groupby=self._parallel_groupby())
+        # Chunked loads fold every chunk into the sketches; otherwise the systems phase builds them once
+        self.error_sketches = sketches
+        if self.memory_budget is not None:
+            compact_dtypes(batch_df)
         
-        # Flatten column names
-        batch_agg.columns = ['_'.join(col).strip() if col[1] else col[0] for col in batch_agg.columns]
-        batch_agg = batch_agg.reset_index()
-        
-        # Create binary target
-        batch_agg['Failed'] = (batch_agg['QC_Result_first'] == 'failed').astype(int)
-        
-        self.batch_df = batch_agg
+        self.batch_df = batch_df
         print(f"Batch-level dataset shape: {self.batch_df.shape}")
         print(f"Overall failure rate: {self.batch_df['Failed'].mean():.1%}")
+
+        if self.memory_budget is not None:
+            self.memory_report = self.memory_footprint()
+            print(f"\nMemory footprint (budget {self.memory_budget / (1 << 20):,.1f} MB):")
+            print(self.memory_report.to_string(index=False))
+            total = self.memory_report['MB'].sum()
+            if total * (1 << 20) > self.memory_budget:
+                print(f"  Warning: compact tables ({total:,.1f} MB) exceed the budget; it was not met")
+            self.analysis_results['memory'] = self.memory_report
+
+    def _parallel_groupby(self):
+        """The ParallelGroupBy over self.df shared by the batch and station tables (None when n_jobs is 1)."""
+        if self.n_jobs == 1:
+            return None
+        if self._groupby is None or self._groupby.source is not self.df:
+            from parallel_groupby import ParallelGroupBy
+
+            if self._groupby is not None:
+                self._groupby.close()
+            self._groupby = ParallelGroupBy(self.df, n_jobs=self.n_jobs)
+        return self._groupby
+
+    def memory_footprint(self):
+        """Rows, columns and MB held by the event, quarantine and batch tables."""
+        return footprint_report({'events': self.df, 'quarantine': self.quarantine_df, 'batches': self.batch_df})
         
     def analyze_fundamental_components(self):
         """First Principles: Analyze fundamental failure components."""
+        from scipy import stats
+
         print("\n=== PHASE 2: FIRST PRINCIPLES DECOMPOSITION ===")
         
         results = {}
@@ -139,6 +252,7 @@ class PaintQualityAnalyzer:
             print(f"  {metric}: {value:.1%}")
             
         results['complexity_analysis'] = complexity_analysis
+        results['complexity_effect'] = complexity_effect
         
         # 3. Temperature Analysis
         print("\n--- 3. TEMPERATURE ANALYSIS ---")
@@ -158,6 +272,7 @@ class PaintQualityAnalyzer:
             print(f"  {metric}: {value:.1%}")
             
         results['temperature_analysis'] = temp_analysis
+        results['temperature_effect'] = temp_effect
         
         self.analysis_results['fundamental_components'] = results
         return results
@@ -170,13 +285,14 @@ class PaintQualityAnalyzer:
 
         # 1. Station Performance Analysis
         print("\n--- 1. DOSING STATION PERFORMANCE ---")
-        station_analysis = self.df.groupby('Dosing_Station').agg({
-            'Dosing_Error_Abs': ['mean', 'std', 'count'],
-            'QC_Result': lambda x: (x == 'failed').mean()
-        }).round(4)
-
-        station_analysis.columns = ['Mean_Error', 'Error_Std', 'Event_Count', 'Failure_Rate']
-        station_analysis = station_analysis.reset_index()
+        # Mean/std are outlier-driven, so also report robust quantiles from mergeable sketches
+        if self.error_sketches is None:
+            self.error_sketches = DosingErrorSketches.from_events(self.df)
+        station_analysis = build_station_table(self.df, sketches=self.error_sketches, groupby=self._parallel_groupby())
+        if self._groupby is not None:
+            # Both tables are built; free the shared arrays and stop the pool
+            self._groupby.close()
+            self._groupby = None
         print(station_analysis)
 
         # Station bias analysis
@@ -189,6 +305,7 @@ class PaintQualityAnalyzer:
 
         results['station_analysis'] = station_analysis
         results['station_bias'] = station_bias
+        results['station_day_error_quantiles'] = self.error_sketches.quantiles('station_day')
 
         # 2. Interaction Effects
         print("\n--- 2. INTERACTION EFFECTS ---")
@@ -213,6 +330,13 @@ class PaintQualityAnalyzer:
 
         results['interaction_analysis'] = interaction_analysis
 
+        # Every 2- and 3-way factor interaction, marginalized from one contingency cube
+        interaction_scan = InteractionCube(self.df).scan()
+        print("\nStrongest Interactions (main-effects deviance):")
+        print(interaction_scan['interactions'].head(5)[['Interaction', 'G', 'DF', 'P_Value', 'Max_Lift']].round(4))
+
+        results['interaction_scan'] = interaction_scan
+
         # 3. Temporal Patterns
         print("\n--- 3. TEMPORAL PATTERNS ---")
         self.batch_df['Month'] = self.batch_df['Production_Date_first'].dt.month
@@ -223,22 +347,31 @@ class PaintQualityAnalyzer:
 
         results['temporal_analysis'] = monthly_analysis
 
+        # Time of day and shift, bucketed from the int64 production timestamps
+        time_patterns = failure_cube(self.df)
+        print("\nShift Failure Rates:")
+        print(time_patterns['by_shift'])
+        print(f"  Chi-square p-value (shift effect): {time_patterns['shift_p_value']:.2e}")
+        print("Weekday Failure Rates:")
+        print(time_patterns['by_weekday'])
+
+        results['time_patterns'] = time_patterns
+
         self.analysis_results['systems_interactions'] = results
         return results
 
     def build_predictive_model(self):
         """Build interpretable predictive model."""
+        from sklearn.model_selection import train_test_split
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.metrics import roc_auc_score
+        from sklearn.preprocessing import StandardScaler
+
         print("\n=== PHASE 4: PREDICTIVE MODELING ===")
 
         # Feature engineering
-        features = [
-            'Num_Ingredients_first',
-            'Facility_Temperature_mean',
-            'Dosing_Error_Abs_mean',
-            'Dosing_Error_Abs_max',
-            'Dosing_Error_Abs_std',
-            'Dosing_Station_nunique'
-        ]
+        features = MODEL_FEATURES
 
         # Prepare data
         model_data = self.batch_df[features + ['Failed']].dropna()
@@ -254,7 +387,7 @@ class PaintQualityAnalyzer:
             'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42)
         }
 
-        results = {}
+        results = {'models': models, 'features': features}
 
         for name, model in models.items():
             print(f"\n--- {name.upper()} ---")
@@ -262,6 +395,7 @@ class PaintQualityAnalyzer:
             # Train model
             if name == 'Logistic Regression':
                 scaler = StandardScaler()
+                results['scaler'] = scaler
                 X_train_scaled = scaler.fit_transform(X_train)
                 X_test_scaled = scaler.transform(X_test)
                 model.fit(X_train_scaled, y_train)
@@ -296,39 +430,66 @@ class PaintQualityAnalyzer:
 
         recommendations = []
 
+        # Rates come from the first-principles phase so findings track the current data
+        fundamentals = self.analysis_results['fundamental_components']
+        complexity = fundamentals['complexity_effect']
+        temperature = fundamentals['temperature_effect']
+
         # Priority 1: Recipe Complexity Management
-        complex_impact = (0.416 - 0.289) * 100  # 12.7% improvement potential
+        complex_impact = (complexity['Complex_Recipes_Failure_Rate'] - complexity['Simple_Recipes_Failure_Rate']) * 100
         recommendations.append({
             'Priority': 1,
             'Issue': 'Recipe Complexity Threshold',
-            'Finding': 'Recipes >15 ingredients have 41.6% vs 28.9% failure rate',
+            'Finding': (f"Recipes >15 ingredients have {complexity['Complex_Recipes_Failure_Rate']:.1%} "
+                        f"vs {complexity['Simple_Recipes_Failure_Rate']:.1%} failure rate"),
             'Impact': f'{complex_impact:.1f}% failure reduction potential',
             'Action': 'Implement complexity limits or enhanced controls for complex recipes',
             'Implementation': 'Immediate - policy change'
         })
 
         # Priority 2: Temperature Control
-        temp_impact = (0.395 - 0.289) * 100  # 10.6% improvement potential
+        temp_impact = (temperature['Suboptimal_Temp_Failure_Rate'] - temperature['Optimal_Temp_Failure_Rate']) * 100
         recommendations.append({
             'Priority': 2,
             'Issue': 'Temperature Control',
-            'Finding': 'Optimal range 20-25°C shows 28.9% vs 39.5% failure rate',
+            'Finding': (f"Optimal range 20-25°C shows {temperature['Optimal_Temp_Failure_Rate']:.1%} "
+                        f"vs {temperature['Suboptimal_Temp_Failure_Rate']:.1%} failure rate"),
             'Impact': f'{temp_impact:.1f}% failure reduction potential',
             'Action': 'Tighten temperature control to 20-25°C range',
             'Implementation': 'Medium-term - HVAC system optimization'
         })
 
-        # Priority 3: Station-Specific Issues
-        station_data = self.analysis_results['systems_interactions']['station_analysis']
-        worst_station = station_data.loc[station_data['Failure_Rate'].idxmax()]
-        recommendations.append({
-            'Priority': 3,
-            'Issue': f'Station {worst_station["Dosing_Station"]} Performance',
-            'Finding': f'Highest failure rate: {worst_station["Failure_Rate"]:.1%}',
-            'Impact': 'Station-specific improvement needed',
-            'Action': f'Calibrate/service station {worst_station["Dosing_Station"]}',
-            'Implementation': 'Short-term - maintenance action'
-        })
+        # Priority 3: Station calibration, from the cost-optimal maintenance schedule
+        from maintenance_optimizer import MaintenanceOptimizer
+
+        optimizer = MaintenanceOptimizer(self.df)
+        schedules = optimizer.optimize()
+        plan = optimizer.station_plan(schedules)
+        self.analysis_results['maintenance_schedule'] = {'schedules': schedules, 'station_plan': plan}
+
+        station = plan.iloc[0]
+        if station['Calibrations']:
+            recommendations.append({
+                'Priority': 3,
+                'Issue': f'Station {station["Dosing_Station"]} Calibration',
+                'Finding': f'Bias {station["Current_Bias"]:+.3f}, drifting {station["Drift_Per_Day"]:+.4f}/day',
+                'Impact': (f'{station["Failures_Prevented"]:.1f} failures prevented over {optimizer.horizon_days} days '
+                           f'({station["Failure_Rate_Reduction"]:.1%} failure reduction)'),
+                'Action': (f'Calibrate station {station["Dosing_Station"]} on {station["First_Calibration"].date()} '
+                           f'({int(plan["Calibrations"].sum())} calibrations in the optimal schedule)'),
+                'Implementation': 'Short-term - maintenance action'
+            })
+        else:
+            station_data = self.analysis_results['systems_interactions']['station_analysis']
+            station = station_data.loc[station_data['Failure_Rate'].idxmax()]
+            recommendations.append({
+                'Priority': 3,
+                'Issue': f'Station {station["Dosing_Station"]} Performance',
+                'Finding': f'Highest failure rate: {station["Failure_Rate"]:.1%}',
+                'Impact': f'No calibration pays for itself within {optimizer.horizon_days} days',
+                'Action': f'Monitor station {station["Dosing_Station"]} bias and drift',
+                'Implementation': 'Ongoing - monitoring'
+            })
 
         print("\n--- TOP RECOMMENDATIONS ---")
         for rec in recommendations:
@@ -341,7 +502,7 @@ class PaintQualityAnalyzer:
         # Answer key business questions
         print("\n--- KEY BUSINESS QUESTIONS ANSWERED ---")
         print("1. If plant manager could fix ONE thing tomorrow:")
-        print("   → Focus on recipe complexity management (12.7% improvement potential)")
+        print(f"   → Focus on recipe complexity management ({complex_impact:.1f}% improvement potential)")
 
         print("\n2. Top 3 failure drivers:")
         print("   → Recipe complexity (>15 ingredients)")
@@ -349,7 +510,7 @@ class PaintQualityAnalyzer:
         print("   → Station-specific dosing errors")
 
         print(f"\n3. Station needing immediate attention:")
-        print(f"   → Station {worst_station['Dosing_Station']} (highest failure rate)")
+        print(f"   → Station {station['Dosing_Station']} ({recommendations[-1]['Action']})")
 
         self.analysis_results['recommendations'] = recommendations
         return recommendations
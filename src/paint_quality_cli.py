@@ -0,0 +1,617 @@
+"""
+Command-Line Interface for Paint Quality Analysis
+Subcommands for ingesting, analyzing, modeling, scoring, rendering and
+benchmarking. Heavy libraries are imported inside the subcommands that need
+them so quick commands start fast.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import pickle
+import sys
+import time
+
+from result_export import explain_scores, to_jsonable
+
+DEFAULT_INPUT = "data/paint_production_data.csv"
+
+
+def _load_analyzer(path, quiet=False, quarantine_dir=None, filters=None, memory_budget=None, n_jobs=1):
+    """Create an analyzer and load its data, optionally silencing phase output."""
+    from paint_analysis import PaintQualityAnalyzer
+
+    analyzer = PaintQualityAnalyzer(path, quarantine_dir=quarantine_dir, memory_budget=memory_budget, n_jobs=n_jobs,
+                                    **(filters or {}))
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        analyzer.load_and_validate_data()
+    return analyzer
+
+
+def _filters(args):
+    """Event filters from the --start/--end/--stations options."""
+    return {"start": args.start, "end": args.end, "stations": args.stations.split(",") if args.stations else None}
+
+
+def _write_table(df, path):
+    """Write a frame as CSV or pickle depending on the file extension."""
+    if path.endswith((".pkl", ".pickle")):
+        df.to_pickle(path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _is_batch_table(path, columns):
+    """Whether path holds a batch table with these columns (from its extension or CSV header) rather than raw events.
+
+    Directories are event stores or archives, which hold raw events.
+    """
+    if os.path.isdir(path):
+        return False
+    if path.endswith((".pkl", ".pickle")):
+        return True
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    return set(columns).issubset(header)
+
+
+def _read_table(path):
+    """Read a frame written by _write_table."""
+    import pandas as pd
+
+    if path.endswith((".pkl", ".pickle")):
+        return pd.read_pickle(path)
+    return pd.read_csv(path)
+
+
+def cmd_ingest(args):
+    """Load raw events and write the batch-level table."""
+    analyzer = _load_analyzer(args.input, quiet=args.quiet, quarantine_dir=args.quarantine_dir, filters=_filters(args),
+                              memory_budget=args.memory_budget, n_jobs=args.jobs)
+    if args.output:
+        _write_table(analyzer.batch_df, args.output)
+        print(f"Batch table written to {args.output}")
+    return 0
+
+
+def cmd_archive(args):
+    """Write raw events (CSV or event store) to a time-partitioned archive."""
+    import pandas as pd
+
+    from event_archive import EventArchive
+
+    if os.path.isdir(args.input):
+        from event_store import EventStore
+
+        events = EventStore(args.input).read()
+    else:
+        events = pd.read_csv(args.input)
+    archive = EventArchive.write(events, args.output, block_rows=args.block_rows)
+    print(f"Archived {len(archive):,} events in {archive.stats['blocks_total']} blocks -> {args.output}")
+    return 0
+
+
+def cmd_daemon(args):
+    """Ingest events continuously from a file, named pipe or Unix socket into an event store."""
+    import asyncio
+
+    from ingestion_daemon import FileTailSource, IngestionDaemon, NamedPipeSource, UnixSocketSource
+
+    if args.source == "file":
+        source = FileTailSource(args.input, follow=args.follow)
+    elif args.source == "pipe":
+        source = NamedPipeSource(args.input)
+    else:
+        source = UnixSocketSource(args.input)
+
+    daemon = IngestionDaemon(source, args.store, batch_size=args.batch_size, wal=not args.no_wal)
+    try:
+        stats = asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        stats = daemon.stats
+    if stats["events_replayed"]:
+        print(f"Replayed {stats['events_replayed']:,} logged events from the write-ahead log")
+    print(f"Stored {stats['events_stored']:,} events ({stats['events_quarantined']:,} quarantined) "
+          f"in {stats['micro_batches']} micro-batches, {stats['events_per_second']:,.0f} events/s")
+    return 0
+
+
+def cmd_analyze(args):
+    """Run the diagnostic phases and recommendations."""
+    analyzer = _load_analyzer(args.input, filters=_filters(args), memory_budget=args.memory_budget, n_jobs=args.jobs)
+    analyzer.analyze_fundamental_components()
+    analyzer.analyze_systems_interactions()
+    if args.with_model:
+        analyzer.build_predictive_model()
+    analyzer.generate_business_recommendations()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(to_jsonable(analyzer.analysis_results), f, indent=2)
+        print(f"\nAnalysis results written to {args.output}")
+    return 0
+
+
+def cmd_model(args):
+    """Train the failure model (optionally tuned) and save it for scoring."""
+    analyzer = _load_analyzer(args.input, quiet=True)
+
+    if args.tune:
+        from hyperparameter_tuning import HyperparameterTuner
+
+        tuning = HyperparameterTuner(analyzer, n_jobs=args.jobs).tune(method=args.tune)
+        artifact = {
+            "family": tuning["best_family"],
+            "model": tuning["best_model"],
+            "features": tuning["features"],
+            "auc": tuning["best_cv_auc"],
+        }
+    else:
+        results = analyzer.build_predictive_model()
+        artifact = {
+            "family": "Random Forest",
+            "model": results["models"]["Random Forest"],
+            "features": results["features"],
+            "auc": results["Random Forest_auc"],
+        }
+
+    # Prefer a NumPy-only compiled form so scoring never has to import scikit-learn
+    from compiled_model import compile_model
+
+    compiled = compile_model(artifact["model"])
+    if compiled is not None:
+        artifact["model"] = compiled
+
+    with open(args.output, "wb") as f:
+        pickle.dump(artifact, f)
+    print(f"\n{artifact['family']} model (ROC-AUC {artifact['auc']:.4f}) saved to {args.output}")
+    return 0
+
+
+def cmd_score(args):
+    """Score batches with a saved model."""
+    import pandas as pd
+
+    with open(args.model, "rb") as f:
+        artifact = pickle.load(f)
+    features = artifact["features"]
+
+    # Read the input once: a batch table as is, raw events (CSV, event store or archive) through the analyzer
+    if _is_batch_table(args.input, features):
+        batches = _read_table(args.input)
+    else:
+        batches = _load_analyzer(args.input, quiet=True).batch_df
+
+    scorable = batches.dropna(subset=features)
+    scores = scorable[["Batch_ID"]].copy()
+    X = scorable[features] if hasattr(artifact["model"], "feature_names_in_") else scorable[features].to_numpy(dtype=float)
+    scores["Risk_Score"] = artifact["model"].predict_proba(X)[:, 1]
+    if args.explain:
+        if not hasattr(artifact["model"], "explain"):
+            print("paint-quality: this model type has no per-batch explanations", file=sys.stderr)
+            return 1
+        contributions = explain_scores(artifact["model"], X, features)
+        scores = pd.concat([scores.reset_index(drop=True), contributions], axis=1)
+    scores = scores.sort_values("Risk_Score", ascending=False)
+
+    if args.output:
+        _write_table(scores, args.output)
+        print(f"Scored {len(scores)} batches -> {args.output}")
+    else:
+        print(scores.head(args.top).to_string(index=False))
+    return 0
+
+
+def cmd_risk_table(args):
+    """Compile the model and historical rates into a pre-production risk table."""
+    from risk_table import RiskTable
+
+    analyzer = _load_analyzer(args.input, quiet=True)
+    if args.model:
+        with open(args.model, "rb") as f:
+            artifact = pickle.load(f)
+        model, features = artifact["model"], artifact["features"]
+    else:
+        from compiled_model import compile_model
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = analyzer.build_predictive_model()
+        model = compile_model(results["models"]["Random Forest"])
+        features = results["features"]
+
+    start = time.perf_counter()
+    table = RiskTable.build(analyzer.df, model, features, n_draws=args.draws)
+    table.save(args.output)
+    print(f"Risk table {table.table.shape} ({table.table.nbytes / 1024:.0f} KiB) built in "
+          f"{time.perf_counter() - start:.2f}s -> {args.output}")
+    return 0
+
+
+def cmd_gate(args):
+    """Look up a planned batch in the risk table (exit status 2 = hold)."""
+    from risk_table import RiskTable
+
+    table = RiskTable.load(args.table)
+    risk = table.risk(args.recipe, args.stations.split(","), args.temperature, args.num_ingredients)
+    decision = "HOLD" if risk >= args.threshold else "GO"
+    print(f"{decision} risk={risk:.3f} threshold={args.threshold:.3f}")
+    return 2 if decision == "HOLD" else 0
+
+
+def cmd_sql(args):
+    """Run an ad-hoc SQL query over events, batches and event_outcomes."""
+    from sql_layer import SQLLayer
+
+    if os.path.isdir(args.input):
+        from event_store import EventStore
+
+        layer = SQLLayer(store=EventStore(args.input))
+    else:
+        from data_access import load_event_table
+
+        layer = SQLLayer(events=load_event_table(args.input))
+
+    result = layer.query(args.query)
+    if args.output:
+        _write_table(result, args.output)
+        print(f"{len(result)} rows -> {args.output}")
+    else:
+        print(result.to_string(index=False))
+    if args.explain:
+        print(json.dumps(layer.last_plan, indent=2, default=str), file=sys.stderr)
+    return 0
+
+
+def cmd_maintenance(args):
+    """Rank station calibration schedules over a planning horizon."""
+    from maintenance_optimizer import MaintenanceOptimizer
+
+    analyzer = _load_analyzer(args.input, quiet=True)
+    optimizer = MaintenanceOptimizer(
+        analyzer.df, horizon_days=args.horizon, cost_per_failure=args.cost_per_failure,
+        service_cost=args.service_cost, downtime_hours=args.downtime_hours, crew_capacity=args.crew
+    )
+    start = time.perf_counter()
+    schedules = optimizer.optimize(top=args.top)
+    plan = optimizer.station_plan(schedules)
+
+    print(f"Schedules from {optimizer.start_date.date()} over {args.horizon} days "
+          f"(searched in {time.perf_counter() - start:.2f}s):")
+    print(schedules.drop(columns="Schedule").round(2).to_string(index=False))
+    print("\nBest schedule by station:")
+    plan["Calibration_Dates"] = plan["Calibration_Dates"].map(lambda dates: ", ".join(str(d.date()) for d in dates))
+    columns = ["Dosing_Station", "Current_Bias", "Drift_Per_Day", "Calibrations", "Calibration_Dates", "Failures_Prevented"]
+    print(plan[columns].round(4).to_string(index=False))
+    if args.output:
+        _write_table(plan[columns], args.output)
+    return 0
+
+
+def cmd_interactions(args):
+    """Rank every 2- and 3-way factor interaction from one contingency cube."""
+    from interaction_scan import InteractionCube
+
+    analyzer = _load_analyzer(args.input, quiet=True, filters=_filters(args), memory_budget=args.memory_budget,
+                              n_jobs=args.jobs)
+    start = time.perf_counter()
+    cube = InteractionCube(analyzer.df)
+    scan = cube.scan(max_order=args.order, min_batches=args.min_batches, top=args.top)
+    print(f"{len(scan['interactions'])} interactions over {cube.n_batches} batches "
+          f"(scanned in {time.perf_counter() - start:.2f}s):")
+    print(scan["interactions"].head(args.top).round(4).to_string(index=False))
+    print("\nCells furthest from their main-effects expectation:")
+    print(scan["cells"].round(4).to_string(index=False))
+    if args.output:
+        _write_table(scan["cells"], args.output)
+    return 0
+
+
+def cmd_recipe_risk(args):
+    """Cold-start risk of a recipe from its most similar existing recipes."""
+    from recipe_similarity import RecipeSimilarityIndex
+
+    analyzer = _load_analyzer(args.input, quiet=True)
+    index = RecipeSimilarityIndex(n_neighbors=args.neighbors).fit(analyzer.df)
+    if args.recipe:
+        targets = index.recipe_profile(args.recipe)
+    else:
+        targets = [float(value) for value in args.targets.split(",")]
+
+    result = index.risk_score(targets)
+    print(result["Neighbours"].round(4).to_string(index=False))
+    print(f"\nRisk score: {result['Risk_Score']:.1%} (plant base rate {result['Base_Rate']:.1%})")
+    return 0
+
+
+def cmd_simulate(args):
+    """Simulate the dosing line under candidate interventions."""
+    from production_simulator import ProductionSimulator
+
+    analyzer = _load_analyzer(args.input, quiet=True)
+    simulator = ProductionSimulator.fit(analyzer.df)
+    if args.events_output:
+        events = simulator.simulate_events(args.batches)
+        _write_table(events, args.events_output)
+        print(f"Wrote {len(events):,} simulated events ({args.batches:,} batches) to {args.events_output}")
+        return 0
+
+    scenarios = {"baseline": {}}
+    if args.recalibrate:
+        worst = simulator.stations["Bias"].abs().nlargest(args.recalibrate).index
+        scenarios[f"recalibrate {', '.join(worst)}"] = {"recalibrate": list(worst)}
+    scenarios["temperature 20-25C"] = {"temperature_band": (20, 25)}
+    scenarios[f"complexity <= {args.complexity_cap}"] = {"complexity_cap": args.complexity_cap}
+
+    start = time.perf_counter()
+    results = simulator.compare(scenarios, n_batches=args.batches, chunk_size=args.chunk_size, n_jobs=args.jobs)
+    print(f"{args.batches:,} batches per scenario ({time.perf_counter() - start:.2f}s):")
+    print(results.round(4).to_string(index=False))
+    if args.output:
+        _write_table(results, args.output)
+    return 0
+
+
+def cmd_report(args):
+    """Render the executive summary, running only the analysis phases that changed sections need."""
+    from data_access import data_version
+    from report_builder import ReportBuilder, report_inputs, report_sources
+
+    # Fingerprint the inputs before loading anything: unchanged data and settings reuse every section
+    data_key = [data_version(args.input), _filters(args), args.memory_budget]
+    sources = report_sources(data_key, cost_per_failure=args.cost_per_failure, with_model=args.with_model)
+    builder = ReportBuilder(state_path=args.state)
+    aggregates, phases = builder.needed(sources)
+
+    inputs = {}
+    if aggregates:
+        analyzer = _load_analyzer(args.input, quiet=True, filters=_filters(args), memory_budget=args.memory_budget,
+                                  n_jobs=args.jobs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if "fundamentals" in phases:
+                analyzer.analyze_fundamental_components()
+            if "systems" in phases:
+                analyzer.analyze_systems_interactions()
+            if "model" in phases and args.with_model:
+                analyzer.build_predictive_model()
+            if "recommendations" in phases:
+                analyzer.generate_business_recommendations()
+        inputs = report_inputs(analyzer, cost_per_failure=args.cost_per_failure, names=aggregates)
+
+    builder.write(inputs, args.output, sources)
+    print(f"Report written to {args.output} ({len(builder.stats['rendered'])} sections rendered, "
+          f"{len(builder.stats['reused'])} reused)")
+    return 0
+
+
+def cmd_serve(args):
+    """Serve analysis results over HTTP with warm in-memory state."""
+    from analysis_service import serve
+
+    serve(args.input, host=args.host, port=args.port, model_path=args.model, n_workers=args.workers,
+          enable_sql=args.enable_sql)
+    return 0
+
+
+def cmd_dashboard(args):
+    """Serve a dashboard that follows an event store with incremental updates."""
+    from live_dashboard import serve
+
+    serve(args.input, host=args.host, port=args.port, interval=args.interval)
+    return 0
+
+
+def cmd_render(args):
+    """Generate the stakeholder visualizations."""
+    from visualization_generator import VisualizationGenerator
+
+    analyzer = _load_analyzer(args.input, quiet=True)
+    analyzer.analyze_fundamental_components()
+    analyzer.analyze_systems_interactions()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    viz_gen = VisualizationGenerator(analyzer, output_dir=args.output_dir,
+                                     include_plotlyjs="cdn" if args.cdn else True)
+    viz_gen.create_executive_dashboard()
+    viz_gen.create_action_priority_chart()
+    viz_gen.create_station_analysis_chart()
+    viz_gen.create_event_level_chart(max_points=args.max_points)
+    return 0
+
+
+def cmd_bench(args):
+    """Time each analysis phase over repeated runs."""
+    from paint_analysis import PaintQualityAnalyzer
+
+    phases = [
+        ("load", "load_and_validate_data"),
+        ("fundamentals", "analyze_fundamental_components"),
+        ("systems", "analyze_systems_interactions"),
+    ]
+    if args.with_model:
+        phases.append(("model", "build_predictive_model"))
+
+    timings = {name: [] for name, _ in phases}
+    for _ in range(args.repeat):
+        analyzer = PaintQualityAnalyzer(args.input, n_jobs=args.jobs)
+        for name, method in phases:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, method)()
+            timings[name].append(time.perf_counter() - start)
+
+    print(f"{'Phase':<14}{'Best (s)':>10}{'Mean (s)':>10}")
+    for name, values in timings.items():
+        print(f"{name:<14}{min(values):>10.3f}{sum(values) / len(values):>10.3f}")
+
+    if args.groupby:
+        from parallel_groupby import benchmark
+
+        groupby = benchmark(analyzer.df, n_jobs=args.jobs, repeat=args.repeat)
+        parallel = groupby["parallel_setup"] + groupby["parallel_tables"]
+        print(f"\nBatch + station tables, best of {args.repeat} (jobs={args.jobs or 'all'}):")
+        print(f"  serial group-by     {groupby['serial']:>8.3f}s")
+        print(f"  partition + share   {groupby['parallel_setup']:>8.3f}s")
+        print(f"  parallel tables     {groupby['parallel_tables']:>8.3f}s")
+        print(f"  speedup             {groupby['serial'] / parallel:>8.2f}x")
+        timings["groupby"] = groupby
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(timings, f, indent=2)
+    return 0
+
+
+def _add_filter_arguments(sub):
+    """Add the --start/--end/--stations event filters and the --memory-budget/--jobs load options to a subcommand."""
+    sub.add_argument("--start", help="first production timestamp to include, e.g. 2024-06-01")
+    sub.add_argument("--end", help="production timestamp to stop before")
+    sub.add_argument("--stations", help="comma-separated dosing stations to include")
+    sub.add_argument("--memory-budget", help="compact dtypes, and load in chunks above this size (e.g. 2GB)")
+    sub.add_argument("--jobs", "-j", type=int, default=1, help="processes for batch/station group-bys (0 = all cores)")
+
+
+def build_parser():
+    """Argument parser with one subparser per command."""
+    parser = argparse.ArgumentParser(prog="paint-quality", description="Paint manufacturing quality analysis")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, func, help_text):
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument("--input", "-i", default=DEFAULT_INPUT, help=f"input data file (default: {DEFAULT_INPUT})")
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = add_command("ingest", cmd_ingest, "Load raw events and build the batch table")
+    sub.add_argument("--output", "-o", help="write the batch table (.csv or .pkl)")
+    sub.add_argument("--quiet", "-q", action="store_true", help="suppress data-quality report")
+    sub.add_argument("--quarantine-dir", help="write rejected rows under this directory")
+    _add_filter_arguments(sub)
+
+    sub = add_command("archive", cmd_archive, "Write events to a compressed time-partitioned archive")
+    sub.add_argument("--output", "-o", default="event_archive", help="archive directory (default: event_archive)")
+    sub.add_argument("--block-rows", type=int, default=65536, help="max events per compressed block (default: 65536)")
+
+    sub = add_command("daemon", cmd_daemon, "Ingest streamed events into a columnar event store")
+    sub.add_argument("--source", choices=["file", "pipe", "socket"], default="file", help="kind of --input (default: file)")
+    sub.add_argument("--store", "-s", default="event_store", help="event store directory (default: event_store)")
+    sub.add_argument("--follow", "-f", action="store_true", help="keep tailing the file for new lines")
+    sub.add_argument("--batch-size", type=int, default=20000, help="events per committed micro-batch")
+    sub.add_argument("--no-wal", action="store_true", help="skip the write-ahead log (chunks in flight are lost on a crash)")
+
+    sub = add_command("analyze", cmd_analyze, "Run diagnostic analysis and recommendations")
+    sub.add_argument("--output", "-o", help="write analysis results as JSON")
+    sub.add_argument("--with-model", action="store_true", help="include the predictive-model phase")
+    _add_filter_arguments(sub)
+
+    sub = add_command("model", cmd_model, "Train the failure model and save it")
+    sub.add_argument("--output", "-o", default="model.pkl", help="model artifact path (default: model.pkl)")
+    sub.add_argument("--tune", choices=["successive_halving", "hyperband"], help="tune hyperparameters first")
+    sub.add_argument("--jobs", "-j", type=int, help="worker processes for tuning")
+
+    sub = add_command("score", cmd_score, "Score batches with a saved model")
+    sub.add_argument("--model", "-m", default="model.pkl", help="model artifact path (default: model.pkl)")
+    sub.add_argument("--output", "-o", help="write scores (.csv or .pkl)")
+    sub.add_argument("--top", type=int, default=20, help="rows to print when no output is given")
+    sub.add_argument("--explain", action="store_true", help="add per-feature contributions (TreeSHAP / logistic)")
+
+    sub = add_command("sql", cmd_sql, "Query events, batches and event_outcomes with SQL")
+    sub.add_argument("query", help="SELECT statement")
+    sub.add_argument("--output", "-o", help="write the result (.csv or .pkl)")
+    sub.add_argument("--explain", action="store_true", help="print the pushdown plan to stderr")
+
+    sub = add_command("risk-table", cmd_risk_table, "Compile a pre-production risk lookup table")
+    sub.add_argument("--model", "-m", help="saved model artifact (default: train a random forest)")
+    sub.add_argument("--output", "-o", default="risk_table.npz", help="table path (default: risk_table.npz)")
+    sub.add_argument("--draws", type=int, default=4, help="simulated dosings averaged per cell (default: 4)")
+
+    # Runs at the line controller: reads only the table, so no --input
+    help_text = "Gate a planned batch with a risk table lookup (exit status 2 = hold)"
+    sub = subparsers.add_parser("gate", help=help_text, description=help_text)
+    sub.set_defaults(func=cmd_gate)
+    sub.add_argument("--table", "-t", default="risk_table.npz", help="risk table (default: risk_table.npz)")
+    sub.add_argument("--recipe", "-r", required=True, help="recipe name")
+    sub.add_argument("--stations", "-s", required=True, help="comma-separated assigned dosing stations")
+    sub.add_argument("--temperature", type=float, required=True, help="current facility temperature (°C)")
+    sub.add_argument("--num-ingredients", type=int, help="ingredient count, required for recipes not in the table")
+    sub.add_argument("--threshold", type=float, default=0.5, help="hold at or above this risk (default: 0.5)")
+
+    sub = add_command("maintenance", cmd_maintenance, "Optimize the station calibration schedule")
+    sub.add_argument("--horizon", type=int, default=28, help="planning horizon in days (default: 28)")
+    sub.add_argument("--crew", type=int, default=1, help="calibrations the crew can do per day (default: 1)")
+    sub.add_argument("--cost-per-failure", type=float, default=1000, help="cost of one failed batch (default: 1000)")
+    sub.add_argument("--service-cost", type=float, default=500, help="cost of one calibration visit (default: 500)")
+    sub.add_argument("--downtime-hours", type=float, default=4, help="station downtime per calibration (default: 4)")
+    sub.add_argument("--top", type=int, default=10, help="schedules to rank (default: 10)")
+    sub.add_argument("--output", "-o", help="write the best per-station plan (.csv or .pkl)")
+
+    sub = add_command("interactions", cmd_interactions, "Scan factor interactions for failure-rate lift")
+    sub.add_argument("--order", type=int, default=3, choices=[2, 3], help="highest interaction order (default: 3)")
+    sub.add_argument("--min-batches", type=int, default=20, help="smallest cell reported (default: 20)")
+    sub.add_argument("--top", type=int, default=25, help="rows to show (default: 25)")
+    sub.add_argument("--output", "-o", help="write the ranked cells as CSV or pickle")
+    _add_filter_arguments(sub)
+
+    sub = add_command("recipe-risk", cmd_recipe_risk, "Score a new recipe from similar existing recipes")
+    group = sub.add_mutually_exclusive_group(required=True)
+    group.add_argument("--targets", "-t", help="comma-separated target amounts in dosing order")
+    group.add_argument("--recipe", "-r", help="existing recipe name to look up instead")
+    sub.add_argument("--neighbors", "-k", type=int, default=5, help="similar recipes to use (default: 5)")
+
+    sub = add_command("simulate", cmd_simulate, "Simulate the dosing line under candidate interventions")
+    sub.add_argument("--batches", "-n", type=int, default=1_000_000, help="batches per scenario (default: 1000000)")
+    sub.add_argument("--chunk-size", type=int, default=100_000, help="batches simulated per array chunk (default: 100000)")
+    sub.add_argument("--jobs", "-j", type=int, default=1, help="worker processes (0 = all cores, default: 1)")
+    sub.add_argument("--recalibrate", type=int, default=2, help="most biased stations to recalibrate (default: 2)")
+    sub.add_argument("--complexity-cap", type=int, default=15, help="max ingredients per recipe scenario (default: 15)")
+    sub.add_argument("--output", "-o", help="write the scenario table (.csv or .pkl)")
+    sub.add_argument("--events-output", help="write simulated raw events instead of comparing scenarios")
+
+    sub = add_command("report", cmd_report, "Render the executive summary from the data")
+    sub.add_argument("--output", "-o", default="EXECUTIVE_SUMMARY.md", help="report path (default: EXECUTIVE_SUMMARY.md)")
+    sub.add_argument("--state", default=".report_state.json", help="rendered-section cache (default: .report_state.json)")
+    sub.add_argument("--with-model", action="store_true", help="include the predictive-model section")
+    sub.add_argument("--cost-per-failure", type=float, default=1000, help="cost of one failed batch (default: 1000)")
+    _add_filter_arguments(sub)
+
+    sub = add_command("serve", cmd_serve, "Serve health, metrics and analysis endpoints over HTTP")
+    sub.add_argument("--host", default="127.0.0.1", help="bind address (default: 127.0.0.1)")
+    sub.add_argument("--port", "-p", type=int, default=8000, help="port (default: 8000)")
+    sub.add_argument("--workers", "-w", type=int, default=2, help="worker processes for heavy queries (0 = in-process)")
+    sub.add_argument("--model", "-m", help="saved model artifact for risk scores (default: train on first request)")
+    sub.add_argument("--enable-sql", action="store_true", help="expose the read-only /sql endpoint (off by default)")
+
+    sub = add_command("dashboard", cmd_dashboard, "Serve a live dashboard that follows an event store")
+    sub.add_argument("--host", default="127.0.0.1", help="bind address (default: 127.0.0.1)")
+    sub.add_argument("--port", "-p", type=int, default=8050, help="port (default: 8050)")
+    sub.add_argument("--interval", type=float, default=2.0, help="seconds between checks for new segments (default: 2)")
+
+    sub = add_command("render", cmd_render, "Generate stakeholder visualizations")
+    sub.add_argument("--output-dir", "-o", default="visualizations", help="chart directory (default: visualizations)")
+    sub.add_argument("--max-points", type=int, default=4000, help="points kept in event-level time series (default: 4000)")
+    sub.add_argument("--cdn", action="store_true", help="link plotly.js from a CDN instead of embedding it in each file")
+
+    sub = add_command("bench", cmd_bench, "Time the analysis phases")
+    sub.add_argument("--repeat", "-r", type=int, default=3, help="number of runs (default: 3)")
+    sub.add_argument("--with-model", action="store_true", help="include the predictive-model phase")
+    sub.add_argument("--jobs", "-j", type=int, default=1, help="processes for batch/station group-bys (0 = all cores)")
+    sub.add_argument("--groupby", action="store_true", help="also compare serial and parallel batch/station group-bys")
+    sub.add_argument("--output", "-o", help="write timings as JSON")
+
+    return parser
+
+
+def main(argv=None):
+    """Entry point for the paint-quality command."""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (FileNotFoundError, MemoryError) as e:  # MemoryError: includes memory_budget.MemoryBudgetError
+        print(f"paint-quality: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
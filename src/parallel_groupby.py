@@ -0,0 +1,239 @@
+"""
+Parallel Partitioned Group-By
+Hash-partitions dosing events by Batch_ID across a process pool. The event
+columns the batch and station aggregations need are copied once, in row
+order, into shared-memory arrays along with a row order grouped by
+partition; workers attach to them and gather their own partition's rows, so
+no event frame is ever pickled and the parent never reorders the columns.
+Batches never span partitions, so batch rows come back final; stations do,
+so workers return mergeable per-station sums that are combined in the
+parent. Per-batch 'first' values are taken from each batch's first row in
+the parent, so only the batch and station labels are factorized. One
+instance serves both tables from the same arrays and pool.
+"""
+
+import os
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data_access import (BATCH_AGGREGATIONS, add_dosing_errors, aggregate_batches, build_batch_table,
+                         build_station_table)
+
+# Label columns are shared as int32 codes (-1 for missing); workers turn them into float64 with NaN
+# so groupby and 'nunique' skip missing labels like pandas
+_CODED = ['Batch_ID', 'Dosing_Station']
+_FIRST = [column for column, agg in BATCH_AGGREGATIONS.items() if agg == 'first']
+_AGGREGATED = {column: agg for column, agg in BATCH_AGGREGATIONS.items() if agg != 'first'}
+_NUMERIC = [column for column in _AGGREGATED if column not in _CODED]
+
+
+def partition_of(labels, n_partitions):
+    """Partition of each label from a stable 64-bit hash (the same in every process and run)."""
+    return (pd.util.hash_array(np.asarray(labels, dtype=object)) % np.uint64(n_partitions)).astype(np.int64)
+
+
+class SharedArrays:
+    """Named NumPy arrays in shared-memory blocks, created by one process and attached to by others."""
+
+    def __init__(self, arrays):
+        """Copy each array into a new shared-memory block."""
+        self.blocks, self.arrays, self.spec = [], {}, {}
+        for name, values in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            self.blocks.append(block)
+            self.arrays[name] = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+            self.arrays[name][...] = values
+            self.spec[name] = (block.name, values.dtype.str, values.shape)
+
+    @staticmethod
+    def attach(spec):
+        """(arrays, blocks) viewing the blocks described by ``spec``; keep the blocks referenced while in use."""
+        arrays, blocks = {}, []
+        for name, (block_name, dtype, shape) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        """Release and remove the blocks."""
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+class ParallelGroupBy:
+    """Batch and station aggregations of an event frame, computed partition by partition."""
+
+    def __init__(self, df, n_jobs=None, partitions_per_job=4):
+        """Partition and share the events; n_jobs=None or 0 uses every core, 1 runs in-process."""
+        if 'Dosing_Error_Abs' not in df.columns:
+            add_dosing_errors(df)
+        self.source = df
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        n_partitions = self.n_jobs * partitions_per_job
+
+        self.labels, arrays = {}, {}
+        for column in _CODED:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self.labels[column] = uniques
+            arrays[column] = codes.astype(np.int32)
+
+        # Only the distinct batch labels are hashed; rows are grouped by partition through a radix sort
+        # of the small partition numbers, in their original order within it
+        partition = partition_of(self.labels['Batch_ID'], n_partitions).astype(np.int16)[arrays['Batch_ID']]
+        arrays['order'] = np.argsort(partition, kind='stable').astype(np.int64)
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(partition, minlength=n_partitions))])
+        self.slices = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+        for column in _NUMERIC:
+            arrays[column] = df[column].to_numpy()
+        arrays['Failed'] = (df['QC_Result'] == 'failed').to_numpy(dtype=bool)
+        self.shared = SharedArrays(arrays)
+        self.pool = None
+        self._release = weakref.finalize(self, self.shared.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the pool and free the shared arrays."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if _WORKER_STATE.get('spec') == self.shared.spec:
+            _WORKER_STATE.clear()  # in-process views would keep the blocks from closing
+        self._release()
+
+    def _map(self, func, *args):
+        """Run func over every (start, stop, *args) partition task, in the pool (started once) when n_jobs > 1."""
+        tasks = [(start, stop) + args for start, stop in self.slices]
+        if self.n_jobs == 1:
+            _WORKER_STATE.update(arrays=self.shared.arrays, blocks=[], spec=self.shared.spec)
+            return [func(task) for task in tasks]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=min(self.n_jobs, len(tasks)),
+                                            initializer=_init_worker, initargs=(self.shared.spec,))
+        return list(self.pool.map(func, tasks))
+
+    def batch_table(self):
+        """Same rows and columns as build_batch_table, aggregated per partition."""
+        parts = [part for part in self._map(_batch_partition) if len(part)]
+        aggregated = pd.concat(parts, ignore_index=True).sort_values('Batch_ID', ignore_index=True)
+        codes = aggregated['Batch_ID'].to_numpy().astype(np.int64)
+
+        batch_agg = {'Batch_ID': pd.Series(self.labels['Batch_ID'].take(codes))}
+        batch_codes, n_batches = self.shared.arrays['Batch_ID'], len(self.labels['Batch_ID'])
+        first_rows = _first_rows(batch_codes, True, n_batches)[codes]
+        for column in _FIRST:
+            # Each batch's first non-missing value: its first row, unless that row is missing the value
+            values = self.source[column]
+            first = pd.Series(values.array.take(first_rows))
+            if first.isna().any():
+                rows = _first_rows(batch_codes, values.notna().to_numpy(), n_batches)[codes]
+                first = pd.Series(values.array.take(rows, allow_fill=bool((rows < 0).any())))
+            batch_agg[f"{column}_first"] = first.round(4) if pd.api.types.is_float_dtype(first) else first
+        batch_agg = pd.concat([pd.DataFrame(batch_agg), aggregated.drop(columns='Batch_ID')], axis=1)
+        batch_agg['Failed'] = (batch_agg['QC_Result_first'] == 'failed').astype(int)
+        return batch_agg
+
+    def station_table(self):
+        """Per-station Mean_Error, Error_Std, Event_Count and Failure_Rate (as build_station_table)."""
+        n, total, total_sq, events, failures = np.sum(
+            self._map(_station_partition, len(self.labels['Dosing_Station'])), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.maximum(total_sq - total ** 2 / n, 0) / (n - 1))
+            station_analysis = pd.DataFrame({
+                'Dosing_Station': self.labels['Dosing_Station'],
+                'Mean_Error': total / n,
+                'Error_Std': np.where(n > 1, std, np.nan),
+                'Event_Count': n.astype(np.int64),
+                'Failure_Rate': failures / events,
+            })
+        return station_analysis.round(4)
+
+
+def _first_rows(codes, valid, size):
+    """Index of the first valid row of each of size groups (-1 where a group has none)."""
+    rows = np.flatnonzero(valid & (codes >= 0))
+    first = np.full(size, len(codes), dtype=np.int64)
+    np.minimum.at(first, codes[rows], rows)
+    first[first == len(codes)] = -1
+    return first
+
+
+# Shared arrays attached once per process by the pool initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(spec):
+    """Attach the shared event arrays in the current process."""
+    if _WORKER_STATE.get('spec') != spec:
+        _WORKER_STATE['arrays'], _WORKER_STATE['blocks'] = SharedArrays.attach(spec)
+        _WORKER_STATE['spec'] = spec
+
+
+def _gather(start, stop, names):
+    """One partition's rows of the named shared arrays, label codes as float64 with NaN for missing."""
+    arrays = _WORKER_STATE['arrays']
+    rows = arrays['order'][start:stop]
+    frame = {}
+    for name in names:
+        values = arrays[name][rows]
+        frame[name] = np.where(values >= 0, values, np.nan) if name in _CODED else values
+    return frame
+
+
+def _batch_partition(bounds):
+    """The non-'first' batch aggregations over one partition's events (batches and stations as codes)."""
+    start, stop = bounds
+    return aggregate_batches(pd.DataFrame(_gather(start, stop, ['Batch_ID', *_AGGREGATED])), _AGGREGATED)
+
+
+def _station_partition(task):
+    """Per-station (error count, sum, sum of squares, events, failed events) over one partition."""
+    start, stop, size = task
+    arrays = _WORKER_STATE['arrays']
+    rows = arrays['order'][start:stop]
+    station = arrays['Dosing_Station'][rows]
+    keep = station >= 0
+    code = station[keep].astype(np.int64)
+    error = arrays['Dosing_Error_Abs'][rows][keep].astype(np.float64)
+    failed = arrays['Failed'][rows][keep]
+    valid = ~np.isnan(error)
+    return np.array([
+        np.bincount(code[valid], minlength=size),
+        np.bincount(code[valid], weights=error[valid], minlength=size),
+        np.bincount(code[valid], weights=error[valid] ** 2, minlength=size),
+        np.bincount(code, minlength=size),
+        np.bincount(code, weights=failed, minlength=size),
+    ], dtype=np.float64)
+
+
+def benchmark(df, n_jobs=None, repeat=3):
+    """Best-of-repeat seconds for the batch and station tables, serial and through one ParallelGroupBy."""
+    timings = {'serial': [], 'parallel_setup': [], 'parallel_tables': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build_batch_table(df)
+        build_station_table(df)
+        timings['serial'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ParallelGroupBy(df, n_jobs=n_jobs) as groupby:
+            timings['parallel_setup'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            groupby.batch_table()
+            groupby.station_table()
+            timings['parallel_tables'].append(time.perf_counter() - start)
+    return {name: min(values) for name, values in timings.items()}
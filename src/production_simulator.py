@@ -0,0 +1,264 @@
+"""
+Monte Carlo Production Simulator
+Digital twin of the dosing line fitted to the event history: stations (bias,
+noise, drift), recipes (ingredient counts and target amounts), seasonal
+facility temperature and a logistic QC-failure response. Batches are
+simulated in chunks as array operations, optionally across worker
+processes, to evaluate interventions or generate synthetic event data for
+stress-testing the analysis engines. Unlike scenario_simulation, which
+re-weights observed batches, the simulator generates new ones, so it can
+explore conditions and volumes the history does not cover.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_access import add_dosing_errors, build_batch_table
+from maintenance_optimizer import MaintenanceOptimizer
+from recipe_similarity import recipe_matrix
+
+# Centre of the 20-25°C band; the failure response uses the distance from it
+TEMP_CENTER = 22.5
+
+RESPONSE_FEATURES = ['Num_Ingredients', 'Temp_Deviation', 'Dosing_Error_Abs_mean', 'Dosing_Error_Abs_max']
+
+
+def _response_matrix(num_ingredients, temperature, error_mean, error_max):
+    """Feature matrix of the QC-failure response, in RESPONSE_FEATURES order."""
+    return np.column_stack([num_ingredients, np.abs(temperature - TEMP_CENTER), error_mean, error_max])
+
+
+class ProductionSimulator:
+    """Fitted parameters of the dosing line plus the batch simulation kernel."""
+
+    def __init__(self, stations, recipes, temperature, response, start_date, n_days):
+        """Build from fitted parameter tables; use ProductionSimulator.fit(df) for the usual path."""
+        self.stations = stations
+        self.recipes = recipes
+        self.temperature = temperature
+        self.response = response
+        self.start_date = pd.Timestamp(start_date)
+        self.n_days = int(n_days)
+
+        self.station_names = np.asarray(stations.index)
+        self.station_share = (stations['Events_Per_Day'] / stations['Events_Per_Day'].sum()).to_numpy()
+        self.recipe_names = np.asarray(recipes['Recipe_Name'])
+        self.profiles = np.stack(recipes['Profile'].to_numpy())
+        self.num_ingredients = recipes['Num_Ingredients'].to_numpy(dtype=np.int64)
+        self.recipe_share = (recipes['Batches'] / recipes['Batches'].sum()).to_numpy()
+
+    @classmethod
+    def fit(cls, df):
+        """Fit stations, recipes, temperature and the failure response from event-level data."""
+        from sklearn.linear_model import LogisticRegression
+
+        events = df.copy()
+        events['Production_Date'] = pd.to_datetime(events['Production_Date'])
+        start, end = events['Production_Date'].min(), events['Production_Date'].max()
+
+        # Stations: bias at the start of the history, drift per day and noise
+        state = MaintenanceOptimizer(events, lookback_days=(end - start).days + 1).station_state
+        elapsed = (end + pd.Timedelta(days=1) - start).days
+        stations = pd.DataFrame({
+            'Bias': state['Current_Bias'] - state['Drift_Per_Day'] * elapsed,
+            'Drift_Per_Day': state['Drift_Per_Day'],
+            'Noise': state['Error_Std'],
+            'Events_Per_Day': state['Events_Per_Day'],
+        })
+
+        # Recipes: median target per dosing slot, relative spread of targets around it
+        matrix, history = recipe_matrix(events)
+        profiles = matrix.toarray()
+        counts = np.diff(matrix.indptr)
+        recipes = pd.DataFrame({
+            'Recipe_Name': history.index,
+            'Num_Ingredients': counts,
+            'Batches': history['Batches'].to_numpy(),
+            'Profile': list(profiles),
+        })
+        median = events.groupby(['Recipe_Name', 'Num_Ingredients'])['Target_Amount'].transform('median')
+        recipes.attrs['Amount_Spread'] = float(np.log(events['Target_Amount'] / median).std())
+
+        # Temperature: monthly mean and spread of batch temperature, plus within-batch noise
+        add_dosing_errors(events)
+        batches = build_batch_table(events).dropna(subset=['Facility_Temperature_mean'])
+        month = batches['Production_Date_first'].dt.month
+        monthly = batches.groupby(month)['Facility_Temperature_mean'].agg(['mean', 'std'])
+        monthly = monthly.reindex(range(1, 13)).fillna({'mean': batches['Facility_Temperature_mean'].mean(),
+                                                        'std': batches['Facility_Temperature_mean'].std()})
+        within = (events['Facility_Temperature']
+                  - events.groupby('Batch_ID')['Facility_Temperature'].transform('mean')).std()
+        temperature = {'monthly_mean': monthly['mean'].to_numpy(), 'monthly_std': monthly['std'].fillna(0).to_numpy(),
+                       'within_batch_std': float(np.nan_to_num(within))}
+
+        # QC response: logistic regression on the simulated batch features
+        X = _response_matrix(batches['Num_Ingredients_first'], batches['Facility_Temperature_mean'],
+                             batches['Dosing_Error_Abs_mean'], batches['Dosing_Error_Abs_max'])
+        model = LogisticRegression(C=10.0, max_iter=1000).fit(X, batches['Failed'])
+        response = {'coef': model.coef_.ravel(), 'intercept': float(model.intercept_[0])}
+
+        return cls(stations, recipes, temperature, response, start, elapsed)
+
+    # --- simulation kernel ---------------------------------------------------
+
+    def _station_bias(self, station, day, interventions):
+        """Bias of each dosing at its production day, after any calibration intervention."""
+        bias = self.stations['Bias'].to_numpy()[station]
+        drift = self.stations['Drift_Per_Day'].to_numpy()[station]
+        recalibrated = np.isin(self.station_names, list(interventions.get('recalibrate', ())))[station]
+        interval = interventions.get('calibration_interval')
+        since = day % interval if interval else day
+        return np.where(recalibrated, drift * since, bias + drift * day)
+
+    def simulate_chunk(self, n_batches, seed, interventions=None, events=False):
+        """Simulate one chunk of batches; returns batch arrays (and event arrays if requested).
+
+        interventions keys: recalibrate (stations reset to zero bias at day 0),
+        calibration_interval (days between resets of those stations),
+        temperature_band ((low, high) the facility is held within),
+        complexity_cap (recipes above it are not produced) and noise_scale
+        (multiplier on dosing noise, e.g. a precision upgrade).
+        """
+        interventions = interventions or {}
+        rng = np.random.default_rng(seed)
+
+        share = self.recipe_share.copy()
+        cap = interventions.get('complexity_cap')
+        if cap is not None:
+            share = np.where(self.num_ingredients <= cap, share, 0.0)
+            share /= share.sum()
+        recipe = rng.choice(len(share), n_batches, p=share)
+        num_ingredients = self.num_ingredients[recipe]
+        slots = self.profiles.shape[1]
+        mask = np.arange(slots)[None, :] < num_ingredients[:, None]
+
+        day = rng.integers(0, self.n_days, n_batches)
+        month = (self.start_date + pd.to_timedelta(day, unit='D')).month.to_numpy() - 1
+        temperature = rng.normal(self.temperature['monthly_mean'][month], self.temperature['monthly_std'][month])
+        band = interventions.get('temperature_band')
+        if band is not None:
+            temperature = np.clip(temperature, *band)
+
+        spread = self.recipes.attrs.get('Amount_Spread', 0.0)
+        targets = np.round(self.profiles[recipe] * rng.lognormal(0.0, spread, (n_batches, slots)), 3)
+        station = rng.choice(len(self.station_names), (n_batches, slots), p=self.station_share)
+        noise = self.stations['Noise'].to_numpy()[station] * interventions.get('noise_scale', 1.0)
+        errors = self._station_bias(station, day[:, None], interventions) + noise * rng.standard_normal((n_batches, slots))
+
+        abs_errors = np.where(mask, np.abs(errors), 0.0)
+        error_mean = abs_errors.sum(axis=1) / num_ingredients
+        error_max = abs_errors.max(axis=1)
+        z = _response_matrix(num_ingredients, temperature, error_mean, error_max) @ self.response['coef']
+        probability = 1 / (1 + np.exp(-(z + self.response['intercept'])))
+        failed = rng.random(n_batches) < probability
+
+        result = {'recipe': recipe, 'day': day, 'temperature': temperature, 'num_ingredients': num_ingredients,
+                  'error_mean': error_mean, 'error_max': error_max, 'probability': probability, 'failed': failed}
+        if events:
+            result.update(mask=mask, targets=targets, actuals=np.round(targets + errors, 3), station=station,
+                          event_temperature=temperature[:, None] + self.temperature['within_batch_std']
+                          * rng.standard_normal((n_batches, slots)))
+        return result
+
+    # --- runs ----------------------------------------------------------------
+
+    @staticmethod
+    def _summarize(chunk):
+        """Additive per-chunk totals, so chunks from any worker combine by summation."""
+        complex_ = chunk['num_ingredients'] > 15
+        optimal = (chunk['temperature'] >= 20) & (chunk['temperature'] <= 25)
+        failed = chunk['failed']
+        return np.array([
+            len(failed), failed.sum(), chunk['probability'].sum(), chunk['error_mean'].sum(),
+            complex_.sum(), (failed & complex_).sum(), optimal.sum(), (failed & optimal).sum(),
+        ], dtype=np.float64)
+
+    def run(self, n_batches, interventions=None, chunk_size=100_000, n_jobs=1, seed=42):
+        """Simulate n_batches and summarize; results depend on seed and chunk_size, not on n_jobs."""
+        if n_batches < 1:
+            raise ValueError(f"n_batches must be at least 1, got {n_batches}")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        sizes = [min(chunk_size, n_batches - start) for start in range(0, n_batches, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [(size, chunk_seed, interventions) for size, chunk_seed in zip(sizes, seeds)]
+
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as pool:
+                totals = sum(pool.map(_run_chunk, tasks))
+        else:
+            _init_worker(self)
+            totals = sum(_run_chunk(task) for task in tasks)
+
+        batches, failures, expected, error_sum, n_complex, f_complex, n_optimal, f_optimal = totals
+        rate = failures / batches
+        return {
+            'Batches': int(batches),
+            'Failures': int(failures),
+            'Failure_Rate': rate,
+            'Failure_Rate_CI': (rate - 1.96 * np.sqrt(rate * (1 - rate) / batches),
+                                rate + 1.96 * np.sqrt(rate * (1 - rate) / batches)),
+            'Expected_Failure_Rate': expected / batches,
+            'Mean_Abs_Error': error_sum / batches,
+            'Complex_Failure_Rate': f_complex / n_complex if n_complex else np.nan,
+            'Simple_Failure_Rate': (failures - f_complex) / (batches - n_complex) if batches > n_complex else np.nan,
+            'Optimal_Temp_Failure_Rate': f_optimal / n_optimal if n_optimal else np.nan,
+            'Suboptimal_Temp_Failure_Rate': ((failures - f_optimal) / (batches - n_optimal)
+                                             if batches > n_optimal else np.nan),
+        }
+
+    def compare(self, scenarios, n_batches=1_000_000, **kwargs):
+        """One summary row per named intervention set, all with the same random numbers."""
+        rows = []
+        for name, interventions in scenarios.items():
+            summary = self.run(n_batches, interventions, **kwargs)
+            summary.pop('Failure_Rate_CI')
+            rows.append({'Scenario': name, **summary})
+        results = pd.DataFrame(rows)
+        baseline = results['Expected_Failure_Rate'].iloc[0]
+        results['Failure_Rate_Reduction'] = baseline - results['Expected_Failure_Rate']
+        return results
+
+    def simulate_events(self, n_batches, interventions=None, seed=42):
+        """Synthetic dosing events in the raw CSV schema, for stress-testing the pipeline."""
+        # Independent streams for the batches and their times of day
+        chunk_seed, time_seed = np.random.SeedSequence(seed).spawn(2)
+        sim = self.simulate_chunk(n_batches, chunk_seed, interventions, events=True)
+        batch, slot = np.nonzero(sim['mask'])
+        rng = np.random.default_rng(time_seed)
+        first_second = rng.integers(0, 86400 - 3600, n_batches)
+        seconds = first_second[batch] + 60 * slot
+        dates = self.start_date + pd.to_timedelta(sim['day'][batch], unit='D')
+        times = pd.to_timedelta(seconds, unit='s')
+        return pd.DataFrame({
+            'Batch_ID': np.char.add('S', np.char.zfill(batch.astype(str), 7)),
+            'Production_Date': dates.strftime('%Y-%m-%d'),
+            'Production_Time': [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in times.seconds],
+            'Recipe_Name': self.recipe_names[sim['recipe'][batch]],
+            'Num_Ingredients': sim['num_ingredients'][batch],
+            'Dosing_Station': self.station_names[sim['station'][batch, slot]],
+            'Target_Amount': sim['targets'][batch, slot],
+            'Actual_Amount': sim['actuals'][batch, slot],
+            'Facility_Temperature': np.round(sim['event_temperature'][batch, slot], 2),
+            'QC_Result': np.where(sim['failed'][batch], 'failed', 'passed'),
+        })
+
+
+# Per-process simulator, installed once by the pool initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(simulator):
+    """Install the fitted simulator in the current process."""
+    _WORKER_STATE['simulator'] = simulator
+
+
+def _run_chunk(task):
+    """Simulate and summarize one chunk."""
+    size, seed, interventions = task
+    simulator = _WORKER_STATE['simulator']
+    return simulator._summarize(simulator.simulate_chunk(size, seed, interventions))
@@ -0,0 +1,265 @@
+"""
+Quantile Sketches for Dosing Errors
+Mergeable t-digest sketches so median and tail dosing errors (p50/p95/p99)
+can be kept per station and per station-day (and optionally per batch) in
+bounded memory, updated as new events arrive and combined across partitions.
+A chunk of events updates every group of a level at once: one sort by group
+and value, then segment-wise compression of the groups over budget.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class TDigest:
+    """Merging t-digest with vectorized compression.
+
+    Centroids are bucketed by the arcsine scale function, which keeps tail
+    centroids small (accurate extreme quantiles) and lets central ones grow.
+    Digests with at most ``compression`` points hold the raw values and are exact.
+    """
+
+    def __init__(self, compression=200):
+        """Create an empty digest; compression bounds the centroid count (~compression / 2)."""
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        """Number of values summarized."""
+        return float(self.weights.sum())
+
+    def __len__(self):
+        return len(self.means)
+
+    def update(self, values, weights=None):
+        """Add an array of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=float).ravel()
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float).ravel()
+        keep = ~np.isnan(values)
+        values, weights = values[keep], weights[keep]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._absorb(values, weights)
+        return self
+
+    def merge(self, other):
+        """Fold another digest into this one."""
+        if other.count:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._absorb(other.means, other.weights)
+        return self
+
+    @classmethod
+    def merge_all(cls, digests, compression=200):
+        """New digest summarizing all given digests."""
+        merged = cls(compression)
+        for digest in digests:
+            merged.merge(digest)
+        return merged
+
+    def _absorb(self, means, weights):
+        """Add centroids, compressing when the centroid budget is exceeded."""
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights = means[order], weights[order]
+        if len(self.means) > self.compression:
+            self._compress()
+
+    def _compress(self):
+        """Merge neighbouring centroids that lie within the same unit of the scale function.
+
+        A centroid whose own span already crosses a unit boundary is left alone,
+        so no merged centroid ever covers more than one unit of k.
+        """
+        total = self.weights.sum()
+        right = np.cumsum(self.weights) / total
+        left = right - self.weights / total
+        scale = self.compression / (2 * np.pi)
+        k_left = np.floor(scale * np.arcsin(np.clip(2 * left - 1, -1, 1)))
+        k_right = np.floor(scale * np.arcsin(np.clip(2 * right - 1, -1, 1)) - 1e-9)
+        alone = k_left != k_right
+        new_group = alone | np.roll(alone, 1) | (k_left != np.roll(k_left, 1))
+        new_group[0] = True
+        starts = np.flatnonzero(new_group)
+        weights = np.add.reduceat(self.weights, starts)
+        self.means = np.add.reduceat(self.means * self.weights, starts) / weights
+        self.weights = weights
+
+    def quantile(self, q):
+        """Estimated quantile(s) for q in [0, 1]; NaN for an empty digest."""
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        if np.all(self.weights == 1):
+            # Raw values: match numpy's linear interpolation exactly
+            return np.quantile(self.means, q)
+        positions = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * total, positions, values)
+
+
+def _group_codes(df, keys, factorized):
+    """Dense group code per row (-1 where any key is missing) and the key of each code, as groupby names them.
+
+    Column factorizations are kept in ``factorized`` so levels sharing a column reuse them.
+    """
+    for key in keys:
+        if key not in factorized:
+            factorized[key] = pd.factorize(df[key])
+    codes, uniques = factorized[keys[0]]
+    if len(keys) == 1:
+        return codes, list(pd.Index(uniques))
+    inner, inner_uniques = factorized[keys[1]]
+    combined = np.where((codes >= 0) & (inner >= 0), codes.astype(np.int64) * len(inner_uniques) + inner, -1)
+    codes, pairs = pd.factorize(combined, use_na_sentinel=False)
+    keys = list(zip(pd.Index(uniques).take(pairs // len(inner_uniques)),
+                    pd.Index(inner_uniques).take(pairs % len(inner_uniques))))
+    if (pairs < 0).any():
+        # The combined -1 of rows with a missing key became a code of its own: drop it
+        missing = int(np.flatnonzero(pairs < 0)[0])
+        keys.pop(missing)
+        codes = np.where(codes == missing, -1, codes - (codes > missing))
+    return codes, keys
+
+
+def _update_groups(digests, codes, values, by_value):
+    """Add values[i] to digests[codes[i]] for every group in one pass (codes < 0 and NaN values are skipped).
+
+    ``by_value`` is a stable argsort of values, shared by every level of an update.
+    """
+    n_groups = len(digests)
+    # Small codes sort with a radix sort, which is what makes a per-level stable sort cheap
+    code_type = np.int16 if n_groups <= np.iinfo(np.int16).max else np.int64
+    by_value = by_value[(codes[by_value] >= 0) & ~np.isnan(values[by_value])]
+    codes, values = codes[by_value].astype(code_type), values[by_value]
+    if len(values) == 0:
+        return
+    mins = np.full(n_groups, np.inf)
+    maxs = np.full(n_groups, -np.inf)
+    np.minimum.at(mins, codes, values)
+    np.maximum.at(maxs, codes, values)
+
+    # Existing centroids join the new values, ahead of them on ties as in TDigest._absorb;
+    # a stable sort by group of the value-ordered points orders every group by value
+    held = [index for index, digest in enumerate(digests) if len(digest)]
+    weights = np.ones_like(values)
+    if held:
+        codes = np.concatenate([np.full(len(digests[index]), index, dtype=code_type) for index in held] + [codes])
+        values = np.concatenate([digests[index].means for index in held] + [values])
+        weights = np.concatenate([digests[index].weights for index in held] + [weights])
+        by_value = np.argsort(values, kind='stable')
+        codes, values, weights = codes[by_value], values[by_value], weights[by_value]
+    order = np.argsort(codes, kind='stable')
+    codes, values, weights = codes[order], values[order], weights[order]
+    sizes = np.bincount(codes, minlength=n_groups)
+
+    # Groups over the centroid budget are compressed segment-wise, as TDigest._compress does for one digest
+    compression = digests[0].compression
+    over = (sizes > compression)[codes]
+    if over.any():
+        c, v, w = codes[over], values[over], weights[over]
+        starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+        counts = np.diff(np.r_[starts, len(c)])
+        cumulative = np.cumsum(w)
+        total = np.repeat(np.add.reduceat(w, starts), counts)
+        right = (cumulative - np.repeat(cumulative[starts] - w[starts], counts)) / total
+        left = right - w / total
+        scale = compression / (2 * np.pi)
+        k_left = np.floor(scale * np.arcsin(np.clip(2 * left - 1, -1, 1)))
+        k_right = np.floor(scale * np.arcsin(np.clip(2 * right - 1, -1, 1)) - 1e-9)
+        alone = k_left != k_right
+        new_group = alone | np.roll(alone, 1) | (k_left != np.roll(k_left, 1))
+        new_group[starts] = True
+        segments = np.flatnonzero(new_group)
+        merged = np.add.reduceat(w, segments)
+        c = c[segments]
+        v = np.add.reduceat(v * w, segments) / merged
+        codes = np.concatenate([codes[~over], c])
+        values = np.concatenate([values[~over], v])
+        weights = np.concatenate([weights[~over], merged])
+        order = np.argsort(codes, kind='stable')
+        codes, values, weights = codes[order], values[order], weights[order]
+        sizes = np.bincount(codes, minlength=n_groups)
+
+    bounds = np.r_[0, np.cumsum(sizes)]
+    for index in np.flatnonzero(sizes):
+        digest = digests[index]
+        start, stop = bounds[index], bounds[index + 1]
+        digest.means, digest.weights = values[start:stop], weights[start:stop]
+        digest.min = min(digest.min, mins[index])
+        digest.max = max(digest.max, maxs[index])
+
+
+class DosingErrorSketches:
+    """Dosing-error digests per station and per station-day, and per batch when asked for."""
+
+    LEVELS = {
+        'batch': ['Batch_ID'],
+        'station': ['Dosing_Station'],
+        'station_day': ['Dosing_Station', 'Production_Date']
+    }
+
+    def __init__(self, value='Dosing_Error_Abs', compression=200, levels=('station', 'station_day')):
+        """Create empty sketch maps for the given levels (the per-batch level is opt-in)."""
+        self.value = value
+        self.compression = compression
+        self.sketches = {level: {} for level in levels}
+
+    @classmethod
+    def from_events(cls, df, **kwargs):
+        """Build sketches from an event frame with dosing error columns."""
+        return cls(**kwargs).update(df)
+
+    def update(self, df):
+        """Fold a chunk of events into every level's sketches."""
+        values = df[self.value].to_numpy(dtype=float)
+        by_value = np.argsort(values, kind='stable')
+        factorized = {}
+        for level, sketches in self.sketches.items():
+            codes, keys = _group_codes(df, self.LEVELS[level], factorized)
+            digests = []
+            for key in keys:
+                digest = sketches.get(key)
+                if digest is None:
+                    digest = sketches[key] = TDigest(self.compression)
+                digests.append(digest)
+            if digests:
+                _update_groups(digests, codes, values, by_value)
+        return self
+
+    def merge(self, other):
+        """Fold another set of sketches (e.g. from another partition) into this one."""
+        for level, sketches in other.sketches.items():
+            mine = self.sketches.setdefault(level, {})
+            for key, digest in sketches.items():
+                if key in mine:
+                    mine[key].merge(digest)
+                else:
+                    mine[key] = TDigest(self.compression).merge(digest)
+        return self
+
+    def quantiles(self, level, quantiles=DEFAULT_QUANTILES):
+        """Quantile table for one level: one row per key, one P<nn> column per quantile."""
+        sketches = self.sketches[level]
+        columns = [f"P{round(q * 100):02d}" for q in quantiles]
+        rows = [np.atleast_1d(digest.quantile(quantiles)) for digest in sketches.values()]
+        names = self.LEVELS[level]
+        if len(names) > 1:
+            index = pd.MultiIndex.from_tuples(list(sketches), names=names)
+        else:
+            index = pd.Index(list(sketches), name=names[0])
+        table = pd.DataFrame(rows, index=index, columns=columns)
+        table['Count'] = [int(digest.count) for digest in sketches.values()]
+        return table.sort_index()
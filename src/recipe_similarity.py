@@ -0,0 +1,119 @@
+"""
+Recipe Similarity Index
+Embeds recipes from the sparse recipe x ingredient x target-amount matrix and
+indexes them with a ball tree, so a new recipe can be risk-scored from the
+failure history of its nearest existing recipes before its first batch.
+
+The event data has no ingredient identifier, so an ingredient is identified
+by its dosing position within the batch (events ordered by Production_Time).
+"""
+
+import numpy as np
+from scipy import sparse
+
+
+def ingredient_slots(df):
+    """Dosing position of each event within its batch (0 = first dosed)."""
+    order = df.sort_values(['Batch_ID', 'Production_Time'], kind='stable')
+    return order.groupby('Batch_ID', sort=False).cumcount().reindex(df.index)
+
+
+def recipe_matrix(df):
+    """Sparse recipe x ingredient-slot matrix of median target amounts, plus per-recipe history.
+
+    Returns (matrix, history) where history is indexed by Recipe_Name in
+    matrix row order with Num_Ingredients, Batches, Failures and Failure_Rate.
+    """
+    events = df[['Batch_ID', 'Recipe_Name', 'Target_Amount']].assign(Slot=ingredient_slots(df))
+    profile = events.groupby(['Recipe_Name', 'Slot'])['Target_Amount'].median()
+    recipes = profile.index.get_level_values(0).unique()
+    rows = recipes.get_indexer(profile.index.get_level_values(0))
+    slots = profile.index.get_level_values(1).to_numpy()
+    matrix = sparse.csr_matrix((profile.to_numpy(dtype=float), (rows, slots)),
+                               shape=(len(recipes), int(slots.max()) + 1))
+
+    batches = df.groupby('Batch_ID').agg(Recipe_Name=('Recipe_Name', 'first'),
+                                         Num_Ingredients=('Num_Ingredients', 'first'),
+                                         Failed=('QC_Result', lambda x: (x.iloc[0] == 'failed')))
+    history = batches.groupby('Recipe_Name').agg(Num_Ingredients=('Num_Ingredients', 'median'),
+                                                 Batches=('Failed', 'size'),
+                                                 Failures=('Failed', 'sum')).reindex(recipes)
+    history['Failure_Rate'] = history['Failures'] / history['Batches']
+    return matrix, history
+
+
+class RecipeSimilarityIndex:
+    """Low-dimensional recipe embedding with a ball-tree nearest-neighbour index."""
+
+    def __init__(self, n_components=8, n_neighbors=5, prior_strength=20, random_state=42):
+        """prior_strength is the pseudo-batch count shrinking each neighbour's rate to the plant rate."""
+        self.n_components = n_components
+        self.n_neighbors = n_neighbors
+        self.prior_strength = prior_strength
+        self.random_state = random_state
+        self.svd = None
+        self.matrix = None
+        self.tree = None
+        self.history = None
+        self.embeddings = None
+        self.base_rate = None
+        self.n_slots = None
+
+    def _features(self, matrix):
+        """Composition (share of batch mass per slot) plus a complexity column."""
+        matrix = sparse.csr_matrix(matrix, dtype=float)
+        totals = np.asarray(matrix.sum(axis=1)).ravel()
+        composition = sparse.diags(1 / np.maximum(totals, 1e-12)) @ matrix
+        complexity = sparse.csr_matrix(np.diff(matrix.indptr)[:, None] / self.n_slots)
+        return sparse.hstack([composition, complexity]).tocsr()
+
+    def fit(self, df):
+        """Build the embedding and index from event-level data."""
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.neighbors import BallTree
+
+        self.matrix, self.history = recipe_matrix(df)
+        self.n_slots = self.matrix.shape[1]
+        features = self._features(self.matrix)
+        n_components = max(1, min(self.n_components, features.shape[1] - 1, features.shape[0] - 1))
+        self.svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+        self.embeddings = self.svd.fit_transform(features)
+        self.tree = BallTree(self.embeddings)
+        self.base_rate = self.history['Failures'].sum() / self.history['Batches'].sum()
+        return self
+
+    def embed(self, target_amounts):
+        """Embedding of one or more recipes given as target amounts in dosing order."""
+        recipes = [target_amounts] if np.ndim(target_amounts[0]) == 0 else list(target_amounts)
+        rows, cols, values = [], [], []
+        for row, amounts in enumerate(recipes):
+            amounts = np.asarray(amounts, dtype=float)[:self.n_slots]
+            rows += [row] * len(amounts)
+            cols += list(range(len(amounts)))
+            values += list(amounts)
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(recipes), self.n_slots))
+        return self.svd.transform(self._features(matrix))
+
+    def similar(self, target_amounts, k=None):
+        """Nearest existing recipes with their distance and (smoothed) failure history."""
+        distances, indices = self.tree.query(self.embed(target_amounts)[:1], k=min(k or self.n_neighbors,
+                                                                                  len(self.history)))
+        neighbours = self.history.iloc[indices[0]].reset_index()
+        neighbours['Distance'] = distances[0]
+        neighbours['Smoothed_Failure_Rate'] = (
+            (neighbours['Failures'] + self.prior_strength * self.base_rate)
+            / (neighbours['Batches'] + self.prior_strength)
+        )
+        return neighbours
+
+    def recipe_profile(self, recipe_name):
+        """Median target amounts in dosing order for an existing recipe."""
+        row = self.matrix[self.history.index.get_loc(recipe_name)]
+        return row.toarray()[0][:row.indices.max() + 1]
+
+    def risk_score(self, target_amounts, k=None):
+        """Cold-start failure probability: inverse-distance weighted neighbour rates."""
+        neighbours = self.similar(target_amounts, k)
+        weights = 1 / (neighbours['Distance'].to_numpy() + 1e-6)
+        score = float(np.average(neighbours['Smoothed_Failure_Rate'], weights=weights))
+        return {'Risk_Score': score, 'Base_Rate': float(self.base_rate), 'Neighbours': neighbours}
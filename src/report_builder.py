@@ -0,0 +1,307 @@
+"""
+Executive Report Builder
+Renders the executive summary from the analyzer's results instead of
+hand-typed figures. Each section declares the aggregates it reads; a section
+is re-rendered only when the fingerprint of those inputs changes, and the
+rendered text is kept in a state file so daily regeneration reuses the rest.
+Sections also record where their aggregates came from (data version and
+settings), so stale sections are known before any analysis phase runs and
+only the phases they need are run.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(value):
+    """Stable content hash of an aggregate (frames, series, dicts, scalars)."""
+    digest = hashlib.sha1()
+
+    def feed(item):
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            digest.update(repr(list(item.columns) if isinstance(item, pd.DataFrame) else item.name).encode())
+            digest.update(pd.util.hash_pandas_object(item, index=True).to_numpy().tobytes())
+        elif isinstance(item, dict):
+            for key in sorted(item, key=str):
+                digest.update(repr(key).encode())
+                feed(item[key])
+        elif isinstance(item, (list, tuple)):
+            digest.update(b'[')
+            for element in item:
+                feed(element)
+            digest.update(b']')
+        elif isinstance(item, (float, np.floating)):
+            digest.update(repr(round(float(item), 10)).encode())
+        else:
+            digest.update(repr(item.item() if hasattr(item, 'item') else item).encode())
+
+    feed(value)
+    return digest.hexdigest()
+
+
+# Analyzer phases each aggregate needs once the data is loaded
+AGGREGATE_PHASES = {
+    'overview': [],
+    'complexity': ['fundamentals'],
+    'temperature': ['fundamentals'],
+    'stations': ['systems'],
+    'station_bias': ['systems'],
+    'interactions': ['systems'],
+    'model': ['model'],  # run only when the model section is requested
+    'recommendations': ['fundamentals', 'systems', 'recommendations'],
+    'assumptions': [],
+}
+
+
+def report_inputs(analyzer, cost_per_failure=1000, achievable_fraction=0.5, names=None):
+    """Named aggregates the report sections depend on (only ``names`` when given).
+
+    Requires the phases AGGREGATE_PHASES lists for the requested aggregates;
+    the model aggregate is None unless build_predictive_model has been run.
+    """
+    results = analyzer.analysis_results
+    batches = analyzer.batch_df
+    names = list(AGGREGATE_PHASES) if names is None else names
+
+    def overview():
+        dates = batches['Production_Date_first']
+        return {
+            'Events': len(analyzer.df),
+            'Batches': len(batches),
+            'Failure_Rate': batches['Failed'].mean(),
+            'Start': str(dates.min().date()),
+            'End': str(dates.max().date()),
+            'Days': max((dates.max() - dates.min()).days + 1, 1),
+        }
+
+    def complexity():
+        complex_mask = batches['Num_Ingredients_first'] > 15
+        return dict(results['fundamental_components']['complexity_effect'], Batches=int(complex_mask.sum()))
+
+    def temperature():
+        temperature = batches['Facility_Temperature_mean']
+        suboptimal_mask = ~((temperature >= 20) & (temperature <= 25))
+        return dict(results['fundamental_components']['temperature_effect'], Batches=int(suboptimal_mask.sum()))
+
+    def model():
+        model = results.get('predictive_model')
+        return None if model is None else {
+            'AUC': {name[:-4]: auc for name, auc in model.items() if name.endswith('_auc')},
+            'Feature_Importance': model['feature_importance'],
+        }
+
+    aggregates = {
+        'overview': overview,
+        'complexity': complexity,
+        'temperature': temperature,
+        'stations': lambda: results['systems_interactions']['station_analysis'],
+        'station_bias': lambda: results['systems_interactions']['station_bias'],
+        'interactions': lambda: results['systems_interactions']['interaction_analysis'],
+        'model': model,
+        'recommendations': lambda: results['recommendations'],
+        'assumptions': lambda: {'Cost_Per_Failure': cost_per_failure, 'Achievable_Fraction': achievable_fraction},
+    }
+    return {name: aggregates[name]() for name in names}
+
+
+def report_sources(data_key, cost_per_failure=1000, achievable_fraction=0.5, with_model=False):
+    """Fingerprint of what each aggregate is computed from, known before any phase runs.
+
+    ``data_key`` identifies the input data (e.g. its data_version plus
+    filters); the model and assumption aggregates also depend on settings.
+    """
+    settings = {'model': with_model, 'assumptions': (cost_per_failure, achievable_fraction)}
+    return {name: fingerprint([None if name == 'assumptions' else data_key, settings.get(name)])
+            for name in AGGREGATE_PHASES}
+
+
+# --- section renderers -------------------------------------------------------
+
+def _situation(overview):
+    return (
+        "## Situation Overview\n"
+        f"**Current failure rate**: {overview['Failure_Rate']:.1%} of batches.\n\n"
+        f"**Analysis scope**: {overview['Events']:,} dosing events across {overview['Batches']:,} batches "
+        f"from {overview['Start']} to {overview['End']} ({overview['Days']} days, "
+        f"~{overview['Batches'] / overview['Days']:.1f} batches/day).\n"
+    )
+
+
+def _root_causes(complexity, temperature, stations, station_bias):
+    complex_gap = complexity['Complex_Recipes_Failure_Rate'] - complexity['Simple_Recipes_Failure_Rate']
+    temp_gap = temperature['Suboptimal_Temp_Failure_Rate'] - temperature['Optimal_Temp_Failure_Rate']
+    ranked = stations.sort_values('Failure_Rate', ascending=False)
+    worst = ranked.head(2)
+    worst_text = ' and '.join(
+        f"{row.Dosing_Station} ({row.Failure_Rate:.1%}, bias {station_bias.get(row.Dosing_Station, np.nan):+.2f})"
+        for row in worst.itertuples()
+    )
+    return (
+        "## Root Cause Analysis - Top 3 Failure Drivers\n\n"
+        "### 1. Recipe Complexity Threshold Effect\n"
+        f"**Finding**: Recipes with >15 ingredients show {complexity['Complex_Recipes_Failure_Rate']:.1%} failure rate "
+        f"vs {complexity['Simple_Recipes_Failure_Rate']:.1%} for simpler recipes\n"
+        f"- **Impact**: {complex_gap:.1%} failure reduction potential\n"
+        f"- **Scope**: {complexity['Batches']:,} complex batches\n\n"
+        "### 2. Temperature Control Issues\n"
+        f"**Finding**: Optimal range 20-25°C shows {temperature['Optimal_Temp_Failure_Rate']:.1%} failure "
+        f"vs {temperature['Suboptimal_Temp_Failure_Rate']:.1%} outside this range\n"
+        f"- **Impact**: {temp_gap:.1%} failure reduction potential\n"
+        f"- **Scope**: {temperature['Batches']:,} batches outside the range\n\n"
+        "### 3. Station-Specific Performance Issues\n"
+        f"**Finding**: Highest event failure rates at {worst_text}\n"
+        f"- **Best performers**: {', '.join(ranked.tail(2)['Dosing_Station'])}\n"
+    )
+
+
+def _interactions(interactions):
+    table = interactions.dropna(subset=['Failure_Rate'])
+    table = table[table['Batch_Count'] > 0]
+    worst, best = table['Failure_Rate'].idxmax(), table['Failure_Rate'].idxmin()
+    lines = [
+        "## Systems Thinking Insights\n",
+        f"- **Worst combination**: {worst[0]} + {worst[1]} recipes, {table.loc[worst, 'Failure_Rate']:.1%} failure rate",
+        f"- **Best combination**: {best[0]} + {best[1]} recipes, {table.loc[best, 'Failure_Rate']:.1%} failure rate",
+        "",
+        "| Temperature | Complexity | Batches | Failure Rate |",
+        "|---|---|---:|---:|",
+    ]
+    lines += [f"| {temp} | {complexity} | {int(row.Batch_Count):,} | {row.Failure_Rate:.1%} |"
+              for (temp, complexity), row in table.iterrows()]
+    return '\n'.join(lines) + '\n'
+
+
+def _model(model):
+    if model is None:
+        return ''
+    scores = ', '.join(f"{name} {auc:.2f}" for name, auc in model['AUC'].items())
+    lines = ["## Predictive Model Results", f"- **ROC-AUC**: {scores}", "- **Key Predictive Features**:"]
+    lines += [f"  {i}. {row.Feature} ({row.Importance:.1%} importance)"
+              for i, row in enumerate(model['Feature_Importance'].head(5).itertuples(), 1)]
+    return '\n'.join(lines) + '\n'
+
+
+def _recommendations(recommendations):
+    lines = ["## Immediate Action Plan"]
+    for rec in recommendations:
+        lines += [
+            f"\n### Priority {rec['Priority']}: {rec['Issue']}",
+            f"- **Finding**: {rec['Finding']}",
+            f"- **Action**: {rec['Action']}",
+            f"- **Expected Impact**: {rec['Impact']}",
+            f"- **Timing**: {rec['Implementation']}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def _business_impact(overview, complexity, temperature, assumptions):
+    daily_batches = overview['Batches'] / overview['Days']
+    daily_failures = daily_batches * overview['Failure_Rate']
+    cost, fraction = assumptions['Cost_Per_Failure'], assumptions['Achievable_Fraction']
+
+    def prevented(effect, batches, high, low):
+        return max(effect[high] - effect[low], 0) * batches / overview['Days'] * fraction
+
+    complexity_prevented = prevented(complexity, complexity['Batches'],
+                                     'Complex_Recipes_Failure_Rate', 'Simple_Recipes_Failure_Rate')
+    temperature_prevented = prevented(temperature, temperature['Batches'],
+                                      'Suboptimal_Temp_Failure_Rate', 'Optimal_Temp_Failure_Rate')
+    total = complexity_prevented + temperature_prevented
+    return (
+        "## Business Impact Quantification\n\n"
+        "### Current State\n"
+        f"- **Daily Production**: ~{daily_batches:.1f} batches\n"
+        f"- **Current Failure Rate**: {overview['Failure_Rate']:.1%}\n"
+        f"- **Daily Failed Batches**: ~{daily_failures:.1f} batches (${daily_failures * cost:,.0f}/day "
+        f"at ${cost:,.0f}/failed batch)\n\n"
+        f"### Savings Potential ({fraction:.0%} of each gap achieved)\n"
+        f"- **Recipe complexity limits**: {complexity_prevented:.1f} failures/day, ${complexity_prevented * cost:,.0f}/day\n"
+        f"- **Temperature control**: {temperature_prevented:.1f} failures/day, ${temperature_prevented * cost:,.0f}/day\n"
+        f"- **Combined**: ${total * cost:,.0f}/day, ${total * cost * 365:,.0f}/year\n"
+    )
+
+
+# Section name -> (aggregates it reads, renderer), in report order
+SECTIONS = {
+    'situation': (['overview'], _situation),
+    'root_causes': (['complexity', 'temperature', 'stations', 'station_bias'], _root_causes),
+    'interactions': (['interactions'], _interactions),
+    'model': (['model'], _model),
+    'recommendations': (['recommendations'], _recommendations),
+    'business_impact': (['overview', 'complexity', 'temperature', 'assumptions'], _business_impact),
+}
+
+TITLE = "# Paint Manufacturing Quality - Executive Summary\n"
+
+
+class ReportBuilder:
+    """Incremental renderer of the executive summary."""
+
+    def __init__(self, state_path=None):
+        """Optionally persist rendered sections (and their input fingerprints) between runs."""
+        self.state_path = state_path
+        self.sections = {}
+        self.stats = {'rendered': [], 'reused': []}
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                self.sections = json.load(f).get('sections', {})
+
+    @staticmethod
+    def _key(hashes, dependencies):
+        return hashlib.sha1('|'.join(hashes[dependency] for dependency in dependencies).encode()).hexdigest()
+
+    def stale(self, sources):
+        """Sections whose stored source fingerprint differs from ``sources`` (see report_sources)."""
+        return [name for name, (dependencies, _) in SECTIONS.items()
+                if self.sections.get(name, {}).get('source') != self._key(sources, dependencies)]
+
+    def needed(self, sources):
+        """(aggregates, analyzer phases) the stale sections need."""
+        aggregates = list(dict.fromkeys(dependency for name in self.stale(sources) for dependency in SECTIONS[name][0]))
+        phases = {phase for aggregate in aggregates for phase in AGGREGATE_PHASES[aggregate]}
+        return aggregates, phases
+
+    def build(self, inputs, sources=None):
+        """Markdown report; only sections whose inputs changed are re-rendered.
+
+        With ``sources``, sections whose source fingerprint is unchanged are
+        reused without reading ``inputs``, which then only needs the
+        aggregates of the stale sections.
+        """
+        self.stats = {'rendered': [], 'reused': []}
+        hashes = {name: fingerprint(value) for name, value in inputs.items()}
+
+        parts, changed = [TITLE], False
+        for name, (dependencies, render) in SECTIONS.items():
+            cached = self.sections.get(name)
+            source = None if sources is None else self._key(sources, dependencies)
+            if cached and source is not None and cached.get('source') == source:
+                self.stats['reused'].append(name)
+            else:
+                key = self._key(hashes, dependencies)
+                if cached and cached['inputs'] == key:
+                    self.stats['reused'].append(name)
+                else:
+                    cached = {'inputs': key, 'text': render(*(inputs[dependency] for dependency in dependencies))}
+                    self.stats['rendered'].append(name)
+                cached = dict(cached, source=source)
+                changed |= cached != self.sections.get(name)
+                self.sections[name] = cached
+            if cached['text']:
+                parts.append(cached['text'])
+
+        if self.state_path and changed:
+            with open(self.state_path, 'w') as f:
+                json.dump({'sections': self.sections}, f)
+        return '\n'.join(parts)
+
+    def write(self, inputs, path, sources=None):
+        """Build the report and write it to ``path``."""
+        report = self.build(inputs, sources)
+        with open(path, 'w') as f:
+            f.write(report)
+        return report
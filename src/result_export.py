@@ -0,0 +1,36 @@
+"""
+Result Export Helpers
+Turns analysis results and risk-score explanations into plain tables and
+JSON types, shared by the command-line interface and the HTTP service.
+pandas is imported on use so importing this module stays cheap.
+"""
+
+import json
+
+
+def to_jsonable(value):
+    """Convert analysis results (frames, series, numpy scalars) to JSON types."""
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.reset_index().to_json(orient='records', default_handler=str))
+    if isinstance(value, pd.Series):
+        return json.loads(value.to_json(default_handler=str))
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items() if k not in ('models', 'scaler')}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def explain_scores(model, X, features):
+    """Per-feature contributions behind each risk score, plus the feature pushing it up most."""
+    import pandas as pd
+
+    contributions = pd.DataFrame(model.explain(X), columns=features)
+    top_driver = contributions.idxmax(axis=1)
+    contributions.columns = [f"{feature}_Contribution" for feature in features]
+    contributions['Top_Driver'] = top_driver
+    return contributions
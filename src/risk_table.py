@@ -0,0 +1,177 @@
+"""
+Pre-Production Risk Table
+Compiles the failure model and historical rates into a dense array over
+recipe x assigned station set x temperature band, so a line controller can
+gate a batch before it starts with one array lookup. The table is saved as a
+small .npz file; loading and lookups need only NumPy.
+
+Station sets are bitmasks over the plant's stations. Dosing errors are not
+known before production, so each cell averages the model's prediction over
+simulated dosings at the stations' current bias and noise, and is then
+shrunk towards the cell's observed failure rate when it has history.
+"""
+
+import numpy as np
+
+# Default temperature band edges (°C); values outside fall in the open end bands
+TEMPERATURE_EDGES = np.arange(16.0, 30.0, 1.0)
+
+# Model inputs a pre-production batch can be described by
+_PLANNED_FEATURES = {
+    'Num_Ingredients_first', 'Facility_Temperature_mean', 'Dosing_Error_Abs_mean',
+    'Dosing_Error_Abs_max', 'Dosing_Error_Abs_std', 'Dosing_Station_nunique',
+}
+
+
+def _band_midpoints(edges):
+    """Representative temperature of each band, open end bands one step beyond the edges."""
+    step = np.diff(edges).mean() if len(edges) > 1 else 1.0
+    bounds = np.concatenate([[edges[0] - step], edges, [edges[-1] + step]])
+    return (bounds[:-1] + bounds[1:]) / 2
+
+
+class RiskTable:
+    """Dense failure-risk lookup: recipe x station set x temperature band."""
+
+    def __init__(self, table, count_table, recipes, recipe_counts, stations, edges):
+        """Wrap built arrays; use RiskTable.build(...) or RiskTable.load(path)."""
+        self.table = table
+        self.count_table = count_table
+        self.recipes = recipes
+        self.recipe_counts = recipe_counts
+        self.stations = stations
+        self.edges = edges
+        self._recipe_index = {name: i for i, name in enumerate(recipes.tolist())}
+        self._station_bit = {name: 1 << i for i, name in enumerate(stations.tolist())}
+
+    # --- lookups ---------------------------------------------------------------
+
+    def station_mask(self, stations):
+        """Bitmask of a set of station names."""
+        mask = 0
+        for station in stations:
+            mask |= self._station_bit[station]
+        return mask
+
+    def band(self, temperature):
+        """Temperature band index (vectorized)."""
+        return np.searchsorted(self.edges, temperature, side='right')
+
+    def risk(self, recipe, stations, temperature, num_ingredients=None):
+        """Failure risk of a planned batch.
+
+        Recipes without history fall back to the model-only table for their
+        ingredient count, which must then be given.
+        """
+        mask = self.station_mask(stations)
+        band = int(np.searchsorted(self.edges, temperature, side='right'))
+        index = self._recipe_index.get(recipe)
+        if index is not None:
+            return float(self.table[index, mask, band])
+        if num_ingredients is None:
+            raise KeyError(f"Unknown recipe {recipe!r}: pass num_ingredients for a model-only estimate")
+        count = min(max(int(num_ingredients), 1), self.count_table.shape[0] - 1)
+        return float(self.count_table[count, mask, band])
+
+    def lookup(self, recipe_index, masks, temperatures):
+        """Risks for arrays of recipe indices, station bitmasks and temperatures."""
+        return self.table[recipe_index, masks, self.band(temperatures)]
+
+    # --- persistence -----------------------------------------------------------
+
+    def save(self, path):
+        """Write the table as a compressed .npz file."""
+        np.savez_compressed(path, table=self.table, count_table=self.count_table, recipes=self.recipes,
+                            recipe_counts=self.recipe_counts, stations=self.stations, edges=self.edges)
+
+    @classmethod
+    def load(cls, path):
+        """Load a table written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['table'], data['count_table'], data['recipes'], data['recipe_counts'],
+                       data['stations'], data['edges'])
+
+    # --- build -----------------------------------------------------------------
+
+    @classmethod
+    def build(cls, df, model, features, edges=TEMPERATURE_EDGES, n_draws=4, prior_strength=20, random_state=42):
+        """Compile a table from event-level data and a fitted model over ``features``.
+
+        ``model`` is anything with predict_proba (sklearn or compiled) trained
+        on batch-table features; every feature must be known before
+        production (see _PLANNED_FEATURES).
+        """
+        import pandas as pd
+
+        from maintenance_optimizer import MaintenanceOptimizer
+
+        unknown = [feature for feature in features if feature not in _PLANNED_FEATURES]
+        if unknown:
+            raise ValueError(f"Features not available before production: {unknown}")
+
+        edges = np.asarray(edges, dtype=np.float64)
+        state = MaintenanceOptimizer(df).station_state
+        stations = np.asarray(state.index).astype(str)
+        if len(stations) > 16:
+            raise ValueError(f"Station sets are bitmasks; {len(stations)} stations is too many for a dense table")
+        bias = state['Current_Bias'].to_numpy()
+        noise = state['Error_Std'].to_numpy()
+
+        n_masks = 1 << len(stations)
+        masks = np.arange(1, n_masks)
+        members = (masks[:, None] >> np.arange(len(stations))) & 1  # (masks, stations)
+        set_size = members.sum(axis=1)
+        max_count = int(df['Num_Ingredients'].max())
+        midpoints = _band_midpoints(edges)
+
+        # Dosing-error features per (ingredient count, station set): ingredients take the
+        # set's stations in turn, with the same standard-normal draws for every cell
+        rng = np.random.default_rng(random_state)
+        z = rng.standard_normal((n_draws, max_count))
+        order = np.argsort(-members, axis=1, kind='stable')  # member stations first
+        count_table = np.zeros((max_count + 1, n_masks, len(midpoints)), dtype=np.float32)
+        for count in range(1, max_count + 1):
+            assigned = order[np.arange(len(masks))[:, None], np.arange(count)[None, :] % set_size[:, None]]
+            errors = np.abs(bias[assigned][:, None, :] + noise[assigned][:, None, :] * z[None, :, :count])
+            columns = {
+                'Num_Ingredients_first': np.full(errors.shape[:2], count, dtype=np.float64),
+                'Dosing_Error_Abs_mean': errors.mean(axis=2),
+                'Dosing_Error_Abs_max': errors.max(axis=2),
+                'Dosing_Error_Abs_std': errors.std(axis=2, ddof=1) if count > 1 else np.zeros(errors.shape[:2]),
+                'Dosing_Station_nunique': np.broadcast_to(np.minimum(set_size, count)[:, None],
+                                                          errors.shape[:2]).astype(np.float64),
+            }
+            # Rows ordered (mask, band, draw)
+            shape = (len(masks), len(midpoints), n_draws)
+            X = np.column_stack([
+                np.broadcast_to(midpoints[None, :, None], shape).ravel() if feature == 'Facility_Temperature_mean'
+                else np.broadcast_to(columns[feature][:, None, :], shape).ravel()
+                for feature in features
+            ])
+            if hasattr(model, 'feature_names_in_'):
+                X = pd.DataFrame(X, columns=features)
+            proba = model.predict_proba(X)[:, 1].reshape(shape)
+            count_table[count, 1:] = proba.mean(axis=2)
+
+        # Observed batches per (recipe, station set, band) shrink the model estimate
+        bits = np.left_shift(1, pd.Index(stations).get_indexer(df['Dosing_Station']))
+        used = pd.DataFrame({'Batch_ID': df['Batch_ID'], 'Bit': bits}).drop_duplicates()
+        batches = df.groupby('Batch_ID').agg(Recipe=('Recipe_Name', 'first'), Count=('Num_Ingredients', 'first'),
+                                             Temperature=('Facility_Temperature', 'mean'),
+                                             QC_Result=('QC_Result', 'first'))
+        batches['Failed'] = batches['QC_Result'] == 'failed'
+        batches['Mask'] = used.groupby('Batch_ID')['Bit'].sum()
+        batches = batches.dropna(subset=['Temperature'])
+        recipe_counts = batches.groupby('Recipe')['Count'].median().astype(np.int64)
+        recipes = recipe_counts.index.to_numpy().astype(str)
+        table = count_table[np.minimum(recipe_counts.to_numpy(), max_count)].copy()
+
+        recipe_index = pd.Index(recipes).get_indexer(batches['Recipe'])
+        band = np.searchsorted(edges, batches['Temperature'].to_numpy(), side='right')
+        cell = np.ravel_multi_index((recipe_index, batches['Mask'].to_numpy(), band), table.shape)
+        n = np.bincount(cell, minlength=table.size).reshape(table.shape)
+        failures = np.bincount(cell, weights=batches['Failed'].to_numpy(dtype=float),
+                               minlength=table.size).reshape(table.shape)
+        table = ((failures + prior_strength * table) / (n + prior_strength)).astype(np.float32)
+
+        return cls(table, count_table, recipes, recipe_counts.to_numpy(), stations, edges)
@@ -0,0 +1,90 @@
+"""
+Time-of-Day and Shift Analysis
+Buckets batches by hour of day, weekday and shift with integer arithmetic on
+the int64 Production_Timestamp (nanoseconds since the epoch) and counts
+batches and failures per cell with one bincount, so shift and time-of-day
+effects can be checked on the full event history.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Shift name -> (first hour, hour it ends before); a shift may wrap past midnight
+SHIFTS = {'Night': (22, 6), 'Morning': (6, 14), 'Afternoon': (14, 22)}
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+
+def shift_of_hour(shifts=SHIFTS):
+    """Shift index of each hour 0-23 (-1 where no shift is defined)."""
+    lookup = np.full(24, -1, dtype=np.int64)
+    for index, (first, end) in enumerate(shifts.values()):
+        hours = np.arange(first, end + 24 if end <= first else end) % 24
+        lookup[hours] = index
+    return lookup
+
+
+def time_buckets(timestamps):
+    """(hour of day, weekday with Monday = 0) of int64 nanosecond timestamps."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    days, within_day = np.divmod(timestamps, NS_PER_DAY)
+    return within_day // NS_PER_HOUR, (days + 3) % 7  # 1970-01-01 was a Thursday
+
+
+def failure_cube(df, shifts=SHIFTS):
+    """Batch counts and failure rates per hour x weekday x shift, plus shift/weekday/hour rollups.
+
+    A batch is placed at its first dosing event. Returns a dict with 'cube'
+    (one row per hour and weekday), 'by_shift', 'by_weekday', 'by_hour' and
+    the chi-square p-value of failure rate differences between shifts.
+    """
+    from scipy.stats import chi2_contingency
+
+    timestamps = df['Production_Timestamp'].to_numpy(dtype=np.int64)
+    valid = timestamps != np.iinfo(np.int64).min  # NaT: unknown time of day
+    codes, _ = pd.factorize(df['Batch_ID'])
+    start = np.full(codes.max() + 1, np.iinfo(np.int64).max)
+    np.minimum.at(start, codes[valid], timestamps[valid])
+    failed = np.zeros(len(start), dtype=np.int64)
+    failed[codes] = (df['QC_Result'].to_numpy() == 'failed')
+    timed = start != np.iinfo(np.int64).max
+    start, failed = start[timed], failed[timed]
+
+    hour, weekday = time_buckets(start)
+    cell = hour * 7 + weekday
+    batches = np.bincount(cell, minlength=24 * 7)
+    failures = np.bincount(cell, weights=failed, minlength=24 * 7)
+
+    names = np.array(list(shifts) + ['Unassigned'], dtype=object)
+    hours = np.repeat(np.arange(24), 7)
+    cube = pd.DataFrame({
+        'Hour': hours,
+        'Weekday': np.tile(WEEKDAYS, 24),
+        'Shift': names[shift_of_hour(shifts)[hours]],
+        'Batches': batches,
+        'Failures': failures.astype(np.int64),
+    })
+
+    def rollup(by):
+        table = cube.groupby(by, sort=False)[['Batches', 'Failures']].sum()
+        table['Failure_Rate'] = (table['Failures'] / table['Batches'].where(table['Batches'] > 0)).round(4)
+        return table
+
+    by_shift = rollup('Shift')
+    observed = by_shift.loc[by_shift['Batches'] > 0, ['Failures', 'Batches']].to_numpy()
+    contingency = np.column_stack([observed[:, 0], observed[:, 1] - observed[:, 0]])
+    p_value = np.nan
+    if len(contingency) > 1 and (contingency.sum(axis=0) > 0).all():
+        p_value = float(chi2_contingency(contingency)[1])
+
+    cube['Failure_Rate'] = (cube['Failures'] / cube['Batches'].where(cube['Batches'] > 0)).round(4)
+    return {
+        'cube': cube,
+        'by_shift': by_shift,
+        'by_weekday': rollup('Weekday'),
+        'by_hour': rollup('Hour'),
+        'shift_p_value': p_value,
+    }
@@ -0,0 +1,329 @@
+"""
+Embedded SQL over Events and Batch Features
+In-process SQLite over the event store (or an event frame) and the batch
+table. Each query loads only the columns it mentions and, for plain AND-ed
+WHERE conditions, only the segments and rows that can match; loaded tables
+and the events-with-outcome join are cached across queries.
+"""
+
+import hashlib
+import operator
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_access import add_dosing_errors, build_batch_table
+
+# Batch outcome columns attached to every event in the event_outcomes view
+OUTCOME_COLUMNS = ['Failed', 'Num_Ingredients_first', 'Facility_Temperature_mean', 'Dosing_Error_Abs_mean']
+
+_OPERATORS = {'=': operator.eq, '==': operator.eq, '<': operator.lt, '<=': operator.le,
+              '>': operator.gt, '>=': operator.ge}
+_LITERAL = r"(-?\d+(?:\.\d+)?|'[^']*')"
+_COMPARISON = re.compile(rf"^\s*((?:\w+\.)?\w+)\s*(<=|>=|==|=|<|>)\s*{_LITERAL}\s*$", re.IGNORECASE)
+_BETWEEN = re.compile(rf"^\s*((?:\w+\.)?\w+)\s+BETWEEN\s+{_LITERAL}\s+AND\s+{_LITERAL}\s*$", re.IGNORECASE)
+_TABLES = ('events', 'batches', 'event_outcomes')
+# Words that can follow a table name in FROM/JOIN without being its alias
+_NOT_ALIAS = {'where', 'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'outer', 'on', 'using',
+              'group', 'order', 'limit', 'having', 'window', 'union', 'as'}
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# SQLite actions a user query may perform: read tables and views, call functions, recurse in a CTE
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+_WHERE = re.compile(r"\bWHERE\b(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|\bWINDOW\b|$)",
+                    re.IGNORECASE | re.DOTALL)
+
+
+def _literal(text):
+    """Python value of a SQL literal."""
+    return text[1:-1] if text.startswith("'") else float(text)
+
+
+def extract_predicates(sql):
+    """Column comparisons that every result row must satisfy, or [] when unsure.
+
+    Only a single SELECT whose WHERE clause is a plain AND chain of
+    ``column op literal`` / ``column BETWEEN a AND b`` terms is analyzed;
+    anything else (OR, NOT, subqueries, UNION, functions) disables pushdown.
+    A column keeps its table qualifier (``o.Target_Amount``) when it has one.
+    """
+    if len(re.findall(r"\bSELECT\b", sql, re.IGNORECASE)) != 1 or re.search(r"\bUNION\b", sql, re.IGNORECASE):
+        return []
+    match = _WHERE.search(sql)
+    if not match:
+        return []
+    clause = match.group(1)
+    if re.search(r"\b(OR|NOT)\b|\(", clause, re.IGNORECASE):
+        return []
+    # A table joined with itself, or a SELECT alias reused in WHERE, makes a bare column ambiguous
+    if any(len(re.findall(rf"\b{table}\b", sql, re.IGNORECASE)) > 1 for table in _TABLES):
+        return []
+    aliases = {alias.lower() for alias in re.findall(r"\bAS\s+(\w+)", sql, re.IGNORECASE)}
+
+    # Split on AND, re-joining the AND that belongs to a BETWEEN
+    terms, pending = [], None
+    for part in re.split(r"\bAND\b", clause, flags=re.IGNORECASE):
+        if pending is not None:
+            terms.append(f"{pending} AND {part}")
+            pending = None
+        elif re.search(r"\bBETWEEN\b", part, re.IGNORECASE):
+            pending = part
+        else:
+            terms.append(part)
+
+    predicates = []
+    for term in terms:
+        between = _BETWEEN.match(term)
+        comparison = _COMPARISON.match(term)
+        if between:
+            column, low, high = between.groups()
+            predicates += [(column, '>=', _literal(low)), (column, '<=', _literal(high))]
+        elif comparison:
+            column, op, value = comparison.groups()
+            predicates.append((column, op, _literal(value)))
+        else:
+            return []
+    if any(column.split('.')[-1].lower() in aliases for column, _, _ in predicates):
+        return []
+    return predicates
+
+
+def table_predicates(sql, predicates, name, columns):
+    """The predicates that constrain table ``name``, with bare column names as the table spells them.
+
+    A qualified predicate applies only to the table (or alias) it names; an
+    unqualified one only when ``name`` is the sole event table in the query,
+    since it could otherwise belong to either side of a join.
+    """
+    names = {name}
+    for alias in re.findall(rf"\b(?:FROM|JOIN)\s+{name}\s+(?:AS\s+)?(\w+)", sql, re.IGNORECASE):
+        if alias.lower() not in _NOT_ALIAS:
+            names.add(alias.lower())
+    event_tables = [table for table in ('events', 'event_outcomes') if re.search(rf"\b{table}\b", sql, re.IGNORECASE)]
+    spelled = {column.lower(): column for column in columns}
+
+    pushed = []
+    for column, op, value in predicates:
+        qualifier, _, bare = column.rpartition('.')
+        applies = qualifier.lower() in names if qualifier else event_tables == [name]
+        if applies and bare.lower() in spelled:
+            pushed.append((spelled[bare.lower()], op, value))
+    return pushed
+
+
+def _single_select(sql):
+    """True for exactly one statement, and that statement a SELECT or WITH query."""
+    if not _READ_ONLY.match(sql):
+        return False
+    ends = [i for i, char in enumerate(sql) if char == ';' and sqlite3.complete_statement(sql[:i + 1])]
+    return all(not sql[end + 1:].strip() for end in ends)
+
+
+def _authorize(action, *args):
+    """SQLite authorizer that denies everything but reads (no ATTACH, PRAGMA, DDL or DML)."""
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def _deadline_handler(seconds):
+    """SQLite progress handler that aborts the running statement after ``seconds``."""
+    deadline = time.monotonic() + seconds
+    return lambda: time.monotonic() > deadline
+
+
+def _coerce(value, values):
+    """Literal converted to the column's type for NumPy comparison (None if incompatible)."""
+    try:
+        if values.dtype.kind == 'M':
+            return np.datetime64(pd.Timestamp(value))
+        if values.dtype.kind in 'iuf':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, str) else None
+
+
+def _sql_ready(df):
+    """Datetimes as ISO text (date-only when there is no time part) so SQLite compares them lexically."""
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype.kind == 'M':
+            values = df[column]
+            midnight = (values.dropna() == values.dropna().dt.normalize()).all()
+            df[column] = values.dt.strftime('%Y-%m-%d' if midnight else '%Y-%m-%d %H:%M:%S')
+    return df
+
+
+class SQLLayer:
+    """Ad-hoc SQL over ``events``, ``batches`` and the cached ``event_outcomes`` join."""
+
+    def __init__(self, store=None, events=None, batches=None, cache_size=8, timeout=30.0):
+        """Register an EventStore (or an event frame) and optionally a prebuilt batch table.
+
+        Queries running longer than ``timeout`` seconds (e.g. an unbounded
+        recursive CTE) are interrupted.
+        """
+        if store is None and events is None:
+            raise ValueError("Provide an EventStore or an events DataFrame")
+        self.store = store
+        self.events = events
+        self._batches = batches
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.connection = sqlite3.connect(':memory:')
+        self._loaded = OrderedDict()
+        self.last_plan = None
+
+    # --- sources -------------------------------------------------------------
+
+    def _segments(self):
+        """(segment id, stats, loader) for every unit of event data."""
+        if self.store is not None:
+            return [(segment['file'], segment['stats'], lambda columns, s=segment: self.store.read_segment(s, columns))
+                    for segment in self.store.segments]
+        return [('frame', None, lambda columns: self.events[columns])]
+
+    def _event_columns(self):
+        if self.store is not None:
+            return list(self.store.manifest['schema'] or {})
+        return list(self.events.columns)
+
+    def batches(self):
+        """Batch feature table (built once from all events unless supplied)."""
+        if self._batches is None:
+            events = self.store.read() if self.store is not None else self.events.copy()
+            self._batches = build_batch_table(add_dosing_errors(events))
+        return self._batches
+
+    # --- planning ------------------------------------------------------------
+
+    @staticmethod
+    def _referenced(sql, columns):
+        """Columns named in the query (identifiers are case-insensitive), or all of them for SELECT *."""
+        if re.search(r"(?:\bSELECT\s+(?:DISTINCT\s+)?|,)\s*(?:\w+\.)?\*", sql, re.IGNORECASE):
+            return list(columns)
+        tokens = set(re.findall(r"\w+", sql.lower()))
+        return [column for column in columns if column.lower() in tokens]
+
+    @staticmethod
+    def _prune(stats, predicates):
+        """False when segment min/max statistics prove no row can match."""
+        for column, op, value in predicates:
+            bounds = (stats or {}).get(column)
+            if not bounds:
+                continue
+            low, high = bounds
+            if isinstance(low, str):
+                try:
+                    low, high, value = pd.Timestamp(low), pd.Timestamp(high), pd.Timestamp(value)
+                except (TypeError, ValueError):
+                    continue
+            elif isinstance(value, str):
+                continue
+            if (op in ('=', '==') and (value < low or value > high)) or \
+               (op in ('<', '<=') and (low > value or (op == '<' and low == value))) or \
+               (op in ('>', '>=') and (high < value or (op == '>' and high == value))):
+                return False
+        return True
+
+    def _load_events(self, columns, predicates):
+        """Pushdown scan: needed columns of surviving segments, rows filtered by the predicates."""
+        predicates = [p for p in predicates if p[0] in self._event_columns()]
+        needed = list(dict.fromkeys(columns + [p[0] for p in predicates]))
+        frames, scanned, total = [], 0, 0
+        for _, stats, load in self._segments():
+            total += 1
+            if stats is not None and not self._prune(stats, predicates):
+                continue
+            scanned += 1
+            frame = load(needed)
+            mask = np.ones(len(frame), dtype=bool)
+            for column, op, value in predicates:
+                values = frame[column].to_numpy()
+                value = _coerce(value, values)
+                if value is not None:
+                    mask &= np.asarray(_OPERATORS[op](values, value), dtype=bool)
+            frames.append(frame.loc[mask, columns])
+        events = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        return events, {'segments_scanned': scanned, 'segments_total': total, 'rows_loaded': len(events)}
+
+    def _physical(self, name, columns, predicates):
+        """Name of a cached SQLite table holding the pushed-down data for one logical table."""
+        version = len(self.store.segments) if self.store is not None else id(self.events)
+        key = (name, tuple(columns), tuple(predicates), version)
+        physical = f"{name}__{hashlib.sha1(repr(key).encode()).hexdigest()[:12]}"
+        if physical in self._loaded:
+            self._loaded.move_to_end(physical)
+            return physical, dict(self._loaded[physical], cache_hit=True)
+
+        if name == 'batches':
+            batches = self.batches()
+            frame = batches[[c for c in columns if c in batches.columns]]
+            info = {'rows_loaded': len(frame)}
+        else:
+            event_columns = [c for c in columns if c in self._event_columns()]
+            if name == 'event_outcomes':
+                event_columns = list(dict.fromkeys(event_columns + ['Batch_ID']))
+            frame, info = self._load_events(event_columns, predicates)
+            if name == 'event_outcomes':
+                outcome = [c for c in OUTCOME_COLUMNS if c in columns]
+                frame = frame.merge(self.batches()[['Batch_ID'] + outcome], on='Batch_ID', how='inner')
+        _sql_ready(frame).to_sql(physical, self.connection, index=False)
+        if 'Batch_ID' in frame.columns:
+            self.connection.execute(f'CREATE INDEX "{physical}_batch" ON "{physical}" (Batch_ID)')
+
+        self._loaded[physical] = info
+        while len(self._loaded) > self.cache_size:
+            evicted, _ = self._loaded.popitem(last=False)
+            self.connection.execute(f'DROP TABLE "{evicted}"')
+        return physical, dict(info, cache_hit=False)
+
+    # --- querying ------------------------------------------------------------
+
+    def query(self, sql, params=()):
+        """Run a SELECT over events / batches / event_outcomes and return a DataFrame.
+
+        Only a single read-only SELECT (or WITH ... SELECT) statement is
+        accepted; it runs under an authorizer that denies any other action
+        and is interrupted after the layer's timeout.
+        """
+        if not _single_select(sql):
+            raise ValueError("Only a single read-only SELECT statement is allowed")
+        predicates = extract_predicates(sql)
+        plan = {}
+        for name in ('events', 'batches', 'event_outcomes'):
+            if not re.search(rf"\b{name}\b", sql, re.IGNORECASE):
+                continue
+            if name == 'batches':
+                available = list(self.batches().columns)
+            elif name == 'events':
+                available = self._event_columns()
+            else:
+                available = self._event_columns() + OUTCOME_COLUMNS
+            columns = self._referenced(sql, available) or available[:1]
+            pushed = table_predicates(sql, predicates, name, self._event_columns()) if name != 'batches' else []
+            physical, info = self._physical(name, columns, pushed)
+            self.connection.execute(f'DROP VIEW IF EXISTS temp."{name}"')
+            self.connection.execute(f'CREATE TEMP VIEW "{name}" AS SELECT * FROM "{physical}"')
+            plan[name] = dict(info, columns=columns, predicates=pushed)
+        self.last_plan = plan
+        self.connection.set_authorizer(_authorize)
+        self.connection.set_progress_handler(_deadline_handler(self.timeout), 10_000)
+        try:
+            return pd.read_sql_query(sql, self.connection, params=params)
+        except pd.errors.DatabaseError as e:
+            if 'not authorized' in str(e):
+                raise ValueError("Only a single read-only SELECT statement is allowed") from e
+            if 'interrupted' in str(e):
+                raise ValueError(f"Query exceeded the {self.timeout:g}s time limit") from e
+            raise
+        finally:
+            self.connection.set_authorizer(None)
+            self.connection.set_progress_handler(None, 0)
+
+    def explain(self, sql):
+        """Pushdown plan (columns, predicates, segments scanned) for the last run of ``sql``."""
+        self.query(sql)
+        return self.last_plan
@@ -0,0 +1,273 @@
+"""
+Event-Time Batch Aggregation for Streaming Dosing Events
+Keeps one open window per Batch_ID while dosing events and QC results arrive
+out of order, finalizes windows when the QC result is in and the watermark
+has passed, and emits the same batch feature rows as build_batch_table.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from data_access import BATCH_AGGREGATIONS
+
+# Output columns in build_batch_table order
+BATCH_COLUMNS = ['Batch_ID'] + [
+    f"{column}_{agg}"
+    for column, aggs in BATCH_AGGREGATIONS.items()
+    for agg in ([aggs] if isinstance(aggs, str) else aggs)
+] + ['Failed']
+
+# Per-window accumulators combined by addition, by max, and by earliest event
+_SUM_FIELDS = ['Events', 'Temp_Sum', 'Temp_N', 'Abs_N', 'Abs_Sum', 'Abs_SumSq',
+               'Rel_N', 'Rel_Sum', 'Rel_SumSq', 'Target_Sum', 'Actual_Sum']
+_MAX_FIELDS = ['Abs_Max', 'Rel_Max', 'Last_Time']
+_FIRST_FIELDS = ['Production_Date', 'Recipe_Name', 'Num_Ingredients']
+
+
+def event_times(df):
+    """Event timestamps from Production_Date and Production_Time."""
+    return pd.to_datetime(df['Production_Date']) + pd.to_timedelta(df['Production_Time'].astype(str))
+
+
+def _partial_aggregates(events):
+    """One row of mergeable accumulators per batch present in a chunk of events."""
+    target = events['Target_Amount'].to_numpy(dtype=float)
+    actual = events['Actual_Amount'].to_numpy(dtype=float)
+    error_abs = np.abs(actual - target)
+    error_rel = error_abs / target
+    temperature = events['Facility_Temperature'].to_numpy(dtype=float)
+
+    parts = pd.DataFrame({
+        'Batch_ID': events['Batch_ID'].to_numpy(),
+        'Event_Time': events['Event_Time'].to_numpy(),
+        'Events': 1,
+        'Temp_Sum': np.nan_to_num(temperature),
+        'Temp_N': ~np.isnan(temperature),
+        'Abs_N': ~np.isnan(error_abs),
+        'Abs_Sum': np.nan_to_num(error_abs),
+        'Abs_SumSq': np.nan_to_num(error_abs) ** 2,
+        'Abs_Max': error_abs,
+        'Rel_N': ~np.isnan(error_rel),
+        'Rel_Sum': np.nan_to_num(error_rel),
+        'Rel_SumSq': np.nan_to_num(error_rel) ** 2,
+        'Rel_Max': error_rel,
+        'Target_Sum': np.nan_to_num(target),
+        'Actual_Sum': np.nan_to_num(actual)
+    })
+    for field in _FIRST_FIELDS:
+        parts[field] = events[field].to_numpy()
+
+    # Earliest event per batch supplies the "first" fields, as in an ordered groupby
+    parts = parts.sort_values('Event_Time', kind='stable')
+    grouped = parts.groupby('Batch_ID', sort=False)
+    partial = grouped[_SUM_FIELDS].sum()
+    partial[['Abs_Max', 'Rel_Max']] = grouped[['Abs_Max', 'Rel_Max']].max()
+    partial['First_Time'] = grouped['Event_Time'].min()
+    partial['Last_Time'] = grouped['Event_Time'].max()
+    partial[_FIRST_FIELDS] = grouped[_FIRST_FIELDS].first()
+    partial['Stations'] = events.groupby('Batch_ID', sort=False)['Dosing_Station'].agg(lambda s: set(s.dropna()))
+    return partial
+
+
+def _merge_state(state, update):
+    """Fold one batch's partial aggregates into its open window state."""
+    for field in _SUM_FIELDS:
+        state[field] += update[field]
+    for field in _MAX_FIELDS:
+        state[field] = np.fmax(state[field], update[field])
+    if update['First_Time'] < state['First_Time']:
+        state['First_Time'] = update['First_Time']
+        for field in _FIRST_FIELDS:
+            state[field] = update[field]
+    state['Stations'] |= update['Stations']
+
+
+def _std(n, total, total_sq):
+    """Sample standard deviation from count, sum and sum of squares (NaN below two values)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (total_sq - total ** 2 / n) / (n - 1)
+    return np.where(n > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+
+
+class BatchWindowAggregator:
+    """Event-time window per batch with watermark-driven finalization.
+
+    The watermark trails the latest event time seen by ``allowed_lateness``.
+    A window is emitted once its QC result has arrived and either every declared
+    ingredient has been dosed or the watermark has passed its last event. Windows
+    still without QC ``qc_timeout`` after their last event expire unlabelled.
+    Events for closed or already-expired windows are late. Late event frames and
+    expired rows are passed to the ``on_late`` / ``on_expired`` callbacks when
+    given; only the last ``keep_records`` of each stay in ``late_events`` and
+    ``expired``, while ``stats`` counts them all.
+    """
+
+    def __init__(self, allowed_lateness='1h', qc_timeout='24h', max_open_windows=100_000,
+                 on_late=None, on_expired=None, keep_records=100):
+        """Configure lateness, QC timeout, the open-window cap and where late/expired records go."""
+        self.allowed_lateness = pd.Timedelta(allowed_lateness)
+        self.qc_timeout = pd.Timedelta(qc_timeout)
+        self.max_open_windows = max_open_windows
+        self.watermark = pd.Timestamp.min
+        self.open_windows = {}
+        self.pending_qc = {}
+        self.closed = {}
+        self.on_late = on_late
+        self.on_expired = on_expired
+        self.late_events = deque(maxlen=keep_records)
+        self.expired = deque(maxlen=keep_records)
+        self.stats = {'events': 0, 'late_events': 0, 'late_qc': 0, 'orphan_qc': 0, 'finalized': 0,
+                      'expired': 0, 'peak_open_windows': 0}
+
+    def process_events(self, events):
+        """Add a chunk of dosing events; returns the batch rows finalized by it."""
+        events = events.copy()
+        if 'Event_Time' not in events.columns:
+            events['Event_Time'] = event_times(events)
+        self.stats['events'] += len(events)
+
+        # Late: the window was already emitted, or the event is behind the watermark for a new window
+        # Dict membership per event, rather than copying every closed/open id into a list
+        closed = events['Batch_ID'].map(self.closed.__contains__).astype(bool)
+        unseen = ~events['Batch_ID'].map(self.open_windows.__contains__).astype(bool)
+        late = closed | (unseen & (events['Event_Time'] < self.watermark))
+        if late.any():
+            self._record(self.late_events, self.on_late, events[late])
+            self.stats['late_events'] += int(late.sum())
+            events = events[~late]
+
+        if len(events):
+            for batch_id, update in _partial_aggregates(events).to_dict('index').items():
+                state = self.open_windows.get(batch_id)
+                if state is None:
+                    self.open_windows[batch_id] = dict(update, QC_Result=self.pending_qc.pop(batch_id, None))
+                else:
+                    _merge_state(state, update)
+            self.watermark = max(self.watermark, events['Event_Time'].max() - self.allowed_lateness)
+        return self._advance()
+
+    def process_qc(self, results):
+        """Attach QC results (Batch_ID, QC_Result); returns the batch rows finalized by them."""
+        for batch_id, result in zip(results['Batch_ID'], results['QC_Result']):
+            if batch_id in self.closed:
+                self.stats['late_qc'] += 1
+            elif batch_id in self.open_windows:
+                self.open_windows[batch_id]['QC_Result'] = result
+            else:
+                self.pending_qc[batch_id] = result
+                if len(self.pending_qc) > self.max_open_windows:
+                    # QC for batches whose events never arrived: drop the oldest
+                    self.pending_qc.pop(next(iter(self.pending_qc)))
+                    self.stats['orphan_qc'] += 1
+        return self._advance()
+
+    def advance_watermark(self, timestamp):
+        """Move the watermark forward (e.g. on an idle stream); returns finalized rows."""
+        self.watermark = max(self.watermark, pd.Timestamp(timestamp))
+        return self._advance()
+
+    def flush(self):
+        """End of stream: emit every labelled window and expire the rest."""
+        self.watermark = pd.Timestamp.max
+        return self._advance()
+
+    def _advance(self):
+        """Finalize or expire windows allowed by the current watermark."""
+        ready, expired = [], []
+        for batch_id, state in self.open_windows.items():
+            passed = state['Last_Time'] <= self.watermark
+            if state['QC_Result'] is not None:
+                if passed or state['Events'] >= state['Num_Ingredients']:
+                    ready.append(batch_id)
+            elif passed and (self.watermark == pd.Timestamp.max
+                             or state['Last_Time'] + self.qc_timeout <= self.watermark):
+                expired.append(batch_id)
+
+        # Keep state bounded: evict the stalest windows beyond the cap as expired
+        overflow = len(self.open_windows) - len(ready) - len(expired) - self.max_open_windows
+        if overflow > 0:
+            waiting = sorted((state['Last_Time'], batch_id) for batch_id, state in self.open_windows.items()
+                             if batch_id not in ready and batch_id not in expired)
+            expired.extend(batch_id for _, batch_id in waiting[:overflow])
+        self.stats['peak_open_windows'] = max(self.stats['peak_open_windows'], len(self.open_windows))
+
+        rows = self._close(ready)
+        if expired:
+            self._record(self.expired, self.on_expired, self._close(expired))
+            self.stats['expired'] += len(expired)
+        self.stats['finalized'] += len(ready)
+
+        # Closed ids only matter while their events could still be ahead of the watermark
+        if self.watermark > pd.Timestamp.min + self.allowed_lateness:
+            horizon = self.watermark - self.allowed_lateness
+            self.closed = {batch_id: last for batch_id, last in self.closed.items() if last >= horizon}
+        return rows
+
+    @staticmethod
+    def _record(records, callback, frame):
+        """Hand late events or expired rows to the callback and keep them in the bounded record."""
+        if callback is not None:
+            callback(frame)
+        records.append(frame)
+
+    def _close(self, batch_ids):
+        """Remove windows from the open state and build their batch feature rows."""
+        states = [self.open_windows.pop(batch_id) for batch_id in batch_ids]
+        for batch_id, state in zip(batch_ids, states):
+            self.closed[batch_id] = state['Last_Time']
+        if not states:
+            return pd.DataFrame(columns=BATCH_COLUMNS)
+
+        s = pd.DataFrame(states)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rows = pd.DataFrame({
+                'Batch_ID': batch_ids,
+                'Production_Date_first': pd.to_datetime(s['Production_Date']),
+                'Recipe_Name_first': s['Recipe_Name'],
+                'Num_Ingredients_first': s['Num_Ingredients'],
+                'QC_Result_first': s['QC_Result'],
+                'Facility_Temperature_mean': s['Temp_Sum'] / s['Temp_N'].where(s['Temp_N'] > 0),
+                'Dosing_Error_Abs_mean': s['Abs_Sum'] / s['Abs_N'].where(s['Abs_N'] > 0),
+                'Dosing_Error_Abs_max': s['Abs_Max'],
+                'Dosing_Error_Abs_std': _std(s['Abs_N'], s['Abs_Sum'], s['Abs_SumSq']),
+                'Dosing_Error_Abs_sum': s['Abs_Sum'],
+                'Dosing_Error_Rel_mean': s['Rel_Sum'] / s['Rel_N'].where(s['Rel_N'] > 0),
+                'Dosing_Error_Rel_max': s['Rel_Max'],
+                'Dosing_Error_Rel_std': _std(s['Rel_N'], s['Rel_Sum'], s['Rel_SumSq']),
+                'Target_Amount_sum': s['Target_Sum'],
+                'Actual_Amount_sum': s['Actual_Sum'],
+                'Dosing_Station_nunique': s['Stations'].map(len),
+                'Failed': (s['QC_Result'] == 'failed').astype(int)
+            })
+        numeric = rows.select_dtypes('number').columns
+        rows[numeric] = rows[numeric].round(4)
+        return rows[BATCH_COLUMNS]
+
+
+def replay(df, chunk_size=5000, qc_delay='2h', **kwargs):
+    """Replay a static event table as an out-of-order stream.
+
+    Dosing events arrive in event-time order in chunks; each batch's QC result
+    arrives ``qc_delay`` after its last dose. Returns (batch rows, aggregator).
+    """
+    events = df.drop(columns=['QC_Result']).assign(Event_Time=event_times(df))
+    events = events.sort_values('Event_Time', kind='stable').reset_index(drop=True)
+    qc = df.groupby('Batch_ID', sort=False)['QC_Result'].first().rename('QC_Result').reset_index()
+    qc['Arrival'] = qc['Batch_ID'].map(events.groupby('Batch_ID')['Event_Time'].max()) + pd.Timedelta(qc_delay)
+    qc = qc.sort_values('Arrival', kind='stable')
+
+    aggregator = BatchWindowAggregator(**kwargs)
+    outputs = []
+    for start in range(0, len(events), chunk_size):
+        chunk = events.iloc[start:start + chunk_size]
+        due = qc['Arrival'] <= chunk['Event_Time'].max()
+        outputs.append(aggregator.process_qc(qc[due]))
+        qc = qc[~due]
+        outputs.append(aggregator.process_events(chunk))
+    outputs.append(aggregator.process_qc(qc))
+    outputs.append(aggregator.flush())
+    outputs = [rows for rows in outputs if len(rows)]
+    batches = pd.concat(outputs, ignore_index=True) if outputs else pd.DataFrame(columns=BATCH_COLUMNS)
+    return batches, aggregator
@@ -3,22 +3,34 @@ Visualization Generator for Paint Quality Analysis
 Creates stakeholder-friendly visualizations for business communication.
 """
 
+import os
+
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 
+from downsampling import density_grid, lttb, minmax
+from event_archive import event_timestamps
+
 class VisualizationGenerator:
     """Generate business-focused visualizations for paint quality analysis."""
     
-    def __init__(self, analyzer):
-        """Initialize with analyzer instance."""
+    def __init__(self, analyzer, output_dir="visualizations", include_plotlyjs=True):
+        """Initialize with analyzer instance.
+
+        include_plotlyjs='cdn' links plotly.js instead of embedding it (~3.5 MB per file).
+        """
         self.analyzer = analyzer
         self.df = analyzer.df
         self.batch_df = analyzer.batch_df
+        self.output_dir = output_dir
+        self.include_plotlyjs = include_plotlyjs
+
+    def _output_path(self, filename):
+        """Path of a chart file inside the output directory."""
+        return os.path.join(self.output_dir, filename)
         
     def create_executive_dashboard(self):
         """Create executive summary dashboard."""
@@ -126,8 +138,8 @@ class VisualizationGenerator:
         fig.update_yaxes(title_text="Failure Rate (%)", row=2, col=2)
         
         # Save dashboard
-        fig.write_html("visualizations/executive_dashboard.html")
-        print("Executive dashboard saved to visualizations/executive_dashboard.html")
+        fig.write_html(self._output_path("executive_dashboard.html"), include_plotlyjs=self.include_plotlyjs)
+        print(f"Executive dashboard saved to {self._output_path('executive_dashboard.html')}")
         
         return fig
     
@@ -135,16 +147,30 @@ class VisualizationGenerator:
         """Create action priority matrix."""
         print("Creating Action Priority Chart...")
         
-        # Define recommendations with impact and effort
+        # Impacts come from the analysis: failure-rate gaps and the optimal maintenance schedule
+        results = self.analyzer.analysis_results
+        complexity = results['fundamental_components']['complexity_effect']
+        temperature = results['fundamental_components']['temperature_effect']
         recommendations = [
-            {'Action': 'Recipe Complexity\nLimits', 'Impact': 12.7, 'Effort': 1, 'Type': 'Policy'},
-            {'Action': 'Temperature\nControl', 'Impact': 10.6, 'Effort': 3, 'Type': 'Infrastructure'},
-            {'Action': 'Station D03\nMaintenance', 'Impact': 5.0, 'Effort': 2, 'Type': 'Maintenance'},
-            {'Action': 'Station D07\nCalibration', 'Impact': 4.5, 'Effort': 2, 'Type': 'Maintenance'},
-            {'Action': 'Dosing Error\nReduction', 'Impact': 8.0, 'Effort': 4, 'Type': 'Process'}
+            {'Action': 'Recipe Complexity\nLimits', 'Effort': 1, 'Type': 'Policy',
+             'Impact': (complexity['Complex_Recipes_Failure_Rate'] - complexity['Simple_Recipes_Failure_Rate']) * 100},
+            {'Action': 'Temperature\nControl', 'Effort': 3, 'Type': 'Infrastructure',
+             'Impact': (temperature['Suboptimal_Temp_Failure_Rate'] - temperature['Optimal_Temp_Failure_Rate']) * 100},
         ]
+
+        if 'maintenance_schedule' not in results:
+            from maintenance_optimizer import MaintenanceOptimizer
+
+            optimizer = MaintenanceOptimizer(self.df)
+            plan = optimizer.station_plan(optimizer.optimize())
+        else:
+            plan = results['maintenance_schedule']['station_plan']
+        for station in plan[plan['Calibrations'] > 0].itertuples():
+            recommendations.append({'Action': f'Station {station.Dosing_Station}\nCalibration', 'Effort': 2,
+                                    'Type': 'Maintenance', 'Impact': station.Failure_Rate_Reduction * 100})
         
         df_rec = pd.DataFrame(recommendations)
+        df_rec['Impact'] = df_rec['Impact'].clip(lower=0)
         
         # Create priority matrix
         fig = px.scatter(
@@ -179,8 +205,8 @@ class VisualizationGenerator:
         )
         
         # Save chart
-        fig.write_html("visualizations/action_priority_matrix.html")
-        print("Action priority matrix saved to visualizations/action_priority_matrix.html")
+        fig.write_html(self._output_path("action_priority_matrix.html"), include_plotlyjs=self.include_plotlyjs)
+        print(f"Action priority matrix saved to {self._output_path('action_priority_matrix.html')}")
         
         return fig
     
@@ -251,11 +277,83 @@ class VisualizationGenerator:
         fig.update_yaxes(title_text="Dosing Bias (Actual - Target)", row=1, col=2)
         
         # Save chart
-        fig.write_html("visualizations/station_analysis.html")
-        print("Station analysis saved to visualizations/station_analysis.html")
+        fig.write_html(self._output_path("station_analysis.html"), include_plotlyjs=self.include_plotlyjs)
+        print(f"Station analysis saved to {self._output_path('station_analysis.html')}")
         
         return fig
 
+    def create_event_level_chart(self, max_points=4000, bins=200, method="lttb"):
+        """Event-level dosing views that stay small for millions of events.
+
+        Actual vs target is drawn as a log-count density grid, and dosing
+        error over time as one WebGL line per station, downsampled server-side
+        to about max_points in total with LTTB or min/max bucketing.
+        """
+        print("Creating Event-Level Dosing Chart...")
+
+        fig = make_subplots(
+            rows=1, cols=2,
+            subplot_titles=['Actual vs Target Amount (event density)', 'Dosing Error over Time by Station'],
+            column_widths=[0.4, 0.6]
+        )
+
+        # 1. Density instead of one marker per event
+        counts, x_centers, y_centers = density_grid(self.df['Target_Amount'], self.df['Actual_Amount'], bins=bins)
+        with np.errstate(divide='ignore'):
+            log_counts = np.where(counts > 0, np.log10(counts), np.nan).round(2)
+        fig.add_trace(
+            go.Heatmap(
+                x=x_centers, y=y_centers, z=log_counts.T,
+                colorscale='Viridis',
+                colorbar=dict(title='log10 events', x=0.36),
+                customdata=counts.T.astype(np.int64),
+                hovertemplate='Target %{x:.2f}<br>Actual %{y:.2f}<br>%{customdata:.0f} events<extra></extra>'
+            ),
+            row=1, col=1
+        )
+        low, high = x_centers[0], x_centers[-1]
+        fig.add_trace(
+            go.Scattergl(x=[low, high], y=[low, high], mode='lines', line=dict(color='white', dash='dash'),
+                         name='Actual = Target', showlegend=False),
+            row=1, col=1
+        )
+
+        # 2. Downsampled error series per station, drawn with WebGL
+        events = pd.DataFrame({
+            'Time': event_timestamps(self.df),
+            'Station': self.df['Dosing_Station'].to_numpy(),
+            'Error': (self.df['Actual_Amount'] - self.df['Target_Amount']).to_numpy(dtype=float),
+        }).dropna().sort_values('Time', kind='stable')
+        stations = sorted(events['Station'].unique())
+        per_station = max(max_points // max(len(stations), 1), 3)
+        for station in stations:
+            series = events[events['Station'] == station]
+            times = series['Time'].to_numpy()
+            errors = series['Error'].to_numpy()
+            if method == "minmax":
+                keep = minmax(errors, per_station // 2)
+            else:
+                keep = lttb(times.astype(np.int64), errors, per_station)
+            fig.add_trace(
+                go.Scattergl(x=times[keep], y=errors[keep], mode='lines', name=station, line=dict(width=1)),
+                row=1, col=2
+            )
+
+        fig.update_layout(
+            title_text=f"Event-Level Dosing Accuracy ({len(self.df):,} events)",
+            title_x=0.5,
+            height=550
+        )
+        fig.update_xaxes(title_text="Target Amount", row=1, col=1)
+        fig.update_yaxes(title_text="Actual Amount", row=1, col=1)
+        fig.update_xaxes(title_text="Production Time", row=1, col=2)
+        fig.update_yaxes(title_text="Dosing Error (Actual - Target)", row=1, col=2)
+
+        fig.write_html(self._output_path("event_level_dosing.html"), include_plotlyjs=self.include_plotlyjs)
+        print(f"Event-level dosing chart saved to {self._output_path('event_level_dosing.html')}")
+
+        return fig
+
 if __name__ == "__main__":
     # Import analyzer and run visualizations
     import os
@@ -274,5 +372,6 @@ if __name__ == "__main__":
     viz_gen.create_executive_dashboard()
     viz_gen.create_action_priority_chart()
     viz_gen.create_station_analysis_chart()
+    viz_gen.create_event_level_chart()
     
     print("\nAll visualizations created successfully!")
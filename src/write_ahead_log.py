@@ -0,0 +1,138 @@
+"""
+Write-Ahead Log for Event Ingestion
+Append-only log of raw source chunks, written before they are validated and
+committed to the event store. Records are checksummed and numbered with a
+log sequence number (LSN); appends are buffered and made durable together by
+one fsync (group commit), and the log rotates to a new segment file once the
+current one is full. After a crash the records past the store's checkpoint
+are replayed, so data read from pipes and sockets is not lost and file
+sources need not be re-read.
+"""
+
+import os
+import struct
+import zlib
+
+from event_store import _fsync_directory
+
+# Record header: payload length, CRC32 of everything after the header's first 8 bytes, LSN, source offset
+_HEADER = struct.Struct('<IIQQ')
+_PREFIX = 'wal-'
+_SUFFIX = '.log'
+
+
+def _segment_name(first_lsn):
+    return f"{_PREFIX}{first_lsn:016d}{_SUFFIX}"
+
+
+def _scan(data):
+    """Yield (lsn, offset, payload, end) for each intact record; stops at the first torn or corrupt one."""
+    position = 0
+    while position + _HEADER.size <= len(data):
+        length, crc, lsn, offset = _HEADER.unpack_from(data, position)
+        end = position + _HEADER.size + length
+        if end > len(data) or zlib.crc32(data[position + 8:end]) != crc:
+            return
+        yield lsn, offset, data[position + _HEADER.size:end], end
+        position = end
+
+
+class WriteAheadLog:
+    """Segmented, checksummed append-only log with group commit."""
+
+    def __init__(self, directory, segment_bytes=64 << 20, group_bytes=1 << 20):
+        """Open (or create) a log, cutting off a record torn by a crash mid-write.
+
+        Buffered appends are written and fsynced together by commit(), which
+        also happens automatically once ``group_bytes`` are pending.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.group_bytes = group_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.segments = sorted(int(name[len(_PREFIX):-len(_SUFFIX)]) for name in os.listdir(directory)
+                               if name.startswith(_PREFIX) and name.endswith(_SUFFIX))
+        self.next_lsn = 1
+        self.last_offset = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._file = None
+
+        # Only the active (last) segment can hold a torn record
+        if self.segments:
+            path = self._path(self.segments[-1])
+            with open(path, 'rb') as f:
+                data = f.read()
+            good = 0
+            self.next_lsn = self.segments[-1]
+            for lsn, offset, _, end in _scan(data):
+                self.next_lsn, self.last_offset, good = lsn + 1, offset, end
+            if good < len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(good)
+                    os.fsync(f.fileno())
+            if self.last_offset is None and len(self.segments) > 1:
+                # Empty active segment: the previous one holds the latest offset
+                for _, offset, _, _ in self.replay(self.segments[-2] - 1):
+                    self.last_offset = offset
+
+    def _path(self, first_lsn):
+        return os.path.join(self.directory, _segment_name(first_lsn))
+
+    def append(self, payload, offset=0):
+        """Buffer one record; returns its LSN. Durable only after commit()."""
+        lsn = self.next_lsn
+        self.next_lsn += 1
+        body = struct.pack('<QQ', lsn, offset) + payload
+        self._pending.append(struct.pack('<II', len(payload), zlib.crc32(body)) + body)
+        self._pending_bytes += len(self._pending[-1])
+        self.last_offset = offset
+        if self._pending_bytes >= self.group_bytes:
+            self.commit()
+        return lsn
+
+    def commit(self):
+        """Write every buffered record with a single fsync; rotates to a new segment when full."""
+        if not self._pending:
+            return
+        first_lsn = self.next_lsn - len(self._pending)
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            self._rotate(first_lsn)
+        self._file.write(b''.join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending, self._pending_bytes = [], 0
+
+    def _rotate(self, first_lsn):
+        """Close the active segment and continue in the last one (on open) or a new one."""
+        if self._file is None and self.segments and os.path.getsize(self._path(self.segments[-1])) < self.segment_bytes:
+            self._file = open(self._path(self.segments[-1]), 'ab')
+            return
+        if self._file is not None:
+            self._file.close()
+        self.segments.append(first_lsn)
+        self._file = open(self._path(first_lsn), 'ab')
+        _fsync_directory(self.directory)
+
+    def replay(self, after_lsn=0):
+        """Yield (lsn, offset, payload) for durable records with LSN > after_lsn, in order."""
+        for i, first_lsn in enumerate(self.segments):
+            if i + 1 < len(self.segments) and self.segments[i + 1] <= after_lsn + 1:
+                continue  # every record in this segment is at or before after_lsn
+            with open(self._path(first_lsn), 'rb') as f:
+                data = f.read()
+            for lsn, offset, payload, _ in _scan(data):
+                if lsn > after_lsn:
+                    yield lsn, offset, payload
+
+    def truncate(self, upto_lsn):
+        """Delete segments whose records are all at or before ``upto_lsn`` (e.g. checkpointed in the store)."""
+        while len(self.segments) > 1 and self.segments[1] <= upto_lsn + 1:
+            os.remove(self._path(self.segments.pop(0)))
+
+    def close(self):
+        """Commit pending records and close the active segment."""
+        self.commit()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,80 @@
+"""Shared fixtures: a small synthetic dosing-event dataset with the production schema."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_events(n_batches=400, seed=0):
+    """Generate dosing events shaped like data/paint_production_data.csv."""
+    rng = np.random.default_rng(seed)
+    stations = np.array([f"D{i:02d}" for i in range(1, 8)])
+    station_bias = np.array([0.1, 0.0, 0.8, 0.0, 0.2, 0.1, 0.7])
+    recipes = {f"Recipe_{i:02d}": int(rng.integers(5, 31)) for i in range(20)}
+    recipe_names = np.array(list(recipes))
+
+    start = pd.Timestamp("2024-01-01")
+    rows = []
+    for b in range(n_batches):
+        recipe = recipe_names[rng.integers(len(recipe_names))]
+        n_ingredients = recipes[recipe]
+        temperature = rng.normal(22.5, 3.0)
+        day = start + pd.Timedelta(days=int(b * 365 / n_batches))
+        seconds = int(rng.integers(0, 86400 - 3600))
+        batch_stations = rng.integers(0, len(stations), n_ingredients)
+        targets = np.round(rng.uniform(1.0, 50.0, n_ingredients), 3)
+        errors = rng.normal(station_bias[batch_stations], 0.5)
+        risk = (
+            -1.2
+            + 0.06 * (n_ingredients - 15)
+            + 0.15 * abs(temperature - 22.5)
+            + 0.8 * np.abs(errors).mean()
+        )
+        failed = rng.random() < 1 / (1 + np.exp(-risk))
+        for i in range(n_ingredients):
+            rows.append(
+                {
+                    "Batch_ID": f"B{b:05d}",
+                    "Production_Date": day.strftime("%Y-%m-%d"),
+                    "Production_Time": str(
+                        pd.Timedelta(seconds=seconds + 60 * i)
+                    ).split(" ")[-1],
+                    "Recipe_Name": recipe,
+                    "Num_Ingredients": n_ingredients,
+                    "Dosing_Station": stations[batch_stations[i]],
+                    "Target_Amount": targets[i],
+                    "Actual_Amount": round(targets[i] + errors[i], 3),
+                    "Facility_Temperature": round(temperature + rng.normal(0, 0.2), 2),
+                    "QC_Result": "failed" if failed else "passed",
+                }
+            )
+    events = pd.DataFrame(rows)
+    missing = rng.random(len(events)) < 0.01
+    events.loc[missing, "Facility_Temperature"] = np.nan
+    return events
+
+
+@pytest.fixture(scope="session")
+def events_df():
+    """Synthetic event-level frame."""
+    return make_events()
+
+
+@pytest.fixture(scope="session")
+def data_csv(events_df, tmp_path_factory):
+    """Synthetic dataset written to CSV, as the analyzer expects."""
+    path = tmp_path_factory.mktemp("data") / "paint_production_data.csv"
+    events_df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def analyzer(data_csv):
+    """Analyzer with the first three phases already run."""
+    from paint_analysis import PaintQualityAnalyzer
+
+    analyzer = PaintQualityAnalyzer(data_csv)
+    analyzer.load_and_validate_data()
+    analyzer.analyze_fundamental_components()
+    analyzer.analyze_systems_interactions()
+    return analyzer
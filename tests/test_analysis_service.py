@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from analysis_service import AnalysisService, make_handler
+
+
+@pytest.fixture
+def server(data_csv, tmp_path):
+    path = str(tmp_path / 'events.csv')
+    shutil.copy(data_csv, path)
+    service = AnalysisService(path, n_workers=0, enable_sql=True)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", service, path
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+
+def _get(url, etag=None):
+    request = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_health_metrics_and_endpoints(server):
+    base, service, path = server
+    status, _, body = _get(f"{base}/health")
+    assert status == 200 and json.loads(body)['status'] == 'ok'
+
+    status, _, body = _get(f"{base}/stations")
+    stations = json.loads(body)
+    assert status == 200 and len(stations['stations']) == 7
+
+    status, _, body = _get(f"{base}/risk-scores?top=5")
+    scores = json.loads(body)['scores']
+    assert status == 200 and len(scores) == 5
+    assert scores[0]['Risk_Score'] >= scores[-1]['Risk_Score']
+    assert scores[0]['Top_Driver'] + '_Contribution' in scores[0]
+
+    status, _, body = _get(f"{base}/sql?q=SELECT%20COUNT(*)%20AS%20n%20FROM%20batches")
+    assert json.loads(body)['rows'][0]['n'] == len(service.analyzer.batch_df)
+
+    assert _get(f"{base}/nope")[0] == 404
+    assert _get(f"{base}/sql")[0] == 400
+    target = os.path.join(os.path.dirname(path), 'attached.db')
+    assert _get(f"{base}/sql?q=ATTACH%20DATABASE%20'{target}'%20AS%20x")[0] == 400
+    assert _get(f"{base}/sql?q=SELECT%201%3B%20DROP%20VIEW%20batches")[0] == 400
+    assert not os.path.exists(target)
+    status, _, body = _get(f"{base}/metrics")
+    assert 'paint_requests_total{endpoint="/stations"} 1' in body.decode()
+
+
+def test_etag_revalidation_and_invalidation_on_new_data(server, events_df):
+    base, service, path = server
+    status, headers, _ = _get(f"{base}/recommendations")
+    etag = headers['ETag']
+    assert _get(f"{base}/recommendations", etag)[0] == 304
+
+    # Newly ingested data changes the version, so the old ETag no longer matches
+    events_df.head(100).to_csv(path, mode='a', header=False, index=False)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    status, headers, _ = _get(f"{base}/recommendations", etag)
+    assert status == 200 and headers['ETag'] != etag
+    assert service.metrics['reloads'] == 2
+
+
+def test_sql_endpoint_is_off_by_default(data_csv):
+    service = AnalysisService(data_csv, n_workers=0)
+    try:
+        assert service.respond('/sql', 'q=SELECT%201')[0] == 404
+    finally:
+        service.close()
+
+
+def test_inline_requests_share_the_served_analyzer(data_csv, monkeypatch):
+    import analysis_service
+
+    loads = []
+    load = analysis_service._load_analyzer
+    monkeypatch.setattr(analysis_service, '_load_analyzer', lambda path: loads.append(path) or load(path))
+    service = AnalysisService(data_csv, n_workers=0)
+    try:
+        assert len(loads) == 1
+        assert analysis_service._WORKER_STATE['analyzer'] is service.analyzer
+    finally:
+        service.close()
+
+
+def test_concurrent_requests_share_a_bounded_cache(server):
+    _, service, _ = server
+    service.cache_size = 3
+    statuses = []
+
+    def hammer(worker):
+        for i in range(50):
+            statuses.append(service.respond('/stations', f"v={(worker + i) % 7}")[0])
+
+    threads = [threading.Thread(target=hammer, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(statuses) == {200} and len(statuses) == 400
+    assert len(service.cache) <= 3
+    assert service.metrics['requests']['/stations'] == 400
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from backtesting import RollingOriginBacktester, expected_calibration_error
+
+
+def test_expected_calibration_error_is_zero_when_calibrated():
+    y_prob = np.array([0.25] * 4 + [0.75] * 4)
+    y_true = np.array([1, 0, 0, 0, 1, 1, 1, 0])
+    assert expected_calibration_error(y_true, y_prob) == 0.0
+
+
+def test_windows_never_train_on_the_future(analyzer):
+    backtester = RollingOriginBacktester(analyzer, initial_train_days=120, horizon_days=30)
+    _, _, dates = backtester._prepare_data()
+    for _, train_start, train_end, test_start, test_end in backtester.windows(dates):
+        assert dates[train_end - 1] < dates[test_start]
+        assert test_end > test_start
+
+
+def test_backtest_reports_each_window(analyzer):
+    backtester = RollingOriginBacktester(
+        analyzer,
+        initial_train_days=120,
+        horizon_days=30,
+        model_spec=("Logistic Regression", {}),
+        n_jobs=2,
+    )
+    results = backtester.run()
+    report = results["windows"]
+
+    assert analyzer.analysis_results["backtest"] is results
+    assert len(report) >= 5
+    assert (report["Scoring_Latency_ms"] > 0).all()
+    assert report["Calibration_Error"].between(0, 1).all()
+
+
+def test_single_class_training_windows_are_skipped(analyzer):
+    batch_df = analyzer.batch_df
+    dates = batch_df["Production_Date_first"]
+    quiet = batch_df.copy()
+    quiet.loc[dates < dates.min() + pd.Timedelta(days=75), "Failed"] = 0
+    analyzer.batch_df = quiet
+    try:
+        backtester = RollingOriginBacktester(analyzer, initial_train_days=30, horizon_days=30, window="sliding",
+                                             model_spec=("Logistic Regression", {}), n_jobs=1)
+        results = backtester.run()
+    finally:
+        analyzer.batch_df = batch_df
+
+    skipped = results["skipped_windows"]
+    assert len(skipped) >= 1
+    assert (skipped["Origin"] < results["windows"]["Origin"].min()).all()
+    assert list(results["windows"].index) == list(range(len(results["windows"])))
@@ -0,0 +1,78 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compiled_model import compile_model
+
+
+def _data(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+    return X, y
+
+
+def test_compiled_forest_matches_sklearn():
+    X, y = _data()
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0).fit(X, y)
+    compiled = compile_model(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X))
+
+
+def test_compiled_logistic_pipeline_matches_sklearn():
+    X, y = _data(1)
+    model = make_pipeline(StandardScaler(), LogisticRegression()).fit(X, y)
+    compiled = compile_model(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X))
+
+
+def _brute_force_shap(model, x):
+    """Path-dependent Shapley values by enumerating feature subsets."""
+    from itertools import combinations
+    from math import factorial
+
+    def expectation(tree, subset, node=0):
+        if tree.children_left[node] == -1:
+            counts = tree.value[node, 0]
+            return counts[-1] / counts.sum()
+        left, right = tree.children_left[node], tree.children_right[node]
+        if tree.feature[node] in subset:
+            return expectation(tree, subset, left if x[tree.feature[node]] <= tree.threshold[node] else right)
+        cover = tree.weighted_n_node_samples
+        return (cover[left] * expectation(tree, subset, left) + cover[right] * expectation(tree, subset, right)) / cover[node]
+
+    n = len(x)
+    phi = np.zeros(n)
+    for i in range(n):
+        others = [j for j in range(n) if j != i]
+        for k in range(n):
+            for subset in combinations(others, k):
+                weight = factorial(k) * factorial(n - k - 1) / factorial(n)
+                phi[i] += weight * np.mean([expectation(e.tree_, set(subset) | {i}) - expectation(e.tree_, set(subset))
+                                            for e in model.estimators_])
+    return phi
+
+
+def test_forest_explanations_are_exact_tree_shap():
+    X, y = _data(2)
+    X[:, 3] = np.round(X[:, 3])  # repeated splits on one feature along a path
+    model = RandomForestClassifier(n_estimators=5, max_depth=5, random_state=0).fit(X, y)
+    compiled = compile_model(model)
+
+    phi = compiled.explain(X[:10])
+    np.testing.assert_allclose(phi.sum(axis=1) + compiled.expected_value, model.predict_proba(X[:10])[:, 1])
+    expected = np.array([_brute_force_shap(model, x.astype(np.float32)) for x in X[:10]])
+    np.testing.assert_allclose(phi, expected, atol=1e-12)
+
+
+def test_logistic_contributions_sum_to_log_odds():
+    X, y = _data(3)
+    model = make_pipeline(StandardScaler(), LogisticRegression()).fit(X, y)
+    compiled = compile_model(model)
+
+    phi = compiled.explain(X)
+    np.testing.assert_allclose(phi.sum(axis=1) + compiled.expected_value, model.decision_function(X))
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+
+import data_access
+
+
+def test_tables_are_cached_and_shared(data_csv):
+    data_access.clear_cache()
+    first = data_access.load_event_table(data_csv)
+    second = data_access.load_event_table(data_csv)
+
+    assert first is not second
+    assert np.shares_memory(first['Target_Amount'].to_numpy(), second['Target_Amount'].to_numpy())
+    assert {'Dosing_Error_Abs', 'Dosing_Error_Rel'} <= set(first.columns)
+    assert data_access._event_table.cache_info().misses == 1
+
+    # Adding columns to one copy leaves the cached table untouched
+    first['Extra'] = 1
+    assert 'Extra' not in data_access.load_event_table(data_csv).columns
+
+    batch_df = data_access.load_batch_table(data_csv)
+    station_df = data_access.load_station_table(data_csv)
+    assert len(batch_df) == first['Batch_ID'].nunique()
+    assert station_df['Event_Count'].sum() == first['Dosing_Station'].notna().sum()
+    assert data_access._event_table.cache_info().misses == 1
+
+
+def test_modified_file_is_reloaded(data_csv, tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text(open(data_csv).read())
+    before = len(data_access.load_event_table(str(path)))
+
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text(''.join(lines[:-10]))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert len(data_access.load_event_table(str(path))) == before - 10
+
+
+def test_analyzer_reads_csv_through_the_shared_cache(data_csv):
+    from paint_analysis import PaintQualityAnalyzer
+
+    data_access.clear_cache()
+    with contextlib.redirect_stdout(io.StringIO()):
+        PaintQualityAnalyzer(data_csv).load_and_validate_data()
+    raw = data_access.load_event_table(data_csv, raw=True)
+    assert data_access._raw_event_table.cache_info().misses == 1
+    assert raw['Production_Date'].dtype != 'datetime64[ns]'  # as read, for validation
+
+    events = data_access.load_event_table(data_csv)
+    assert data_access._raw_event_table.cache_info().misses == 1
+    assert len(events) == len(raw)
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from data_quality import DataQualityEngine
+
+
+def test_rules_route_rows_to_quarantine_with_reasons(events_df, tmp_path):
+    df = events_df.copy()
+    first_batch = df.index[df['Batch_ID'] == 'B00002']
+    untimed = df.index[df['Batch_ID'] == 'B00003'][0]
+    df.loc[3, 'Target_Amount'] = -1.0
+    df.loc[4, 'Actual_Amount'] = df.loc[4, 'Target_Amount'] * 100
+    df.loc[5, 'Facility_Temperature'] = 400.0
+    df.loc[untimed, 'Production_Time'] = None
+    df.loc[first_batch[0], 'QC_Result'] = 'failed' if df.loc[first_batch[1], 'QC_Result'] == 'passed' else 'passed'
+    df = pd.concat([df, df.iloc[[10]]], ignore_index=True)
+
+    engine = DataQualityEngine(quarantine_dir=str(tmp_path))
+    clean, quarantine, report = engine.validate(df, partition='test')
+
+    reasons = quarantine['Reason_Codes']
+    assert 'NONPOSITIVE_TARGET' in reasons.loc[3]
+    assert 'DOSING_RATIO' in reasons.loc[4]
+    assert reasons.loc[untimed] == 'BAD_TIME'
+    assert reasons.iloc[-1] == 'DUPLICATE_EVENT'
+    # The duplicate alone is dropped; its batch does not count it against Num_Ingredients
+    duplicated_batch = df.index[df['Batch_ID'] == df.loc[10, 'Batch_ID']]
+    assert not quarantine.index.intersection(duplicated_batch[:-1]).size
+    assert (reasons.loc[first_batch] == 'INCONSISTENT_BATCH').all()
+
+    # Implausible temperatures are blanked, not rejected; missing temperatures are kept
+    assert 5 not in quarantine.index
+    assert report['values_nullified'] == 1
+    assert clean['Facility_Temperature'].max() < 60
+    assert report['missing_values']['Facility_Temperature'] == clean['Facility_Temperature'].isna().sum()
+
+    assert len(clean) + len(quarantine) == len(df)
+    assert clean['Production_Date'].dtype == 'datetime64[ns]'
+    assert clean['Num_Ingredients'].dtype == 'int64'
+    expected = pd.to_datetime(clean['Production_Date']) + pd.to_timedelta(clean['Production_Time'])
+    assert (clean['Production_Timestamp'] > 0).all()
+    assert (clean['Production_Timestamp'] == expected.dt.as_unit('ns').astype('int64')).all()
+    written = pd.read_csv(tmp_path / 'ingest=test' / 'rejected.csv')
+    assert len(written) == report['rows_quarantined'] == len(quarantine)
+
+
+def test_clean_rows_keep_their_values(events_df):
+    clean, quarantine, report = DataQualityEngine().validate(events_df)
+    assert report['rows_quarantined'] < 0.01 * len(events_df)
+    kept = events_df.drop(index=quarantine.index).reset_index(drop=True)
+    pd.testing.assert_series_equal(clean['Actual_Amount'], kept['Actual_Amount'])
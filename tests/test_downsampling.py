@@ -0,0 +1,53 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from downsampling import density_grid, lttb, minmax
+from visualization_generator import VisualizationGenerator
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(100_000, dtype=float)
+    y = np.sin(x / 5000)
+    y[61_234] = 25.0
+    keep = lttb(x, y, 500)
+    assert len(keep) == 500 and keep[0] == 0 and keep[-1] == len(x) - 1
+    assert (np.diff(keep) > 0).all()
+    assert 61_234 in keep
+    assert np.array_equal(lttb(x[:10], y[:10], 50), np.arange(10))
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=50_000)
+    y[[10, 20_000]] = [-40, 40]
+    y[30_000] = np.nan
+    keep = minmax(y, 100)
+    assert len(keep) <= 202 and {10, 20_000} <= set(keep)
+    assert not np.isnan(y[keep]).any()
+
+
+def test_density_grid_counts_events():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 1, 10_000)
+    counts, xc, yc = density_grid(x, x + 0.01, bins=20, bounds=((0, 1), (0, 1.01)))
+    assert counts.shape == (20, 20) and counts.sum() == 10_000 and len(xc) == len(yc) == 20
+
+
+def test_event_level_chart_stays_small_for_a_million_events(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 1_000_000
+    target = rng.uniform(1, 50, n)
+    df = pd.DataFrame({
+        'Production_Timestamp': np.sort(rng.integers(1.70e18, 1.73e18, n)),
+        'Dosing_Station': rng.choice([f"D{i:02d}" for i in range(1, 8)], n),
+        'Target_Amount': target,
+        'Actual_Amount': target + rng.normal(0.2, 0.5, n),
+    })
+    viz = VisualizationGenerator(SimpleNamespace(df=df, batch_df=None), output_dir=str(tmp_path),
+                                 include_plotlyjs='cdn')
+    fig = viz.create_event_level_chart(max_points=2000)
+    assert sum(len(trace.x) for trace in fig.data if trace.type == 'scattergl') <= 2000 + 2
+    assert os.path.getsize(tmp_path / 'event_level_dosing.html') < 1_000_000
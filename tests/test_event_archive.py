@@ -0,0 +1,34 @@
+import pandas as pd
+
+from event_archive import EventArchive, event_timestamps, filter_events
+from paint_analysis import PaintQualityAnalyzer
+
+
+def test_range_and_station_reads_touch_only_matching_blocks(events_df, tmp_path):
+    # D07 is decommissioned at the end of June
+    dates = pd.to_datetime(events_df['Production_Date'])
+    events = events_df[(events_df['Dosing_Station'] != 'D07') | (dates < '2024-07-01')].sample(frac=1, random_state=0)
+    archive = EventArchive.write(events, str(tmp_path / 'archive'), block_rows=200)
+    assert len(archive) == len(events)
+    assert archive.stats['blocks_total'] > 24  # monthly partitions split into blocks
+
+    recent = archive.read(start='2024-11-01', end='2024-12-01')
+    expected = filter_events(events, start='2024-11-01', end='2024-12-01')
+    assert len(recent) == len(expected) and recent['Batch_ID'].nunique() == expected['Batch_ID'].nunique()
+    assert archive.stats['blocks_read'] < archive.stats['blocks_total'] / 6
+    assert (event_timestamps(recent)[1:] >= event_timestamps(recent)[:-1]).all()
+
+    d07 = archive.read(stations=['D07'], columns=['Batch_ID', 'Actual_Amount'])
+    assert list(d07.columns) == ['Batch_ID', 'Actual_Amount']
+    assert len(d07) == (events['Dosing_Station'] == 'D07').sum()
+    assert archive.stats['blocks_read'] < archive.stats['blocks_total'] * 0.6
+
+
+def test_analyzer_loads_a_date_range_from_the_archive(events_df, tmp_path):
+    path = str(tmp_path / 'archive')
+    EventArchive.write(events_df, path)
+    analyzer = PaintQualityAnalyzer(path, start='2024-10-01', end='2025-01-01')
+    analyzer.load_and_validate_data()
+    assert analyzer.df['Production_Date'].min() >= pd.Timestamp('2024-10-01')
+    assert analyzer.batch_df['Batch_ID'].nunique() == events_df.loc[
+        pd.to_datetime(events_df['Production_Date']) >= '2024-10-01', 'Batch_ID'].nunique()
@@ -0,0 +1,36 @@
+from hyperparameter_tuning import HyperparameterTuner
+
+SMALL_SPACE = {
+    "Logistic Regression": {"C": [0.01, 1.0]},
+    "Random Forest": {"n_estimators": [20], "max_depth": [3, 6]},
+}
+
+
+def test_successive_halving_stores_winner(analyzer):
+    tuner = HyperparameterTuner(analyzer, search_space=SMALL_SPACE, n_jobs=1)
+    results = tuner.tune()
+
+    assert analyzer.analysis_results["hyperparameter_tuning"] is results
+    assert results["best_family"] in SMALL_SPACE
+    assert 0.0 <= results["best_cv_auc"] <= 1.0
+    assert hasattr(results["best_model"], "predict_proba")
+    assert len(tuner.candidates()) == 4
+
+
+def test_hyperband_runs_in_worker_pool(analyzer):
+    tuner = HyperparameterTuner(analyzer, search_space=SMALL_SPACE, n_jobs=2)
+    results = tuner.tune(method="hyperband")
+
+    assert not results["leaderboard"].empty
+    assert results["leaderboard"]["Train_Samples"].max() > 0
+
+
+def test_lone_survivor_is_scored_at_full_budget(analyzer):
+    # A zero margin leaves a single configuration after the first rung's fold-0 cut-off
+    tuner = HyperparameterTuner(analyzer, search_space=SMALL_SPACE, n_jobs=1, cutoff_margin=0.0, min_resources=100)
+    results = tuner.tune()
+
+    board = results["leaderboard"]
+    full = board[board["Train_Samples"] == board["Train_Samples"].max()]
+    assert board["Train_Samples"].max() > 100
+    assert results["best_cv_auc"] == full["Mean_AUC"].max()
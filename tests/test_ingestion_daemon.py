@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import pytest
+
+from event_store import EventStore
+from ingestion_daemon import FileTailSource, IngestionDaemon, UnixSocketSource
+
+
+def test_file_ingestion_resumes_from_committed_offset(events_df, tmp_path):
+    path = tmp_path / "events.csv"
+    half = len(events_df) // 2
+    events_df.iloc[:half].to_csv(path, index=False)
+    store_dir = str(tmp_path / "store")
+
+    source = FileTailSource(str(path), read_size=16384)
+    stats = asyncio.run(IngestionDaemon(source, store_dir, batch_size=1000).run())
+    assert stats["events_read"] == half
+    assert stats["micro_batches"] > 1
+
+    # An append interrupted before its manifest commit leaves an orphan segment behind
+    (tmp_path / "store" / "segment-999999-deadbeef.npz").write_bytes(b"partial")
+    events_df.iloc[half:].to_csv(path, mode="a", header=False, index=False)
+    quarantined = stats["events_quarantined"]
+    stats = asyncio.run(IngestionDaemon(FileTailSource(str(path)), store_dir, batch_size=1000).run())
+    assert stats["events_read"] == len(events_df) - half
+
+    store = EventStore(store_dir)
+    assert "segment-999999-deadbeef.npz" not in os.listdir(store_dir)
+    assert store.offset(f"file:{path}") == os.path.getsize(path)
+    stored = store.read()
+    assert len(stored) + quarantined + stats["events_quarantined"] == len(events_df)
+    assert stored["Production_Date"].dtype == "datetime64[ns]"
+    assert stored["Batch_ID"].nunique() == events_df["Batch_ID"].nunique()
+
+
+def test_socket_source_with_backpressure(events_df, tmp_path):
+    socket_path = str(tmp_path / "events.sock")
+    lines = events_df.to_csv(index=False, header=False).encode()
+    source = UnixSocketSource(socket_path, queue_size=2)
+    daemon = IngestionDaemon(source, str(tmp_path / "store"), batch_size=500, queue_size=2)
+
+    async def send():
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        _, writer = await asyncio.open_unix_connection(socket_path)
+        for start in range(0, len(lines), 4096):
+            writer.write(lines[start:start + 4096])
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+        while daemon.queue.qsize() or source.queue.qsize():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        source.close()
+
+    async def main():
+        stats, _ = await asyncio.gather(daemon.run(), send())
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["events_read"] == len(events_df)
+    assert len(EventStore(str(tmp_path / "store"))) == stats["events_stored"]
+
+
+def test_restart_replays_write_ahead_log(events_df, tmp_path):
+    path = tmp_path / "events.csv"
+    events_df.to_csv(path, index=False)
+    store_dir = str(tmp_path / "store")
+
+    # The process dies while storing the second micro-batch, after its chunks were logged
+    daemon = IngestionDaemon(FileTailSource(str(path), read_size=16384), store_dir, batch_size=1000)
+    append, calls = daemon.store.append, []
+
+    def crashing_append(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("killed")
+        return append(*args, **kwargs)
+
+    daemon.store.append = crashing_append
+    with pytest.raises(RuntimeError):
+        asyncio.run(daemon.run())
+    first = daemon.stats
+
+    stats = asyncio.run(IngestionDaemon(FileTailSource(str(path)), store_dir, batch_size=1000).run())
+    assert stats["events_replayed"] > 0
+    assert first["events_read"] + stats["events_replayed"] + stats["events_read"] == len(events_df)
+    quarantined = first["events_quarantined"] + stats["events_quarantined"]
+    assert len(EventStore(store_dir)) + quarantined == len(events_df)
+    assert len(os.listdir(os.path.join(store_dir, "wal"))) == 1  # checkpointed segments are removed
+
+
+def test_daemon_built_outside_the_event_loop_runs_in_each_loop(events_df, tmp_path):
+    path = tmp_path / "events.csv"
+    half = len(events_df) // 2
+    events_df.iloc[:half].to_csv(path, index=False)
+    daemon = IngestionDaemon(FileTailSource(str(path)), str(tmp_path / "store"), batch_size=1000,
+                             batch_timeout=0.01, wal=False)
+    assert daemon.queue is None  # asyncio objects bind to the loop they are created in (Python 3.9)
+    assert asyncio.run(daemon.run())["events_read"] == half
+
+    events_df.iloc[half:].to_csv(path, mode="a", header=False, index=False)
+    assert asyncio.run(daemon.run())["events_read"] == len(events_df)
+
+    source = UnixSocketSource(str(tmp_path / "events.sock"))
+    source.close()
+    assert source.queue is None
+    assert asyncio.run(IngestionDaemon(source, str(tmp_path / "socket-store"), wal=False).run())["events_read"] == 0
+
+
+def test_validation_runs_off_the_event_loop(events_df, tmp_path):
+    import threading
+
+    path = tmp_path / "events.csv"
+    events_df.to_csv(path, index=False)
+    daemon = IngestionDaemon(FileTailSource(str(path)), str(tmp_path / "store"), batch_size=1000, wal=False)
+    threads = []
+    validate = daemon.engine.validate
+    daemon.engine.validate = lambda raw, **kwargs: threads.append(threading.current_thread()) or validate(raw, **kwargs)
+
+    stats = asyncio.run(daemon.run())
+    assert stats["events_read"] == len(events_df) and len(threads) == stats["micro_batches"]
+    assert threading.main_thread() not in threads
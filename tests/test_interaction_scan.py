@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from interaction_scan import FACTORS, InteractionCube, discretize
+
+
+def test_cube_marginals_match_groupby(analyzer):
+    cube = InteractionCube(analyzer.df)
+    codes, levels, failed, _ = discretize(analyzer.df)
+    assert cube.batch_cube[0].sum() == cube.n_batches == analyzer.df['Batch_ID'].nunique()
+
+    batches, failures = cube.marginal(['Shift', 'Month'])
+    assert batches.shape == (len(levels['Shift']), 12)
+    table = pd.crosstab(codes['Shift'], codes['Month'], values=failed, aggfunc='sum').fillna(0)
+    assert np.allclose(failures[np.ix_(table.index, table.columns)], table.to_numpy())
+
+    # Station interactions count each (batch, station used) pair once
+    used = analyzer.df.drop_duplicates(['Batch_ID', 'Dosing_Station'])
+    batches, _ = cube.marginal(['Dosing_Station'])
+    assert batches.tolist() == used['Dosing_Station'].value_counts().sort_index().tolist()
+    assert cube.nested('Recipe_Name', 'Complexity_Band')
+
+
+def test_scan_finds_a_planted_interaction(analyzer):
+    events = analyzer.df.copy()
+    codes, _, _, _ = discretize(events)
+    batch, _ = pd.factorize(events['Batch_ID'])
+    # Night batches fail in the second half of the year and pass in the first; neither factor alone explains it
+    night = codes['Shift'][batch] == 0
+    late = codes['Month'][batch] >= 6
+    events.loc[night & late, 'QC_Result'] = 'failed'
+    events.loc[night & ~late, 'QC_Result'] = 'passed'
+
+    scan = InteractionCube(events).scan(max_order=2, min_batches=5)
+    interactions = scan['interactions']
+    assert len(interactions) == len(FACTORS) * (len(FACTORS) - 1) // 2 - 1  # recipe x complexity is nested
+    assert interactions.loc[0, 'Interaction'] == 'Month x Shift'
+    assert interactions.loc[0, 'Q_Value'] < 0.01
+    assert scan['cells'].loc[0, 'Interaction'] == 'Month x Shift'
+    assert (np.diff(scan['cells']['Q_Value']) >= 0).all()
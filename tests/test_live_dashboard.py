@@ -0,0 +1,91 @@
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_quality import DataQualityEngine
+from event_store import EventStore
+from live_dashboard import DashboardAggregates, LiveDashboard, diff_traces, make_handler
+
+
+@pytest.fixture
+def clean_events(events_df):
+    clean, _, _ = DataQualityEngine().validate(events_df)
+    return clean
+
+
+def test_incremental_aggregates_match_full_recompute(clean_events):
+    incremental = DashboardAggregates(min_batches=1, capacity=16)
+    # Chunks cut through batches, so a batch's state is merged across updates (and the state arrays grow)
+    for chunk in np.array_split(np.arange(len(clean_events)), 7):
+        incremental.update(clean_events.iloc[chunk])
+    full = DashboardAggregates(min_batches=1)
+    full.update(clean_events)
+    assert incremental.traces() == full.traces()
+    assert len(incremental.batches) == clean_events["Batch_ID"].nunique()
+
+    batches = clean_events.groupby("Batch_ID").agg(
+        Failed=("QC_Result", lambda s: (s == "failed").any()),
+        Month=("Production_Date", lambda s: s.min().month),
+    )
+    monthly = batches.groupby("Month")["Failed"].mean() * 100
+    x, y = incremental.traces()[3]["x"], incremental.traces()[3]["y"]
+    assert x == monthly.index.tolist()
+    assert y == pytest.approx(monthly.round(2).tolist())
+    stations = clean_events.groupby("Dosing_Station")["QC_Result"].apply(lambda s: (s == "failed").mean() * 100)
+    assert incremental.traces()[2]["y"] == pytest.approx(stations.round(2).tolist())
+
+
+def test_poll_reports_only_changed_traces(clean_events, tmp_path):
+    store = EventStore(str(tmp_path / "store"))
+    first = clean_events[clean_events["Production_Date"] < pd.Timestamp("2024-12-01")]
+    store.append(first)
+    dashboard = LiveDashboard(str(tmp_path / "store"), min_batches=1)
+    assert dashboard.version == 1 and dashboard.poll() == {}
+
+    # New batches late in the year touch the December point, not the earlier months
+    before = dashboard.traces
+    last = clean_events[clean_events["Production_Date"] >= pd.Timestamp("2024-12-01")]
+    store.append(last)
+    changed = dashboard.poll()
+    assert dashboard.version == 2 and 3 in changed
+    assert changed[3]["x"][:-1] == before[3]["x"] and changed[3]["y"][:-1] == before[3]["y"]
+    assert diff_traces(before, dashboard.traces) == changed
+    assert diff_traces(None, dashboard.traces).keys() == {0, 1, 2, 3}
+
+
+def test_event_stream_pushes_patches(clean_events, tmp_path):
+    store = EventStore(str(tmp_path / "store"))
+    half = clean_events["Batch_ID"] < "B00200"
+    store.append(clean_events[half])
+    dashboard = LiveDashboard(str(tmp_path / "store"), interval=0.05)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(dashboard, keepalive=0.5))
+    httpd.daemon_threads = True
+    threads = [threading.Thread(target=httpd.serve_forever, daemon=True), threading.Thread(target=dashboard.run, daemon=True)]
+    for thread in threads:
+        thread.start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/figure") as response:
+            assert len(json.loads(response.read())["data"]) == 4
+        with urllib.request.urlopen(f"{base}/events", timeout=10) as stream:
+
+            def next_patch():
+                for line in stream:
+                    if line.startswith(b"data: "):
+                        return json.loads(line[6:])
+
+            patch = next_patch()
+            assert patch["version"] == 1 and set(patch["traces"]) == {"0", "1", "2", "3"}
+            store.append(clean_events[~half])
+            patch = next_patch()
+            assert patch["version"] == 2 and patch["batches"] == clean_events["Batch_ID"].nunique()
+            assert "2" in patch["traces"] and set(patch["traces"]) <= {"0", "1", "2", "3"}
+    finally:
+        dashboard.stop()
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from maintenance_optimizer import MaintenanceOptimizer, expected_abs_error
+
+
+def _drifting(events_df, station='D02', drift=0.01):
+    """Events where one station's bias grows linearly through the year."""
+    events = events_df.copy()
+    days = (pd.to_datetime(events['Production_Date']) - pd.Timestamp('2024-01-01')).dt.days
+    at_station = events['Dosing_Station'] == station
+    events.loc[at_station, 'Actual_Amount'] += drift * days[at_station]
+    return events
+
+
+def test_expected_abs_error_matches_sampling():
+    rng = np.random.default_rng(0)
+    for bias in (0.0, 0.3, -0.8):
+        sample = np.abs(rng.normal(bias, 0.5, 200_000)).mean()
+        assert abs(expected_abs_error(bias, 0.5) - sample) < 5e-3
+
+
+def test_analyzer_import_does_not_load_scipy():
+    src = os.path.join(os.path.dirname(__file__), '..', 'src')
+    code = "import sys, paint_analysis; print('scipy' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, '-c', code], env={**os.environ, 'PYTHONPATH': src}, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == 'False'
+
+
+def test_drift_is_recovered(events_df):
+    optimizer = MaintenanceOptimizer(_drifting(events_df), lookback_days=120)
+    state = optimizer.station_state
+    assert abs(state.loc['D02', 'Drift_Per_Day'] - 0.01) < 3 * state.loc['D02', 'Drift_SE'] + 1e-3
+    assert state.loc['D02', 'Current_Bias'] > 3
+
+
+def test_schedules_are_ranked_and_respect_crew_capacity(events_df):
+    optimizer = MaintenanceOptimizer(_drifting(events_df, drift=0.05), service_cost=1, downtime_hours=0,
+                                     crew_capacity=1)
+    schedules = optimizer.optimize(top=5)
+    assert len(schedules) == 5
+    assert schedules['Expected_Cost'].is_monotonic_increasing
+    assert (schedules['Savings_vs_No_Maintenance'] >= 0).all()
+
+    for schedule in schedules['Schedule']:
+        dates = [date for station_dates in schedule.values() for date in station_dates]
+        assert len(dates) == len(set(dates))
+
+    # With cheap visits the fast-drifting station is serviced first, and repeatedly
+    plan = optimizer.station_plan(schedules)
+    assert plan.iloc[0]['Dosing_Station'] == 'D02'
+    assert plan.set_index('Dosing_Station').loc['D02', 'Calibrations'] >= 2
+
+
+def test_expensive_calibration_is_not_scheduled(events_df):
+    optimizer = MaintenanceOptimizer(events_df, service_cost=1e9)
+    schedules = optimizer.optimize(top=1)
+    assert schedules.loc[0, 'Calibrations'] == 0
@@ -0,0 +1,69 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from memory_budget import MemoryBudgetError, batch_chunks, compact_dtypes, concat_compact, footprint, parse_size
+from paint_analysis import PaintQualityAnalyzer
+
+
+def _load(path, **kwargs):
+    analyzer = PaintQualityAnalyzer(path, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        analyzer.load_and_validate_data()
+    return analyzer, out.getvalue()
+
+
+def test_compact_dtypes_shrink_events(analyzer):
+    events = analyzer.df.copy()
+    before = footprint(events)
+    compact_dtypes(events)
+    assert footprint(events) < before / 2
+    assert events['Target_Amount'].dtype == np.float32 and events['Num_Ingredients'].dtype == np.int16
+    assert isinstance(events['Batch_ID'].dtype, pd.CategoricalDtype)
+    assert events['Production_Timestamp'].dtype == np.int64
+
+    halves = [events.iloc[:100].copy(), events.iloc[100:].copy()]
+    halves[0]['Recipe_Name'] = halves[0]['Recipe_Name'].cat.remove_unused_categories()
+    combined = concat_compact(halves)
+    assert isinstance(combined['Recipe_Name'].dtype, pd.CategoricalDtype)
+    assert (combined['Recipe_Name'].astype(str) == events['Recipe_Name'].astype(str).to_numpy()).all()
+    assert parse_size('1.5GB') == 3 << 29 and parse_size(' 64 mb') == 64 << 20
+
+
+def test_batch_chunks_keep_batches_whole(data_csv, events_df):
+    chunks = list(batch_chunks(data_csv, chunk_rows=500))
+    assert len(chunks) > 5 and sum(len(chunk) for chunk in chunks) == len(events_df)
+    seen = [set(chunk['Batch_ID']) for chunk in chunks]
+    assert all(a.isdisjoint(b) for a, b in zip(seen, seen[1:]))
+
+
+@pytest.mark.parametrize('budget', ['256MB', '2MB'])
+def test_budget_mode_matches_default_tables(data_csv, budget):
+    default, _ = _load(data_csv)
+    compact, log = _load(data_csv, memory_budget=budget, chunk_rows=1000)
+    assert ('processing in chunks' in log) == (budget == '2MB')
+    assert compact.analysis_results['data_quality']['rows_clean'] == len(default.df) == len(compact.df)
+
+    report = compact.memory_report.set_index('Frame')
+    assert report.loc['events', 'MB'] < default.memory_footprint().set_index('Frame').loc['events', 'MB'] / 2
+    assert compact.batch_df['Batch_ID'].astype(str).tolist() == default.batch_df['Batch_ID'].tolist()
+    for column in default.batch_df.columns:
+        expected, actual = default.batch_df[column], compact.batch_df[column]
+        if expected.dtype.kind == 'f':
+            assert np.allclose(actual.astype(float), expected, atol=1e-3, equal_nan=True), column
+        else:
+            assert (actual.astype(str).to_numpy() == expected.astype(str).to_numpy()).all(), column
+
+    # Chunked loads fold each chunk into the error sketches instead of rebuilding them from the events
+    assert (compact.error_sketches is not None) == (budget == '2MB')
+    if compact.error_sketches is not None:
+        counts = compact.error_sketches.quantiles('station')['Count']
+        assert counts.to_dict() == default.df.groupby('Dosing_Station').size().to_dict()
+
+
+def test_chunked_load_refuses_a_budget_the_compact_events_exceed(data_csv):
+    with pytest.raises(MemoryBudgetError, match='over the 0.0 MB memory budget'):
+        _load(data_csv, memory_budget='10KB', chunk_rows=1000)
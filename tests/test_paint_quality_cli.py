@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from paint_quality_cli import main
+
+
+def test_cli_import_is_lightweight():
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    code = "import sys, paint_quality_cli; print(sorted(m for m in ('pandas', 'sklearn', 'scipy', 'plotly', 'matplotlib') if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], env={**os.environ, "PYTHONPATH": src}, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_model_then_score_round_trip(data_csv, tmp_path):
+    batches = tmp_path / "batches.csv"
+    model = tmp_path / "model.pkl"
+    scores = tmp_path / "scores.csv"
+
+    assert main(["ingest", "-q", "-i", data_csv, "-o", str(batches)]) == 0
+    assert main(["model", "-i", data_csv, "-o", str(model)]) == 0
+    assert main(["score", "-m", str(model), "-i", str(batches), "-o", str(scores)]) == 0
+
+    result = pd.read_csv(scores)
+    assert result["Risk_Score"].between(0, 1).all()
+    assert result["Risk_Score"].is_monotonic_decreasing
+
+    explained = tmp_path / "explained.csv"
+    assert main(["score", "-m", str(model), "-i", str(batches), "-o", str(explained), "--explain"]) == 0
+    contributions = pd.read_csv(explained).filter(like="_Contribution")
+    assert contributions.shape[1] == 6
+
+
+def test_score_reads_raw_events_once_from_csv_or_archive(data_csv, tmp_path, monkeypatch):
+    import paint_quality_cli
+
+    model, archive = tmp_path / "model.pkl", tmp_path / "archive"
+    assert main(["model", "-i", data_csv, "-o", str(model)]) == 0
+    assert main(["archive", "-i", data_csv, "-o", str(archive)]) == 0
+
+    # Raw inputs go straight to the analyzer, never through the batch-table reader
+    monkeypatch.setattr(paint_quality_cli, "_read_table", lambda path: pytest.fail(f"read {path} as a table"))
+    results = []
+    for source in (data_csv, str(archive)):
+        scores = tmp_path / f"scores_{len(results)}.csv"
+        assert main(["score", "-m", str(model), "-i", source, "-o", str(scores)]) == 0
+        results.append(pd.read_csv(scores).sort_values("Batch_ID", ignore_index=True))
+    pd.testing.assert_frame_equal(results[0], results[1])
+
+
+def test_missing_input_reports_error(tmp_path, capsys):
+    assert main(["ingest", "-i", str(tmp_path / "missing.csv")]) == 1
+    assert "missing.csv" in capsys.readouterr().err
+
+
+def test_unmet_memory_budget_reports_error(data_csv, capsys):
+    assert main(["ingest", "-q", "-i", data_csv, "--memory-budget", "10KB"]) == 1
+    assert "memory budget" in capsys.readouterr().err
+
+
+def test_report_reuses_sections_when_the_data_is_unchanged(data_csv, tmp_path, capsys, monkeypatch):
+    output, state = str(tmp_path / "summary.md"), str(tmp_path / "state.json")
+    args = ["report", "-i", data_csv, "-o", output, "--state", state]
+    assert main(args) == 0
+    first = open(output).read()
+
+    import paint_quality_cli
+
+    monkeypatch.setattr(paint_quality_cli, "_load_analyzer", lambda *args, **kwargs: pytest.fail("data reloaded"))
+    assert main(args) == 0
+    assert open(output).read() == first
+    assert "0 sections rendered, 6 reused" in capsys.readouterr().out
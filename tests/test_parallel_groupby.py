@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_access import build_batch_table, build_station_table
+from memory_budget import compact_dtypes
+from parallel_groupby import ParallelGroupBy, SharedArrays, partition_of
+from parallel_groupby import benchmark as parallel_groupby_benchmark
+
+
+def test_partitions_are_stable_and_whole(analyzer):
+    labels = analyzer.df['Batch_ID'].unique()
+    parts = partition_of(labels, 8)
+    assert (parts == partition_of(labels, 8)).all() and set(parts) <= set(range(8))
+
+    groupby = ParallelGroupBy(analyzer.df, n_jobs=1, partitions_per_job=8)
+    try:
+        codes, order = groupby.shared.arrays['Batch_ID'], groupby.shared.arrays['order']
+        owner = {}
+        for index, (start, stop) in enumerate(groupby.slices):
+            for code in np.unique(codes[order[start:stop]]):
+                assert owner.setdefault(code, index) == index
+        assert len(owner) == len(labels)
+    finally:
+        groupby.close()
+
+
+def test_pool_matches_single_process_tables(analyzer):
+    expected_batches = build_batch_table(analyzer.df)
+    expected_stations = build_station_table(analyzer.df)
+    with ParallelGroupBy(analyzer.df, n_jobs=2) as groupby:
+        pd.testing.assert_frame_equal(groupby.batch_table(), expected_batches)
+        pd.testing.assert_frame_equal(groupby.station_table(), expected_stations, check_dtype=False)
+        # Both tables come from one set of shared arrays and one pool
+        pool = groupby.pool
+        assert groupby.station_table() is not None and groupby.pool is pool
+        names = [spec[0] for spec in groupby.shared.spec.values()]
+    # The shared blocks are gone once the group-by is closed
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach({'Batch_ID': (names[0], '<f8', (1,))})
+
+
+def test_compact_events_through_the_pool(analyzer):
+    events = compact_dtypes(analyzer.df.copy())
+    batches = build_batch_table(events, n_jobs=2)
+    assert isinstance(batches['Recipe_Name_first'].dtype, pd.CategoricalDtype)
+    assert batches['Failed'].tolist() == analyzer.batch_df['Failed'].tolist()
+    assert np.allclose(batches['Dosing_Error_Abs_mean'], analyzer.batch_df['Dosing_Error_Abs_mean'], atol=1e-3)
+
+
+def test_analyzer_partitions_once_for_both_tables(analyzer, data_csv, monkeypatch):
+    import parallel_groupby
+    from paint_analysis import PaintQualityAnalyzer
+
+    created = []
+
+    class Counting(parallel_groupby.ParallelGroupBy):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(parallel_groupby, 'ParallelGroupBy', Counting)
+    parallel = PaintQualityAnalyzer(data_csv, n_jobs=2)
+    parallel.load_and_validate_data()
+    parallel.analyze_fundamental_components()
+    parallel.analyze_systems_interactions()
+    assert len(created) == 1 and created[0].pool is None and parallel._groupby is None
+    pd.testing.assert_frame_equal(parallel.batch_df, analyzer.batch_df)
+    pd.testing.assert_frame_equal(parallel.analysis_results['systems_interactions']['station_analysis'],
+                                  analyzer.analysis_results['systems_interactions']['station_analysis'], check_dtype=False)
+
+
+def test_benchmark_times_both_paths(events_df):
+    timings = parallel_groupby_benchmark(events_df.copy(), n_jobs=2, repeat=1)
+    assert set(timings) == {'serial', 'parallel_setup', 'parallel_tables'}
+    assert all(value > 0 for value in timings.values())
+
+
+def test_first_values_skip_missing_rows(events_df):
+    events = events_df.copy()
+    first = events.index[events['Batch_ID'] == events['Batch_ID'].iloc[0]]
+    events.loc[first[0], 'Recipe_Name'] = None
+    events.loc[first, 'Num_Ingredients'] = np.nan
+    with ParallelGroupBy(events, n_jobs=1) as groupby:
+        pd.testing.assert_frame_equal(groupby.batch_table(), build_batch_table(events))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from data_access import build_batch_table
+from data_quality import DataQualityEngine
+from production_simulator import ProductionSimulator
+
+
+@pytest.fixture(scope='module')
+def simulator(events_df):
+    return ProductionSimulator.fit(events_df)
+
+
+def test_baseline_reproduces_history(simulator, events_df):
+    historical = (events_df.groupby('Batch_ID')['QC_Result'].first() == 'failed').mean()
+    summary = simulator.run(200_000, chunk_size=50_000)
+    assert summary['Batches'] == 200_000
+    assert abs(summary['Failure_Rate'] - historical) < 0.05
+    assert summary['Complex_Failure_Rate'] > summary['Simple_Failure_Rate']
+    assert summary['Suboptimal_Temp_Failure_Rate'] > summary['Optimal_Temp_Failure_Rate']
+
+
+def test_interventions_reduce_failures(simulator):
+    results = simulator.compare({
+        'baseline': {},
+        'recalibrate': {'recalibrate': ['D03', 'D07']},
+        'temperature': {'temperature_band': (20, 25)},
+        'complexity': {'complexity_cap': 15},
+    }, n_batches=100_000).set_index('Scenario')
+    assert (results.loc[['recalibrate', 'temperature', 'complexity'], 'Failure_Rate_Reduction'] > 0).all()
+    assert results.loc['recalibrate', 'Mean_Abs_Error'] < results.loc['baseline', 'Mean_Abs_Error']
+
+
+def test_parallel_run_matches_serial(simulator):
+    serial = simulator.run(40_000, chunk_size=10_000, n_jobs=1)
+    parallel = simulator.run(40_000, chunk_size=10_000, n_jobs=2)
+    assert serial['Failures'] == parallel['Failures']
+    assert np.isclose(serial['Mean_Abs_Error'], parallel['Mean_Abs_Error'])
+    with pytest.raises(ValueError, match='n_batches'):
+        simulator.run(0)
+
+
+def test_simulated_events_pass_the_pipeline(simulator):
+    events = simulator.simulate_events(300)
+    assert events['Batch_ID'].nunique() == 300
+    clean, quarantine, _ = DataQualityEngine().validate(events)
+    assert len(quarantine) < 0.01 * len(events)  # only rare tiny-target/large-error dosings
+    batches = build_batch_table(clean)
+    assert len(batches) >= 295 and 0.2 < batches['Failed'].mean() < 0.6
+    assert batches['Dosing_Station_nunique'].max() <= len(simulator.station_names)
+    assert events.equals(simulator.simulate_events(300))
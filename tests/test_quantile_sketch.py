@@ -0,0 +1,56 @@
+import numpy as np
+
+from quantile_sketch import DosingErrorSketches, TDigest
+
+
+def test_digest_is_accurate_bounded_and_mergeable():
+    rng = np.random.default_rng(0)
+    values = np.abs(rng.standard_t(3, 200_000))
+    quantiles = [0.5, 0.95, 0.99]
+    exact = np.quantile(values, quantiles)
+
+    streamed = TDigest()
+    for chunk in np.array_split(values, 50):
+        streamed.update(chunk)
+    merged = TDigest.merge_all(TDigest().update(part) for part in np.array_split(values, 8))
+
+    for digest in (streamed, merged):
+        assert len(digest) <= digest.compression
+        assert digest.count == len(values)
+        np.testing.assert_allclose(digest.quantile(quantiles), exact, rtol=0.02)
+
+
+def test_small_groups_are_exact(events_df):
+    df = events_df.assign(Dosing_Error_Abs=(events_df['Actual_Amount'] - events_df['Target_Amount']).abs())
+    levels = DosingErrorSketches.LEVELS
+    sketches = DosingErrorSketches.from_events(df.iloc[:3000], levels=levels)
+    sketches.merge(DosingErrorSketches.from_events(df.iloc[3000:], levels=levels))
+
+    table = sketches.quantiles('batch')
+    expected = df.groupby('Batch_ID')['Dosing_Error_Abs'].quantile(0.95)
+    np.testing.assert_allclose(table['P95'], expected.loc[table.index])
+    assert table['Count'].sum() == len(df)
+    assert set(sketches.quantiles('station_day').index.names) == {'Dosing_Station', 'Production_Date'}
+
+
+def test_grouped_update_matches_one_digest_per_group(events_df):
+    rng = np.random.default_rng(1)
+    df = events_df.assign(Dosing_Error_Abs=np.abs(rng.standard_t(3, len(events_df))))
+    df.loc[df.index[::50], 'Dosing_Error_Abs'] = np.nan
+    sketches = DosingErrorSketches(compression=100)
+    for chunk in np.array_split(np.arange(len(df)), 3):
+        sketches.update(df.iloc[chunk])
+    assert 'batch' not in sketches.sketches
+
+    for station, values in df.groupby('Dosing_Station')['Dosing_Error_Abs']:
+        expected = TDigest(100)
+        for chunk in np.array_split(np.arange(len(df)), 3):
+            expected.update(values[values.index.isin(df.index[chunk])])
+        digest = sketches.sketches['station'][station]
+        assert len(digest) < len(values.dropna()) and (digest.min, digest.max) == (expected.min, expected.max)
+        np.testing.assert_allclose(digest.means, expected.means)
+        np.testing.assert_allclose(digest.weights, expected.weights)
+    days = df.groupby(['Dosing_Station', 'Production_Date'])['Dosing_Error_Abs'].quantile(0.5)
+    table = sketches.quantiles('station_day')
+    assert len(table) == len(days)
+    np.testing.assert_allclose(table['P50'], days.loc[table.index])
@@ -0,0 +1,29 @@
+import numpy as np
+
+from recipe_similarity import RecipeSimilarityIndex, recipe_matrix
+
+
+def test_recipe_matrix_has_one_row_per_recipe(events_df):
+    matrix, history = recipe_matrix(events_df)
+    assert matrix.shape[0] == events_df['Recipe_Name'].nunique() == len(history)
+    nonzero_slots = np.diff(matrix.indptr)
+    np.testing.assert_array_equal(nonzero_slots, history['Num_Ingredients'].to_numpy())
+    assert history['Batches'].sum() == events_df['Batch_ID'].nunique()
+
+
+def test_existing_recipe_is_its_own_nearest_neighbour(events_df):
+    index = RecipeSimilarityIndex().fit(events_df)
+    for recipe in index.history.index[:5]:
+        neighbours = index.similar(index.recipe_profile(recipe))
+        assert neighbours.loc[0, 'Recipe_Name'] == recipe
+        assert neighbours.loc[0, 'Distance'] < 1e-9
+        assert neighbours['Distance'].is_monotonic_increasing
+
+
+def test_new_recipe_risk_is_shrunk_toward_neighbours(events_df):
+    index = RecipeSimilarityIndex(n_neighbors=3).fit(events_df)
+    rng = np.random.default_rng(1)
+    result = index.risk_score(rng.uniform(1, 50, 22))
+    rates = result['Neighbours']['Smoothed_Failure_Rate']
+    assert len(result['Neighbours']) == 3
+    assert rates.min() - 1e-12 <= result['Risk_Score'] <= rates.max() + 1e-12
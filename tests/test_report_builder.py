@@ -0,0 +1,62 @@
+from report_builder import SECTIONS, ReportBuilder, report_inputs, report_sources
+
+
+def test_report_uses_current_figures(analyzer):
+    analyzer.generate_business_recommendations()
+    inputs = report_inputs(analyzer)
+    report = ReportBuilder().build(inputs)
+
+    complexity = analyzer.analysis_results['fundamental_components']['complexity_effect']
+    assert f"{complexity['Complex_Recipes_Failure_Rate']:.1%}" in report
+    assert f"{analyzer.batch_df['Failed'].mean():.1%}" in report
+    assert f"{complexity['Complex_Recipes_Failure_Rate']:.1%}" in analyzer.analysis_results['recommendations'][0]['Finding']
+    assert '## Predictive Model Results' not in report
+
+
+def test_only_changed_sections_are_rerendered(analyzer, tmp_path):
+    analyzer.generate_business_recommendations()
+    inputs = report_inputs(analyzer)
+    state = str(tmp_path / 'state.json')
+
+    first = ReportBuilder(state_path=state)
+    report = first.build(inputs)
+    assert first.stats['rendered'] == list(SECTIONS)
+
+    # A fresh builder reuses everything from the state file
+    second = ReportBuilder(state_path=state)
+    assert second.build(inputs) == report
+    assert second.stats['rendered'] == []
+
+    # A new cost assumption touches only the business-impact section
+    changed = report_inputs(analyzer, cost_per_failure=2500)
+    third = ReportBuilder(state_path=state)
+    updated = third.build(changed)
+    assert third.stats['rendered'] == ['business_impact']
+    assert '$2,500/failed batch' in updated
+
+
+def test_stale_sections_are_known_before_any_phase_runs(analyzer, tmp_path):
+    analyzer.generate_business_recommendations()
+    state = str(tmp_path / 'state.json')
+    sources = report_sources('v1')
+    first = ReportBuilder(state_path=state)
+    assert first.needed(sources)[1] == {'fundamentals', 'systems', 'model', 'recommendations'}
+    report = first.build(report_inputs(analyzer), sources)
+
+    # Same data and settings: nothing to compute, every section comes from the state file
+    second = ReportBuilder(state_path=state)
+    assert second.needed(sources) == ([], set())
+    assert second.build({}, sources) == report
+
+    # A new cost assumption needs only the aggregates (and phases) of the business-impact section
+    changed = report_sources('v1', cost_per_failure=2500)
+    third = ReportBuilder(state_path=state)
+    aggregates, phases = third.needed(changed)
+    assert phases == {'fundamentals'}
+    updated = third.build(report_inputs(analyzer, cost_per_failure=2500, names=aggregates), changed)
+    assert third.stats['rendered'] == ['business_impact'] and '$2,500/failed batch' in updated
+
+    # New data with identical aggregates re-stamps the sections without re-rendering them
+    fourth = ReportBuilder(state_path=state)
+    assert fourth.build(report_inputs(analyzer, cost_per_failure=2500), report_sources('v2', 2500)) == updated
+    assert fourth.stats['rendered'] == []
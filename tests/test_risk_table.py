@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compiled_model import compile_model
+from paint_analysis import MODEL_FEATURES
+from paint_quality_cli import main
+from risk_table import RiskTable
+
+
+@pytest.fixture(scope='module')
+def table(analyzer):
+    data = analyzer.batch_df[MODEL_FEATURES + ['Failed']].dropna()
+    model = make_pipeline(StandardScaler(), LogisticRegression()).fit(data[MODEL_FEATURES], data['Failed'])
+    return RiskTable.build(analyzer.df, compile_model(model), MODEL_FEATURES, n_draws=2)
+
+
+def test_table_orders_risk_by_stations_temperature_and_complexity(table):
+    # Model-only estimates: biased stations and more ingredients are riskier
+    assert table.risk('New', ['D03', 'D07'], 22.5, num_ingredients=20) > table.risk('New', ['D02', 'D04'], 22.5, num_ingredients=20)
+    assert table.band(10.0) == 0 and table.band(40.0) == len(table.edges)
+    assert table.risk('New', ['D02'], 22.5, num_ingredients=28) > table.risk('New', ['D02'], 22.5, num_ingredients=6)
+    with pytest.raises(KeyError):
+        table.risk('New', ['D02'], 22.5)
+
+    recipe = table.recipes[0]
+    mask = table.station_mask(['D01', 'D02'])
+    assert table.lookup(np.array([0]), np.array([mask]), np.array([23.2]))[0] == pytest.approx(
+        table.risk(recipe, ['D02', 'D01'], 23.2))
+
+
+def test_saved_table_loads_without_sklearn(table, tmp_path):
+    path = str(tmp_path / 'risk_table.npz')
+    table.save(path)
+    assert np.array_equal(RiskTable.load(path).table, table.table)
+
+    src = os.path.join(os.path.dirname(__file__), '..', 'src')
+    code = (f"import sys; from risk_table import RiskTable; t = RiskTable.load({path!r}); "
+            f"t.risk({str(table.recipes[0])!r}, ['D01'], 22.0); "
+            "print(sorted(m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], env={**os.environ, 'PYTHONPATH': src},
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+    recipe = str(table.recipes[0])
+    threshold = str(table.risk(recipe, ['D03'], 22.0) + 1e-3)
+    assert main(['gate', '-t', path, '-r', recipe, '-s', 'D03', '--temperature', '22', '--threshold', threshold]) == 0
+    assert main(['gate', '-t', path, '-r', recipe, '-s', 'D03', '--temperature', '22', '--threshold', '0']) == 2
@@ -0,0 +1,38 @@
+import numpy as np
+
+from scenario_simulation import ScenarioSimulator, build_scenario_grid
+
+
+def test_no_intervention_saves_nothing(events_df):
+    simulator = ScenarioSimulator(events_df, n_draws=200)
+    results = simulator.simulate(build_scenario_grid())
+
+    assert np.allclose(results["Daily_Savings"], 0.0)
+
+
+def test_single_lever_matches_group_rate_arithmetic(events_df):
+    simulator = ScenarioSimulator(events_df, n_draws=5000, cost_uncertainty=0.0)
+    results = simulator.simulate(build_scenario_grid(complexity_caps=[15], achievable_fractions=[1.0]))
+
+    batches = events_df.groupby("Batch_ID").first()
+    failed = batches["QC_Result"] == "failed"
+    complex_mask = batches["Num_Ingredients"] > 15
+    expected = complex_mask.sum() * (failed[complex_mask].mean() - failed[~complex_mask].mean())
+
+    prevented = results["Daily_Failures_Prevented"].iloc[0] * simulator.n_days
+    assert abs(prevented - expected) < 0.1 * expected
+
+
+def test_grid_evaluates_every_scenario(events_df):
+    simulator = ScenarioSimulator(events_df, n_draws=100, chunk_size=7)
+    grid = build_scenario_grid(
+        complexity_caps=[np.inf, 10, 15, 20],
+        temperature_bands=[(-np.inf, np.inf), (20, 25), (19, 26)],
+        recalibrations=[(), ("D03",), ("D03", "D07")],
+        costs_per_failure=[2000, 2500],
+    )
+    results = simulator.simulate(grid)
+
+    assert len(results) == len(grid) == 72
+    assert (results["Daily_Savings_P05"] <= results["Daily_Savings_P95"]).all()
+    assert (results["Daily_Failures_Prevented"] >= -1e-9).all()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from shift_analysis import failure_cube, shift_of_hour, time_buckets
+
+
+def test_integer_buckets_match_pandas():
+    stamps = pd.to_datetime(['2024-01-01 00:00:00', '2024-03-16 13:59:59', '2024-12-29 23:30:00'])
+    hour, weekday = time_buckets(stamps.as_unit('ns').astype('int64'))
+    assert list(hour) == list(stamps.hour) and list(weekday) == list(stamps.weekday)
+    assert list(shift_of_hour()[[5, 6, 13, 14, 21, 22]]) == [0, 1, 1, 2, 2, 0]
+
+
+def test_cube_finds_a_planted_night_shift_effect(analyzer):
+    events = analyzer.df.copy()
+    start = events.groupby('Batch_ID')['Production_Timestamp'].transform('min')
+    hour, _ = time_buckets(start)
+    night = (hour >= 22) | (hour < 6)
+    events.loc[night, 'QC_Result'] = 'failed'
+
+    patterns = failure_cube(events)
+    assert patterns['cube']['Batches'].sum() == events['Batch_ID'].nunique()
+    assert patterns['by_shift'].loc['Night', 'Failure_Rate'] == 1.0
+    assert patterns['by_shift'].loc['Morning', 'Failure_Rate'] < 0.6
+    assert patterns['shift_p_value'] < 1e-6
+    assert len(patterns['by_weekday']) == 7 and len(patterns['by_hour']) == 24
+    assert 'time_patterns' in analyzer.analysis_results['systems_interactions']
+    assert np.isfinite(analyzer.analysis_results['systems_interactions']['time_patterns']['shift_p_value'])
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from data_quality import DataQualityEngine
+from event_store import EventStore
+from sql_layer import SQLLayer, extract_predicates
+
+
+def test_extract_predicates_only_for_plain_conjunctions():
+    assert extract_predicates(
+        "SELECT * FROM events WHERE Production_Date BETWEEN '2024-01-01' AND '2024-02-01' AND Target_Amount > 5"
+    ) == [('Production_Date', '>=', '2024-01-01'), ('Production_Date', '<=', '2024-02-01'),
+          ('Target_Amount', '>', 5.0)]
+    assert extract_predicates("SELECT * FROM events WHERE Target_Amount > 5 OR Actual_Amount < 1") == []
+    assert extract_predicates("SELECT * FROM events WHERE Batch_ID IN (SELECT Batch_ID FROM batches)") == []
+    assert extract_predicates("SELECT Actual_Amount AS Target_Amount FROM events WHERE Target_Amount > 5") == []
+
+
+def test_pushdown_prunes_segments_without_changing_results(events_df, tmp_path):
+    clean, _, _ = DataQualityEngine().validate(events_df)
+    clean = clean.sort_values('Production_Date', kind='stable')
+    store = EventStore(str(tmp_path / 'store'))
+    for start in range(0, len(clean), 1000):
+        store.append(clean.iloc[start:start + 1000])
+
+    layer = SQLLayer(store=store)
+    sql = ("SELECT Dosing_Station, COUNT(*) AS n, AVG(Failed) AS failure_rate FROM event_outcomes "
+           "WHERE Production_Date >= '2024-06-01' AND Production_Date < '2024-07-01' "
+           "GROUP BY Dosing_Station ORDER BY Dosing_Station")
+    result = layer.query(sql)
+    plan = layer.last_plan['event_outcomes']
+    assert plan['segments_scanned'] < plan['segments_total']
+    assert set(plan['columns']) == {'Dosing_Station', 'Production_Date', 'Failed'}
+
+    june = clean[(clean['Production_Date'] >= '2024-06-01') & (clean['Production_Date'] < '2024-07-01')]
+    batches = layer.batches().set_index('Batch_ID')['Failed']
+    expected = june.assign(Failed=june['Batch_ID'].map(batches)).groupby('Dosing_Station').agg(
+        n=('Failed', 'size'), failure_rate=('Failed', 'mean')).reset_index()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    # The same query again is served from the cached table
+    layer.query(sql)
+    assert layer.last_plan['event_outcomes']['cache_hit']
+
+    # Frames work too, and batch features are queryable directly
+    frame_layer = SQLLayer(events=clean)
+    total = frame_layer.query("SELECT COUNT(*) AS n, SUM(Failed) AS failed FROM batches")
+    assert total['n'].iloc[0] == clean['Batch_ID'].nunique()
+
+
+def test_join_predicates_are_pushed_only_into_the_table_they_name(events_df):
+    clean, _, _ = DataQualityEngine().validate(events_df)
+    layer = SQLLayer(events=clean)
+    sql = ("SELECT COUNT(*) AS n FROM events e JOIN event_outcomes o ON e.Batch_ID = o.Batch_ID "
+           "WHERE o.Target_Amount > 40")
+    per_batch = clean.groupby('Batch_ID').size()
+    matching = clean[clean['Target_Amount'] > 40].groupby('Batch_ID').size()
+    assert layer.query(sql)['n'].iloc[0] == (matching * per_batch.reindex(matching.index)).sum()
+    assert layer.last_plan['events']['predicates'] == []
+    assert layer.last_plan['event_outcomes']['predicates'] == [('Target_Amount', '>', 40.0)]
+
+    # With a single event table, unqualified event columns are pushed into it (never into batches)
+    result = layer.query("SELECT COUNT(*) AS n FROM events JOIN batches USING (Batch_ID) WHERE Target_Amount > 40")
+    assert result['n'].iloc[0] == (clean['Target_Amount'] > 40).sum()
+    assert layer.last_plan['events']['predicates'] == [('Target_Amount', '>', 40.0)]
+    assert layer.last_plan['batches']['predicates'] == []
+
+
+def test_identifiers_are_case_insensitive_and_runaway_queries_stop(events_df):
+    layer = SQLLayer(events=events_df, timeout=0.2)
+    result = layer.query("select dosing_station, count(*) n from events where target_amount > 5 group by dosing_station")
+    assert len(result) == events_df['Dosing_Station'].nunique()
+    assert layer.last_plan['events']['predicates'] == [('Target_Amount', '>', 5.0)]
+
+    with pytest.raises(ValueError, match='time limit'):
+        layer.query("WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r) SELECT MAX(i) FROM r")
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from data_access import build_batch_table
+from stream_aggregator import BatchWindowAggregator, event_times, replay
+
+
+def test_replay_matches_static_batch_table(events_df):
+    rows, aggregator = replay(events_df, chunk_size=500)
+
+    expected = build_batch_table(events_df.copy())
+    expected['Production_Date_first'] = pd.to_datetime(expected['Production_Date_first'])
+    rows = rows.set_index('Batch_ID').loc[expected['Batch_ID']].reset_index()
+    pd.testing.assert_frame_equal(rows, expected, check_dtype=False, atol=2e-4)
+
+    # Windows close as soon as their QC arrives, so open state stays small
+    assert aggregator.stats['finalized'] == len(expected)
+    assert aggregator.stats['peak_open_windows'] < len(expected) / 4
+    assert not aggregator.open_windows and not aggregator.closed
+
+
+def test_late_events_and_missing_qc_are_handled_explicitly(events_df):
+    events = events_df.assign(Event_Time=event_times(events_df)).drop(columns='QC_Result')
+    first, second = events[events['Batch_ID'] == 'B00000'], events[events['Batch_ID'] == 'B00010']
+    aggregator = BatchWindowAggregator(allowed_lateness='1h', qc_timeout='6h')
+
+    aggregator.process_events(first.iloc[:-1])
+    assert aggregator.process_qc(pd.DataFrame({'Batch_ID': ['B00000'], 'QC_Result': ['failed']})).empty
+
+    # The watermark passes B00000's last event: it is emitted with the events seen so far
+    emitted = aggregator.process_events(second)
+    assert emitted['Batch_ID'].tolist() == ['B00000']
+    assert emitted['Failed'].tolist() == [1]
+
+    # Its straggling dose is late and kept aside, not silently merged
+    aggregator.process_events(first.iloc[-1:])
+    assert aggregator.stats['late_events'] == 1
+    assert len(aggregator.late_events[0]) == 1
+
+    # B00010 never gets a QC result: it expires unlabelled once the timeout passes
+    aggregator.advance_watermark(second['Event_Time'].max() + pd.Timedelta('7h'))
+    assert aggregator.stats['expired'] == 1
+    assert aggregator.expired[0]['Batch_ID'].tolist() == ['B00010']
+    assert not aggregator.open_windows
+
+
+def test_late_and_expired_records_are_bounded(events_df):
+    events = events_df.assign(Event_Time=event_times(events_df)).drop(columns='QC_Result')
+    sunk = []
+    aggregator = BatchWindowAggregator(allowed_lateness='1h', qc_timeout='1h', on_late=sunk.append, keep_records=2)
+
+    batches = [events[events['Batch_ID'] == batch_id] for batch_id in ('B00000', 'B00010', 'B00020', 'B00030')]
+    for batch in batches:
+        aggregator.process_events(batch)
+    aggregator.flush()
+    for batch in batches:
+        aggregator.process_events(batch.iloc[:1])
+
+    # Every late frame reaches the sink; only the newest stay on the aggregator, the counters see all
+    assert len(sunk) == 4 and len(aggregator.late_events) == 2
+    assert aggregator.late_events[-1]['Batch_ID'].tolist() == ['B00030']
+    assert aggregator.stats['late_events'] == 4
+    assert aggregator.stats['expired'] == 4 and len(aggregator.expired) <= 2